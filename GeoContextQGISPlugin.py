@@ -24,7 +24,6 @@
 import os.path
 import sys
 import os
-import time
 import inspect
 
 from qgis.PyQt.QtCore import (
@@ -36,12 +35,11 @@ from qgis.PyQt.QtCore import (
     QUrl
 )
 from qgis.PyQt.QtGui import QIcon
-from qgis.PyQt.QtWidgets import QAction, QTableWidgetItem
+from qgis.PyQt.QtWidgets import QAction
 from qgis.core import (
     QgsProcessingAlgorithm,
     QgsApplication,
     QgsProject,
-    QgsSettings,
     QgsVectorLayer,
     QgsField,
     QgsVectorFileWriter,
@@ -60,24 +58,23 @@ from qgis.gui import QgsMapToolEmitPoint
 # Initialize Qt resources from file resources.py
 from .resources import *
 
-# Utility functions
-from .utilities.utilities import (
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+sys.path.insert(0, cur_dir)
+
+# Utility functions. Same module name as used by the widgets, so the query cache is shared
+from utilities.utilities import (
     get_canvas_crs,
     get_request_crs,
     transform_xy_coordinates,
-    apply_decimal_places_to_float_panel
+    configure_api_session,
+    cache_statistics_text,
+    close_query_caches
 )
 
-from bridge_api.default import (
-    SERVICE,
-    GROUP,
-    COLLECTION,
-    VALUE_JSON,
-    SERVICE_JSON,
-    GROUP_JSON,
-    COLLECTION_JSON,
-    API_DEFAULT_URL
-)
+from utilities.registry_catalogue import get_registry_catalogue
+from utilities.plugin_settings import get_settings
+from utilities.point_request_task import PointRequestTask
 
 # Import the code for the widgets
 from .widgets.GeoContextQGISPlugin_dockwidget import GeoContextQGISPluginDockWidget
@@ -85,7 +82,7 @@ from .widgets.GeoContextQGISPlugin_options_dialog import OptionsDialog
 from .widgets.GeoContextQGISPlugin_account_dialog import AccountDialog
 from .widgets.geocontext_help_dialog import HelpDialog
 from .algorithms.geocontext_point_processing_provider import GeocontextPointProcessingProvider
-from .bridge_api.api_abstract import ApiClient
+from bridge_api.api_abstract import ApiClient
 
 
 class GeoContextQGISPlugin:
@@ -134,6 +131,14 @@ class GeoContextQGISPlugin:
         self.canvas = self.iface.mapCanvas()
         self.point_tool = QgsMapToolEmitPoint(self.canvas)  # Enables the cursor tool for selecting locations
 
+        # Canvas click request in progress, and the most recent click waiting on it
+        self.request_task = None
+        self.pending_request = None
+
+        # All requests are performed using the shared (pooled) session of the API client
+        configure_api_session()
+        self.client = ApiClient()
+
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
         """Get the translation for a string using Qt translation API.
@@ -254,6 +259,9 @@ class GeoContextQGISPlugin:
 
         self.initProcessing()
 
+        # The registry lists are refreshed in the background, so they are up to date once the panel opens
+        get_registry_catalogue().refresh()
+
         # Trigger for when the user clicks in the canvas when the panel is open and the cursor is active
         self.point_tool.canvasClicked.connect(self.canvas_click)
 
@@ -273,6 +281,7 @@ class GeoContextQGISPlugin:
 
         self.pluginIsActive = False
         self.canvas.unsetMapTool(self.point_tool)  # Disables the cursor tool
+        self.cancel_point_requests()
 
     def unload(self):
         """Removes the plugin menu item and icon from QGIS GUI."""
@@ -288,6 +297,10 @@ class GeoContextQGISPlugin:
 
         QgsApplication.processingRegistry().removeProvider(self.provider)
 
+        # Closes the pooled connections and the query cache
+        ApiClient.close_session()
+        close_query_caches()
+
     def run(self):
         """Run method that loads and starts the plugin"""
 
@@ -302,6 +315,7 @@ class GeoContextQGISPlugin:
             if self.dockwidget == None:
                 # Create the dockwidget (after translation) and keep reference
                 self.dockwidget = GeoContextQGISPluginDockWidget(self.canvas, self.point_tool, self.iface)
+                self.dockwidget.pointRequested.connect(self.queue_point_request)  # Fetch button requests
 
             # connect to provide cleanup on closing of dockwidget
             self.dockwidget.closingPlugin.connect(self.onClosePlugin)
@@ -319,14 +333,13 @@ class GeoContextQGISPlugin:
         """
 
         dialog = OptionsDialog(self.iface)
+        # The session is configured using the new settings once saved
+        dialog.settingsChanged.connect(configure_api_session)
         result = dialog.exec_()
 
         # The user saved the changes to the settings
         if result:
-            dialog.set_auto_clear()
-            dialog.set_dec_places_panel()
-            dialog.set_dec_places_tool()
-            dialog.set_request_coordinate_system()
+            dialog.save_settings()
         # The user closed the dialog without saving
         else:
             pass
@@ -363,59 +376,16 @@ class GeoContextQGISPlugin:
             # The user closed the dialog without saving
             pass
 
-    def point_request_panel(self, x, y, registry, key, api_url):
-        """Return the value retrieved from the ordered dictionary containing the requested data
-        from the server. This method is used by the docket widget panel of the plugin.
-
-        This method requests the data from the server for the given point coordinates.
-
-        :param x: Longitude coordinate
-        :type x: Float
-
-        :param y: Latitude coordinate
-        :type y: Float
-
-        :param registry: Service, Group or Collection
-        :type registry: String
-
-        :param key: The key which will be used to perform the request
-        :type key: String
-
-        :param api_url: Endpoint URL used to perform request
-        :type api_url: String
-
-        :returns: The value retrieved for the request for the provided location
-        :rtype: OrderedDict
-        """
-
-        url_request = api_url + "query?" + 'registry=' + registry.lower() + '&key=' + key + '&x=' + str(x) + '&y=' + str(y) + '&outformat=json'
-
-        # Attempts to perform a data request from the API server
-        try:
-            # STILL NEED TO ADD TOKEN HERE ===========================================================================================
-            client = ApiClient()
-            data = client.get(url_request)
-        except Exception as e:
-            error_msg = "Could not request " + url_request + ". Unknown error: " + str(e)
-            self.iface.messageBar().pushCritical("Request error: ", error_msg)
-            print(str(e))
-
-            data = None  # Nothing to return
-
-        return data
-
     def canvas_click(self, point_tool):
         """
         This method is called when the plugin docket panel is open and the user clicks
         in the canvas. The method will then request the selected data at the selected location.
+        The request is performed in a background task, so QGIS does not block while waiting.
 
         :param point_tool: The QGIS tool object used to retrieve point coordinates from the canvas
         :type point_tool: QgsMapToolEmitPoint
         """
 
-        settings = QgsSettings()
-        api_url = settings.value('geocontext-qgis-plugin/url')
-
         # The coordinates from the QGIS canvas point tool
         x = point_tool[0]  # Longitude
         y = point_tool[1]  # Latitude
@@ -430,107 +400,91 @@ class GeoContextQGISPlugin:
         self.dockwidget.lineLong.setValue(float(x))
         self.dockwidget.lineLat.setValue(float(y))
 
-        # Request starts
-        start = time.time()
-
-        # Performs a point data request from the server
-        current_key_name = self.dockwidget.cbKey.currentText()
-        registry = self.dockwidget.cbRegistry.currentText()  # Service, group or collection
-
-        key_name = self.dockwidget.cbKey.currentText()  # Key name, e.g. Elevation
-        data = None
-        table = None
-        # The key will be empty when there were no option to select from (e.g. could not connect the server)
-        if key_name != "":
-            dict_key = self.dockwidget.find_name_info(key_name, registry)  # Key
-            key = dict_key['key']
-            data = self.point_request_panel(x, y, registry, key, API_DEFAULT_URL)
-
-            index = self.dockwidget.tabResults.currentIndex()
-            table = self.dockwidget.tables[index]
-
-        # Checks whether the request has been successful. None indicates unsuccessful
-        if data is not None:
-            data = data.json()  # Retrieves the json data from the API response
-
-            # Request ends
-            end = time.time()
-            rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_panel', 3, type=int)
-            request_time_ms = round((end - start) * 1000, rounding_factor)
-            self.dockwidget.lblRequestTime.setText("Request time (ms): " + str(request_time_ms))
-
-            registry = self.dockwidget.cbRegistry.currentText()
-            # Service option
-            if registry == SERVICE['name']:
-                # If set in the option's dialog, the table will automatically be cleared
-                auto_clear_table = settings.value('geocontext-qgis-plugin/auto_clear_table', False, type=bool)
-                if auto_clear_table:
-                    self.dockwidget.clear_results_table()
-
-                point_value_str = data[VALUE_JSON]  # Retrieves the value
-                rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_panel', 3, type=int)
-                point_value_str = apply_decimal_places_to_float_panel(point_value_str, rounding_factor)
-
-                # Updates/adds the value to the docking panel table
-                qlist_widget = self.dockwidget.tabResults.currentWidget()
-                row_index = qlist_widget.count()
-                qlist_widget.insertItem(row_index, str(point_value_str))
-
-                # Updates the QTableWidget stores the data
-                table.insertRow(0)  # Always add at the top of the table
-                table.setItem(0, 0, QTableWidgetItem(current_key_name))  # Sets the key in the table
-                table.setItem(0, 1, QTableWidgetItem(str(point_value_str)))  # Sets the value in the table
-                table.setItem(0, 2, QTableWidgetItem(str(x)))  # Latitude
-                table.setItem(0, 3, QTableWidgetItem(str(y)))  # Longitude
-
-            # Group option
-            elif registry == GROUP['name']:
-                # group_name = data['name']
-                list_dict_services = data[SERVICE_JSON]  # Service files for a group
-                for dict_service in list_dict_services:
-                    # key = dict_service['key']
-                    point_value_str = dict_service[VALUE_JSON]
-                    rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_panel', 3, type=int)
-                    point_value_str = apply_decimal_places_to_float_panel(point_value_str, rounding_factor)
-
-                    service_key_name = dict_service['name']
-
-                    # Updates/adds the value to the docking panel table
-                    qlist_widget = self.dockwidget.tabResults.currentWidget()
-                    row_index = qlist_widget.count()
-                    qlist_widget.insertItem(row_index, str(point_value_str))
-
-                    table.insertRow(0)  # Always add at the top of the table
-                    table.setItem(0, 0, QTableWidgetItem(service_key_name))  # Sets the key in the table
-                    table.setItem(0, 1, QTableWidgetItem(str(point_value_str)))  # Sets the value in the table
-                    table.setItem(0, 2, QTableWidgetItem(str(x)))  # Latitude
-                    table.setItem(0, 3, QTableWidgetItem(str(y)))  # Longitude
-
-            # Collection option
-            elif registry == COLLECTION['name']:
-                # Each group contains a list of the 'Service' data associated with the group
-                list_dict_groups = data[GROUP_JSON]
-                for dict_group in list_dict_groups:
-                    # group_name = dict_group['name']
-                    list_dict_services = dict_group[SERVICE_JSON]  # Service files for a group
-                    for dict_service in list_dict_services:
-                        # key = dict_service['key']
-                        point_value_str = dict_service[VALUE_JSON]
-                        rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_panel', 3, type=int)
-                        point_value_str = apply_decimal_places_to_float_panel(point_value_str, rounding_factor)
-
-                        service_key_name = dict_service['name']
-
-                        # Updates/adds the value to the docking panel table
-                        qlist_widget = self.dockwidget.tabResults.currentWidget()
-                        row_index = qlist_widget.count()
-                        qlist_widget.insertItem(row_index, str(point_value_str))
-
-                        table.insertRow(0)  # Always add at the top of the table
-                        table.setItem(0, 0, QTableWidgetItem(service_key_name))  # Sets the key in the table
-                        table.setItem(0, 1, QTableWidgetItem(str(point_value_str)))  # Sets the value in the table
-                        table.setItem(0, 2, QTableWidgetItem(str(x)))  # Latitude
-                        table.setItem(0, 3, QTableWidgetItem(str(y)))  # Longitude
-        else:  # Request were unsuccessful
-            error_msg = "Could not perform data request. Check if the URL is available."
-            self.iface.messageBar().pushCritical("Request error: ", error_msg)
+        request = self.dockwidget.create_point_request(x, y)
+        if request is None:
+            return
+
+        # Performs a point data request from the server in the background
+        self.queue_point_request(request)
+
+    def queue_point_request(self, request):
+        """Starts a background task for the request. If a request is already in progress, the request
+        will be performed once it is done. Only the most recent waiting request is kept, so clicks made
+        while waiting are coalesced into a single request.
+
+        :param request: The request details: x, y, registry, key, key_name and model
+        :type request: dict
+        """
+
+        if self.request_task is not None:
+            self.pending_request = request
+            return
+
+        self.request_task = PointRequestTask(request, get_settings().api_url)
+        self.request_task.requestFinished.connect(self.point_request_finished)
+        QgsApplication.taskManager().addTask(self.request_task)
+
+    def cancel_point_requests(self):
+        """Cancels the request in progress and any waiting request.
+        """
+
+        self.pending_request = None
+        if self.request_task is not None:
+            self.request_task.cancel()
+
+    def point_request_finished(self, task):
+        """This method is called in the main thread when a request task is done. The results are added
+        to the docking panel and the waiting request, if any, is started.
+
+        :param task: The finished request task
+        :type task: PointRequestTask
+        """
+
+        self.request_task = None
+
+        if task.isCanceled():
+            pass  # Results are discarded
+        elif task.data is None:  # Request were unsuccessful
+            self.iface.messageBar().pushCritical("Request error: ", task.error_msg)
+        elif self.dockwidget is not None:
+            self.add_point_results(task.request, task.data, task.request_time_ms)
+
+        if self.pending_request is not None:
+            request = self.pending_request
+            self.pending_request = None
+            self.queue_point_request(request)
+
+    def add_point_results(self, request, data, request_time_ms):
+        """Adds the values of a request to the docking panel list and table.
+
+        :param request: The request details: x, y, registry, key, key_name and model
+        :type request: dict
+
+        :param data: The data received for the request
+        :type data: dict
+
+        :param request_time_ms: Time the request took
+        :type request_time_ms: float
+        """
+
+        settings = get_settings()
+
+        x = request['x']
+        y = request['y']
+        current_key_name = request['key_name']
+        if request['model'] not in self.dockwidget.result_models:
+            # The tab has been removed while the request were in progress
+            return
+        index = self.dockwidget.result_models.index(request['model'])  # Tabs before it may have been removed
+
+        rounding_factor = settings.dec_places_panel
+        request_time_ms = round(request_time_ms, rounding_factor)
+        self.dockwidget.lblRequestTime.setText("Request time (ms): " + str(request_time_ms))
+        self.dockwidget.lblCacheStats.setText(cache_statistics_text())
+
+        # If set in the option's dialog, the table will automatically be cleared
+        if settings.auto_clear_table:
+            self.dockwidget.clear_results_table(index)
+
+        # Updates/adds the values to the docking panel list and table
+        self.dockwidget.add_results(index, request['registry'], current_key_name, data, x, y, rounding_factor)
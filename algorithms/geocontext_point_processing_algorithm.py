@@ -36,7 +36,7 @@ import inspect
 import time
 import httplib2
 
-from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.PyQt.QtCore import QCoreApplication
 from qgis.PyQt.QtGui import QIcon
 from qgis.core import (QgsProcessing,
                        QgsFeatureSink,
@@ -45,12 +45,13 @@ from qgis.core import (QgsProcessing,
                        QgsProcessingParameterFileDestination,
                        QgsProcessingParameterString,
                        QgsProcessingParameterEnum,
-                       QgsVectorLayer,
-                       QgsField,
-                       QgsSettings)
+                       QgsProcessingParameterNumber,
+                       QgsProcessingParameterBoolean,
+                       QgsProcessingParameterDefinition,
+                       QgsPointXY,
+                       QgsVectorLayer)
 
 import requests
-from requests import exceptions
 
 # Adds the plugin core path to the system path
 cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
@@ -59,7 +60,6 @@ sys.path.insert(0, parentdir)
 
 from bridge_api.api_abstract import ApiClient
 from bridge_api.default import (
-    API_DEFAULT_URL,
     SERVICE,
     GROUP,
     COLLECTION,
@@ -68,7 +68,14 @@ from bridge_api.default import (
     TOOL_KEY,
     TOOL_FIELD_NAME,
     TOOL_OUTPUT_POINT_LAYER,
-    SITE_URL
+    TOOL_MAX_CONCURRENT_REQUESTS,
+    TOOL_DEFAULT_CONCURRENT_REQUESTS,
+    TOOL_MAXIMUM_CONCURRENT_REQUESTS,
+    TOOL_WRITE_CHUNK_SIZE,
+    TOOL_DEFAULT_WRITE_CHUNK_SIZE,
+    TOOL_SNAP_TOLERANCE,
+    TOOL_DEFAULT_SNAP_TOLERANCE,
+    TOOL_RESUME,
 )
 
 # Adds the plugin core path to the system path
@@ -77,17 +84,23 @@ parentdir = os.path.dirname(cur_dir)
 sys.path.insert(0, parentdir)
 
 from utilities.utilities import (
-    process_point,
-    convert_multipart_to_singlepart,
-    create_vector_file,
+    request_values,
+    explode_points,
+    transform_coordinates,
     get_request_crs,
     get_registry_from_index,
-    service_data_value,
-    group_data_values,
-    collection_data_values,
-    create_new_field,
-    apply_decimal_places_to_float_tool,
-    check_connection
+    registry_service_keys
+)
+from utilities.registry_catalogue import get_registry_catalogue
+from utilities.plugin_settings import get_settings
+from utilities.feature_writer import FeatureWriter
+from utilities.result_schema import ResultSchema
+from utilities.point_grouping import PointGrouper
+from utilities.checkpoint import ProcessingCheckpoint
+from utilities.request_engine import (
+    ordered_concurrent_requests,
+    timed_request,
+    SharedRequests
 )
 
 
@@ -111,18 +124,13 @@ class GeocontextPointProcessingAlgorithm(QgsProcessingAlgorithm):
         with some other properties.
         """
 
-        available, error_msg = check_connection(SITE_URL)
-        if available:
-            # Gets the lists of available service, group and collection layers
-            self.list_service = self.retrieve_registry_list(API_DEFAULT_URL, SERVICE['key'])  # Service
-            self.list_group = self.retrieve_registry_list(API_DEFAULT_URL, GROUP['key'])  # Group
-            self.list_collection = self.retrieve_registry_list(API_DEFAULT_URL, COLLECTION['key'])  # Collection
-        else:
-            # Site is unavailable
-            print(error_msg)
-            self.list_service = []
-            self.list_group = []
-            self.list_collection = []
+        # The registry lists are shared by all of the algorithm instances and loaded from the cache
+        # on disk, so no requests are made when the toolbox or the dialog opens. The lists are
+        # refreshed in the background by the plugin
+        catalogue = get_registry_catalogue()
+        self.list_service = list(catalogue.registry_list(SERVICE['key']))  # Service
+        self.list_group = list(catalogue.registry_list(GROUP['key']))  # Group
+        self.list_collection = list(catalogue.registry_list(COLLECTION['key']))  # Collection
 
         self.addParameter(
             QgsProcessingParameterFeatureSource(
@@ -175,142 +183,257 @@ class GeocontextPointProcessingAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                TOOL_MAX_CONCURRENT_REQUESTS,
+                self.tr(TOOL_MAX_CONCURRENT_REQUESTS),
+                type=QgsProcessingParameterNumber.Integer,
+                defaultValue=TOOL_DEFAULT_CONCURRENT_REQUESTS,
+                minValue=1,
+                maxValue=TOOL_MAXIMUM_CONCURRENT_REQUESTS
+            )
+        )
+
+        # Number of features of which the values are written to the output file per commit
+        param_chunk_size = QgsProcessingParameterNumber(
+            TOOL_WRITE_CHUNK_SIZE,
+            self.tr(TOOL_WRITE_CHUNK_SIZE),
+            type=QgsProcessingParameterNumber.Integer,
+            defaultValue=TOOL_DEFAULT_WRITE_CHUNK_SIZE,
+            minValue=1
+        )
+        param_chunk_size.setFlags(param_chunk_size.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        self.addParameter(param_chunk_size)
+
+        # Points within this distance of each other share a single request
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                TOOL_SNAP_TOLERANCE,
+                self.tr(TOOL_SNAP_TOLERANCE),
+                type=QgsProcessingParameterNumber.Double,
+                defaultValue=TOOL_DEFAULT_SNAP_TOLERANCE,
+                minValue=0
+            )
+        )
+
+        # Continues an interrupted run using the checkpoint stored in the output file
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                TOOL_RESUME,
+                self.tr(TOOL_RESUME),
+                defaultValue=False
+            )
+        )
+
     def processAlgorithm(self, parameters, context, feedback):
-        """Processes the point vector layer provided as input.
+        """Processes the point vector layer provided as input. The input features are read,
+        split into single points, requested and written to the output file in a single pass.
         """
-        input_points = self.parameterAsVectorLayer(parameters, TOOL_INPUT_POINT_LAYER, context)  # QgsVectorLayer
+        source = self.parameterAsSource(parameters, TOOL_INPUT_POINT_LAYER, context)  # QgsProcessingFeatureSource
         registry_index = int(self.parameterAsString(parameters, TOOL_REGISTRY, context))  # Integer
         key_index = int(self.parameterAsString(parameters, TOOL_KEY, context))  # Integer
-        field_name = self.parameterAsString(parameters, TOOL_FIELD_NAME, context)  # String
         output_points = self.parameterAsFileOutput(parameters, TOOL_OUTPUT_POINT_LAYER, context)  # String
-
-        settings = QgsSettings()
-        rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_panel', 3, type=int)
-
-        if input_points.featureCount() <= 0:
+        max_requests = self.parameterAsInt(parameters, TOOL_MAX_CONCURRENT_REQUESTS, context)  # Integer
+        write_chunk_size = self.parameterAsInt(parameters, TOOL_WRITE_CHUNK_SIZE, context)  # Integer
+        snap_tolerance = self.parameterAsDouble(parameters, TOOL_SNAP_TOLERANCE, context)  # Float (metres)
+        resume = self.parameterAsBool(parameters, TOOL_RESUME, context)  # Boolean
+
+        # The settings are read once, and kept for the whole run
+        settings = get_settings()
+        api_url = settings.api_url  # Base request URL
+        rounding_factor = settings.dec_places_panel
+        tool_rounding_factor = settings.dec_places_tool
+
+        total = source.featureCount()  # Total number of features
+        if total <= 0:
             # If the layer contains no features, processing will be stopped
-            msg = 'ADD VECTOR LAYER DIRECTORY HERE!'
-            # self.iface.messageBar().pushCritical("Vector layer contains no features: ", msg)
-            return
-        else:
-            layer_crs = get_request_crs()
-            success, input_new, msg = create_vector_file(input_points, output_points, layer_crs)
-            if not success:
-                # If file creation has been unsuccessful, processing will not continue
-                # self.iface.messageBar().pushCritical("Vector file creation error: ", msg)
-                return
-
-            input_type = input_points.wkbType()  # Vector type for input
-            if input_type == 4:  # If a multipoint layer, otherwise skipped
-                convert_multipart_to_singlepart(input_new)
-
-            layer_provider = input_new.dataProvider()
-            list_points = input_new.getFeatures()  # List of point features contained by the layer
-            total = input_new.featureCount()  # Total number of features
-            completed = 0  # Used to update the progress bar
-            for point in list_points:
-                # Stop the algorithm if cancel button has been clicked
-                if feedback.isCanceled():
-                    feedback.pushInfo("Operation canceled by user.")
-                    break
+            feedback.reportError("The input layer contains no features.")
+            return {}
+
+        # Gets the registry and data key
+        dict_registry = get_registry_from_index(registry_index)
+        dict_key = self.find_name_info(key_index, dict_registry['key'])
+        if dict_key is None:
+            # The registry lists has not been retrieved from the server yet
+            feedback.reportError("The {} list is not available. Check the connection to the server.".format(
+                dict_registry['name']))
+            return {}
+
+        # An interrupted run is continued if the output file contains its checkpoint
+        checkpoint = ProcessingCheckpoint(output_points, dict_registry['key'], dict_key['key'])
+        completed_ids = set()  # Points completed by a previous run
+        if resume:
+            if os.path.exists(output_points) and checkpoint.can_resume():
+                completed_ids = checkpoint.completed_fids()
+                feedback.pushInfo("Resuming: {} points has already been completed.".format(len(completed_ids)))
+            else:
+                feedback.pushInfo("No checkpoint of a {} run found in the output file, starting a new run.".format(
+                    dict_key['name']))
+                resume = False
+            checkpoint.close()
+
+        # The output file is created once the first features are written. When resuming,
+        # the remaining features are added to the existing file
+        request_crs = get_request_crs()  # GeoContext request needs to be in WGS84
+        source_crs = source.sourceCrs()
+        transform_context = context.transformContext()
+        writer = FeatureWriter(
+            output_points,
+            source.fields(),
+            request_crs,
+            transform_context,
+            write_chunk_size,
+            checkpoint,
+            append=resume
+        )
 
-                # Gets the registry and data key
-                dict_registry = get_registry_from_index(registry_index)
-                dict_key = self.find_name_info(key_index, dict_registry['key'])
-
-                # Request starts
-                start = time.time()
-
-                # Retrieves the data from the server
-                data_json = process_point(point, dict_registry['key'], dict_key['key'], field_name)
-
-                # This list will store the data. All cases will be
-                # services as it will no longer split it into groups/collections
-                list_data = []
-                if dict_registry['key'] == SERVICE['key']:
-                    list_data = service_data_value(data_json)
-                elif dict_registry['key'] == GROUP['key']:
-                    list_data = group_data_values(data_json)
-                elif dict_registry['key'] == COLLECTION['key']:
-                    list_data = collection_data_values(data_json)
-                else:
-                    print("UNKNOWN REGISTRY")
-
-                if len(list_data) <= 0:
-                    # No data received from the server
+        # The result fields are known prior to processing if the registry describes its services.
+        # Otherwise the schema will be created from the first response instead
+        list_field_names = registry_service_keys(dict_registry['key'], dict_key)
+        if list_field_names:
+            writer.set_schema(ResultSchema(dict_registry['key'], list_field_names, tool_rounding_factor))
+
+        # Points at the same location (within the snapping tolerance) share a single request. The
+        # groups are kept as long as their results are shared, so memory does not grow with the points
+        grouper = PointGrouper(snap_tolerance, settings.shared_results)
+
+        # Request timings recorded from here on are summarised in the log once processing stopped
+        metrics_start = time.time()
+
+        def request_location(x, y):
+            # Retrieves the values from the server. Called from the worker threads. Once the
+            # schema is known, only the values of the schema fields are decoded
+            schema = writer.schema
+            keys = set(schema.index) if schema is not None else None
+            return request_values(dict_registry['key'], dict_key['key'], x, y, keys, api_url)
+
+        shared_requests = SharedRequests(request_location, settings.shared_results)
+
+        def located_points(batch):
+            # Transforms the points of a batch to WGS84 using a single transform call (e.g. for
+            # layers in projected coordinate systems), and finds the location group of each point
+            list_located = [item for item in batch if item[3] is not None]
+            if source_crs != request_crs and len(list_located) > 0:
+                list_x, list_y = transform_coordinates(
+                    [item[3].x() for item in list_located],
+                    [item[3].y() for item in list_located],
+                    source_crs,
+                    request_crs,
+                    transform_context
+                )
+                dict_points = {item[0]: QgsPointXY(x, y) for item, x, y in zip(list_located, list_x, list_y)}
+            else:
+                dict_points = {item[0]: item[3] for item in list_located}
+
+            for point_id, feature_number, feature, point in batch:
+                group = None
+                point = dict_points.get(point_id)
+                if point is not None:
+                    group, is_new = grouper.find_group(point.x(), point.y())
+                yield point_id, feature_number, feature, point, group
+
+        def list_points():
+            # Reads the features and splits multipart features into single points. Each
+            # point is identified by its position, which is used by the checkpoint
+            point_id = 0
+            batch = []
+            for feature_number, feature in enumerate(source.getFeatures()):
+                for point in explode_points(feature):
+                    if point_id not in completed_ids:
+                        batch.append((point_id, feature_number, feature, point))
+                    point_id = point_id + 1
+
+                if len(batch) >= settings.transform_batch_size:
+                    for item in located_points(batch):
+                        yield item
+                    batch = []
+
+            for item in located_points(batch):
+                yield item
+
+        def request_point(item):
+            group = item[4]
+            if group is None:
+                # Point has no geometry, therefore no request is performed
+                return None
+            return shared_requests(group, group.x, group.y)
+
+        # Requests are performed concurrently, but the results are received in the order of the points.
+        # Up to max_requests are in flight, fewer while the server throttles, fails or slows down
+        list_results = ordered_concurrent_requests(
+            timed_request(request_point),
+            list_points(),
+            max_requests,
+            feedback.isCanceled,
+            ApiClient.concurrency
+        )
+        incomplete = False  # True if any of the points did not receive data
+        empty_count = 0  # Points for which the server returned no data
+        finished = False  # False if processing stopped due to an error
+        try:
+            for (point_id, feature_number, feature, point, group), result, error in list_results:
+                if error is not None:
+                    # The request for this point failed, the remaining points will still be processed
+                    feedback.reportError("Request failed for feature {}: {}".format(feature.id(), str(error)))
+                    incomplete = True
+                    continue
+
+                list_values, request_time_ms = result
+                request_time_ms = round(request_time_ms, rounding_factor)
+
+                if list_values is not None:
+                    if len(list_values) == 0:
+                        # No data received from the server, the point is written with empty values
+                        feedback.reportError("No data received for feature {}, its values are empty.".format(
+                            feature.id()))
+                        empty_count = empty_count + 1
+                    elif not writer.has_schema():
+                        writer.set_schema(ResultSchema.from_values(
+                            dict_registry['key'], list_values, tool_rounding_factor))
+
+                # Adds the values to the columns of the writer, which writes them to the file in chunks
+                if not writer.add_feature(point_id, feature.attributes(), point, list_values):
+                    feedback.reportError(writer.error_msg)
+                    incomplete = True
                     break
-                else:  # List contains data, processing can continue
-                    # Creates a list of fields which will be added to the attribute table
-                    list_attributes = []
-                    for service_data in list_data:
-                        field_name = service_data['key']
-                        list_attributes.append(QgsField(field_name, QVariant.String))
-
-                    # Adds all the new fields to the attribute table
-                    input_new.startEditing()
-                    layer_provider.addAttributes(list_attributes)
-                    input_new.updateFields()
-                    input_new.updateFeature(point)
-                    input_new.commitChanges()
-
-                    # Updates all the attribute values
-                    for service_data in list_data:
-                        field_name = service_data['key']
-                        data_value = service_data['value']
-                        data_value = apply_decimal_places_to_float_tool(data_value, rounding_factor)
-
-                        # Updates the attribute value
-                        input_new.startEditing()
-                        input_new.changeAttributeValue(point.id(),
-                                                       layer_provider.fieldNameIndex(field_name),
-                                                       data_value)
-                        input_new.commitChanges()
-
-                # Request ends
-                end = time.time()
-                request_time_ms = round((end - start) * 1000, rounding_factor)
 
                 # Update the progress bar
-                completed = completed + 1
-                feedback.setProgress(int((completed / total) * 100))
+                feedback.setProgress(int(((feature_number + 1) / total) * 100))
                 feedback.setProgressText("{} request (ms): {}".format(dict_registry['name'], str(request_time_ms)))
-
-            if not feedback.isCanceled():
-                print("CREATE FILE HERE")
-
-            # Return the results of the algorithm
-            return {TOOL_OUTPUT_POINT_LAYER: output_points}
-
-    def retrieve_registry_list(self, api_url, registry):
-        """Return a list of available layers for the provided registry.
-
-        :param api_url: API URL for doing requests
-        :type api_url: str
-
-        :param registry: Registry type: Service, group or collection
-        :type registry: str
-
-        :returns: A list of available data in json format
-        :rtype: list
-        """
-        request_url = "{}/registries?registry={}".format(api_url, registry)
-        try:
-            client = ApiClient()
-            response = client.get(request_url)
-            list_json = response.json()
-        except exceptions.ConnectionError:  # Could not connect to the provided URL
-            error_msg = "Could not connect to " + request_url +\
-                        ". Check if the provided URL is correct. The site may also be down."
-            #self.iface.messageBar().pushCritical("Connection error: ", error_msg)
-
-            list_json = []
-        except Exception as e:  # Other possible connection issues
-            error_msg = "Could not connect to " + request_url + ". Unknown error: " + str(e)
-            #self.iface.messageBar().pushCritical("Connection error: ", error_msg)
-
-            list_json = []
-
-        return list_json
+            else:
+                finished = True
+        finally:
+            # Writes the remaining features. Completed points are kept and recorded
+            # in the checkpoint if canceled, or if processing stopped due to an error
+            if not writer.close():
+                feedback.reportError(writer.error_msg)
+                incomplete = True
+
+            if finished and not incomplete and not feedback.isCanceled():
+                # All of the points has been completed, the checkpoint is no longer required
+                checkpoint.remove()
+            checkpoint.close()
+
+        if empty_count > 0:
+            feedback.reportError("No data were received for {} points, which were written with empty values.".format(
+                empty_count))
+
+        if len(writer.ignored_field_names) > 0:
+            feedback.reportError("Fields not in the result schema were not added: {}".format(
+                ', '.join(sorted(writer.ignored_field_names))))
+
+        for line in ApiClient.metrics.summary_lines(since=metrics_start):
+            feedback.pushInfo(line)
+        feedback.pushInfo("Concurrent requests sustained by the server: {}".format(
+            min(max_requests, ApiClient.concurrency.limit)))
+
+        if feedback.isCanceled():
+            feedback.pushInfo("Operation canceled by user. Use the resume option to continue processing.")
+        elif incomplete:
+            feedback.pushInfo("Not all of the points were completed. Use the resume option to request them again.")
+
+        # Return the results of the algorithm
+        return {TOOL_OUTPUT_POINT_LAYER: output_points}
 
     def find_name_info(self, index, registry):
         """The method finds the key ID of a provided drop down box index.
@@ -321,15 +444,19 @@ class GeocontextPointProcessingAlgorithm(QgsProcessingAlgorithm):
         :param registry: The registry type selected by the user in the panel
         :type registry: String
 
-        :returns: The dictionary of the selected key
+        :returns: The dictionary of the selected key; or None if the index is not in the list
         :rtype: Dict
         """
+        list_registry = []
         if registry == SERVICE['key']:
-            return self.list_service[index]
+            list_registry = self.list_service
         elif registry == GROUP['key']:
-            return self.list_group[index]
+            list_registry = self.list_group
         elif registry == COLLECTION['key']:
-            return self.list_collection[index]
+            list_registry = self.list_collection
+
+        if 0 <= index < len(list_registry):
+            return list_registry[index]
 
         return None
 
@@ -0,0 +1,256 @@
+# coding=utf-8
+"""Benchmark of the request, parse and write hot path.
+
+Requests are answered by the local stand-in GeoContext server used by the
+tests (test/mock_geocontext_server.py), with a configurable latency per
+request, so that no requests are made to the GeoContext servers. The
+following are timed on synthetic data of 1k, 10k and 100k points:
+
+- request_data, called concurrently by the request engine;
+- decoding the responses into the columns of the result schema;
+- export_table, to CSV and GeoPackage; and
+- the processing tool (processAlgorithm), on a memory point layer.
+
+For each, the throughput (points per second) and the peak Python memory
+(tracemalloc) are reported. Run from the plugin directory using the Python
+of a QGIS installation:
+
+    python benchmarks/benchmark_hot_path.py --sizes 1000 10000 100000 --latency 0.005
+
+The settings are stored separately from the QGIS profile settings, and the
+query cache is disabled unless --cache is provided.
+"""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+# Widgets (the table export) are created without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (
+    QgsApplication,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsSettings,
+    QgsVectorLayer
+)
+
+plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, plugin_dir)
+sys.path.insert(0, os.path.join(plugin_dir, 'test'))
+
+from mock_geocontext_server import MockGeoContextServer, query_response
+
+# Extent of the synthetic points (South Africa)
+EXTENT = (16.0, -35.0, 33.0, -22.0)
+
+REGISTRIES = ['service', 'group', 'collection']
+
+
+def random_points(count, seed=0):
+    """Returns random coordinates within the extent.
+
+    :returns: List of (x, y) coordinates
+    :rtype: list
+    """
+
+    random.seed(seed)
+    return [(random.uniform(EXTENT[0], EXTENT[2]), random.uniform(EXTENT[1], EXTENT[3])) for i in range(count)]
+
+
+def measure(name, count, function, *args):
+    """Runs a benchmark and prints its throughput and peak memory.
+
+    :param name: Name of the benchmark
+    :type name: str
+
+    :param count: Number of points processed by the benchmark
+    :type count: int
+
+    :param function: Function which performs the benchmark
+    :type function: function
+    """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:<36} {:>8} {:>10.2f} s {:>12.0f} points/s {:>10.1f} MiB'.format(
+        name, count, duration, count / duration, peak / (1024.0 * 1024.0)))
+
+
+def benchmark_request_data(registry, key, points, max_requests):
+    from utilities.utilities import request_data
+    from utilities.request_engine import ordered_concurrent_requests
+
+    def request(point):
+        return request_data(registry, key, point[0], point[1])
+
+    for point, result, error in ordered_concurrent_requests(request, points, max_requests):
+        if error is not None:
+            raise error
+
+
+def benchmark_result_columns(registry, list_responses, chunk_size=1000):
+    from bridge_api.json_decoder import extract_values
+    from utilities.result_schema import ResultSchema
+
+    schema = ResultSchema.from_values(registry, extract_values(list_responses[0]))
+    columns = schema.new_columns(chunk_size)
+    for content in list_responses:
+        columns.append_values(extract_values(content))
+        if columns.size >= chunk_size:
+            list(columns.rows())
+            columns.clear()
+
+
+def create_result_table(points):
+    """Creates the results of a docking panel tab with a row per point."""
+
+    from utilities.result_store import ResultStore
+
+    store = ResultStore()
+    for x, y in points:
+        store.append('Altitude', str(round(x + y, 3)), x, y)
+
+    return store
+
+
+def benchmark_export_table(store, output_file):
+    from utilities.utilities import export_table
+
+    success, msg = export_table(output_file, store)
+    if not success:
+        raise RuntimeError(msg)
+
+
+def create_point_layer(points):
+    """Creates a memory point layer with a feature per point."""
+
+    layer = QgsVectorLayer('Point?crs=EPSG:4326&field=id:integer', 'points', 'memory')
+    list_features = []
+    for i, (x, y) in enumerate(points):
+        feature = QgsFeature(layer.fields())
+        feature.setAttributes([i])
+        feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+        list_features.append(feature)
+    layer.dataProvider().addFeatures(list_features)
+
+    return layer
+
+
+def benchmark_processing(layer, registry_index, output_file, max_requests):
+    import processing
+    from algorithms.geocontext_point_processing_algorithm import GeocontextPointProcessingAlgorithm
+    from bridge_api.default import (
+        TOOL_INPUT_POINT_LAYER,
+        TOOL_REGISTRY,
+        TOOL_KEY,
+        TOOL_FIELD_NAME,
+        TOOL_OUTPUT_POINT_LAYER,
+        TOOL_MAX_CONCURRENT_REQUESTS
+    )
+
+    algorithm = GeocontextPointProcessingAlgorithm().create()
+    processing.run(algorithm, {
+        TOOL_INPUT_POINT_LAYER: layer,
+        TOOL_REGISTRY: registry_index,
+        TOOL_KEY: 0,
+        TOOL_FIELD_NAME: '',
+        TOOL_OUTPUT_POINT_LAYER: output_file,
+        TOOL_MAX_CONCURRENT_REQUESTS: max_requests
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the request, parse and write hot path.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Numbers of points')
+    parser.add_argument('--latency', type=float, default=0.005, help='Server latency per request (seconds)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Maximum concurrent requests')
+    parser.add_argument('--registries', nargs='+', default=REGISTRIES, choices=REGISTRIES, help='Registries to request')
+    parser.add_argument('--cache', action='store_true', help='Enables the query cache')
+    parser.add_argument('--export-gpkg-limit', type=int, default=10000,
+                        help='GeoPackage table exports are only timed up to this number of points')
+    args = parser.parse_args()
+
+    # Keeps the benchmark settings separate from the QGIS profile
+    QCoreApplication.setOrganizationName('GeoContextBenchmark')
+    QCoreApplication.setApplicationName('GeoContextBenchmark')
+    qgs = QgsApplication([], True)
+    qgs.initQgis()
+
+    from processing.core.Processing import Processing
+    Processing.initialize()
+
+    from utilities.utilities import reset_query_cache, close_query_caches
+    from utilities.plugin_settings import invalidate_settings
+    from utilities.registry_catalogue import get_registry_catalogue, REGISTRY_KEYS
+
+    temp_dir = tempfile.mkdtemp()
+    with MockGeoContextServer(latency=args.latency) as server:
+        settings = QgsSettings()
+        settings.setValue('geocontext-qgis-plugin/url', server.url)
+        settings.setValue('geocontext-qgis-plugin/cache_enabled', args.cache)
+        invalidate_settings()
+        reset_query_cache()
+
+        # The processing tool reads the keys from the registry catalogue
+        catalogue = get_registry_catalogue()
+        for registry in REGISTRY_KEYS:
+            catalogue.registries[registry] = [
+                {'key': key, 'name': key.title()} for key in server.registries[registry]]
+
+        print('Server latency: {} s, concurrency: {}, cache: {}'.format(
+            args.latency, args.concurrency, 'enabled' if args.cache else 'disabled'))
+        print('{:<36} {:>8} {:>12} {:>21} {:>14}'.format('Benchmark', 'Points', 'Time', 'Throughput', 'Peak memory'))
+
+        for size in args.sizes:
+            points = random_points(size)
+
+            for registry_index, registry in enumerate(REGISTRIES):
+                if registry not in args.registries:
+                    continue
+                key = server.registries[registry][0]
+
+                measure('request_data ({})'.format(registry), size,
+                        benchmark_request_data, registry, key, points, args.concurrency)
+
+                list_responses = [json.dumps(query_response(registry, key, x, y)) for x, y in points]
+                measure('ResultColumns.append_values ({})'.format(registry), size,
+                        benchmark_result_columns, registry, list_responses)
+
+                layer = create_point_layer(points)
+                output_file = os.path.join(temp_dir, 'processing_{}_{}.gpkg'.format(registry, size))
+                measure('processAlgorithm ({})'.format(registry), size,
+                        benchmark_processing, layer, registry_index, output_file, args.concurrency)
+
+            table = create_result_table(points)
+            measure('export_table (csv)', size,
+                    benchmark_export_table, table, os.path.join(temp_dir, 'table_{}.csv'.format(size)))
+            if size <= args.export_gpkg_limit:
+                measure('export_table (gpkg)', size,
+                        benchmark_export_table, table, os.path.join(temp_dir, 'table_{}.gpkg'.format(size)))
+
+    close_query_caches()
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    qgs.exitQgis()
+
+
+if __name__ == '__main__':
+    main()
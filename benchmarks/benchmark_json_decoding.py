@@ -0,0 +1,121 @@
+# coding=utf-8
+"""Benchmark of the decoding of large collection responses.
+
+Compares the previous decoding path (the standard library json module,
+followed by reading the services of the decoded response) with orjson, if
+installed, and with extract_values, which reads the service keys and values
+(using orjson if installed). The responses are synthetic collections with
+a configurable number of groups and services per group. Run from the plugin
+directory (QGIS is not required):
+
+    python benchmarks/benchmark_json_decoding.py --responses 1000 --groups 10 --services 20 --selected 5
+"""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bridge_api.json_decoder import orjson, extract_values
+from utilities.result_schema import response_services
+
+
+def collection_content(index, groups, services):
+    """Returns the content of a synthetic collection response, as sent by the server.
+
+    :rtype: bytes
+    """
+
+    data = {
+        'key': 'collection',
+        'name': 'Collection',
+        'description': 'Synthetic collection of {} groups'.format(groups),
+        'groups': [{
+            'key': 'group_{}'.format(group),
+            'name': 'Group {}'.format(group),
+            'services': [{
+                'key': 'service_{}_{}'.format(group, service),
+                'name': 'Service {} {}'.format(group, service),
+                'description': 'Synthetic service',
+                'units': 'm',
+                'value': str(round(index * 0.001 + group + service * 0.1, 6))
+            } for service in range(services)]
+        } for group in range(groups)]
+    }
+
+    return json.dumps(data).encode('utf-8')
+
+
+def decode_json(list_content):
+    # The previous decoding path
+    for content in list_content:
+        data_json = json.loads(content)
+        [(service['key'], service['value']) for service in response_services('collection', data_json)]
+
+
+def decode_orjson(list_content):
+    for content in list_content:
+        data_json = orjson.loads(content)
+        [(service['key'], service['value']) for service in response_services('collection', data_json)]
+
+
+def decode_extract_values(list_content, keys=None):
+    for content in list_content:
+        extract_values(content, keys)
+
+
+def measure(name, list_content, function, *args):
+    """Runs a benchmark and prints its throughput.
+
+    :param name: Name of the benchmark
+    :type name: str
+
+    :param list_content: Responses decoded by the benchmark
+    :type list_content: list
+
+    :param function: Function which performs the benchmark
+    :type function: function
+    """
+
+    start = time.perf_counter()
+    function(list_content, *args)
+    duration = time.perf_counter() - start
+    size = sum(len(content) for content in list_content) / (1024.0 * 1024.0)
+
+    print('{:<36} {:>8} {:>10.3f} s {:>12.0f} responses/s {:>10.1f} MiB/s'.format(
+        name, len(list_content), duration, len(list_content) / duration, size / duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the decoding of large collection responses.')
+    parser.add_argument('--responses', type=int, default=1000, help='Number of responses')
+    parser.add_argument('--groups', type=int, default=10, help='Groups per collection')
+    parser.add_argument('--services', type=int, default=20, help='Services per group')
+    parser.add_argument('--selected', type=int, default=5, help='Services of which the values are decoded')
+    args = parser.parse_args()
+
+    list_content = [collection_content(i, args.groups, args.services) for i in range(args.responses)]
+    selected_keys = {'service_0_{}'.format(service) for service in range(args.selected)}
+
+    print('Response size: {:.1f} KiB, services: {}, selected: {}'.format(
+        len(list_content[0]) / 1024.0, args.groups * args.services, len(selected_keys)))
+    print('{:<36} {:>8} {:>12} {:>24} {:>16}'.format('Benchmark', 'Count', 'Time', 'Throughput', 'Bytes'))
+
+    measure('json.loads', list_content, decode_json)
+    if orjson is not None:
+        measure('orjson.loads', list_content, decode_orjson)
+    else:
+        print('orjson is not installed')
+    measure('extract_values (all keys)', list_content, decode_extract_values)
+    measure('extract_values (selected keys)', list_content, decode_extract_values, selected_keys)
+
+
+if __name__ == '__main__':
+    main()
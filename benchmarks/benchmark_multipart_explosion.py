@@ -0,0 +1,129 @@
+# coding=utf-8
+"""Benchmark of the multipart to singlepart conversion.
+
+Compares the bulk convert_multipart_to_singlepart with the previous
+implementation, which edited the layer through the edit buffer, removed the
+multipart features one at a time and renumbered every feature afterwards.
+
+Run from the plugin directory using the Python of a QGIS installation:
+
+    python benchmarks/benchmark_multipart_explosion.py --features 100000 --parts 3
+"""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import time
+import random
+import argparse
+
+from qgis.core import (
+    QgsApplication,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsVectorLayer
+)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.utilities import convert_multipart_to_singlepart
+
+
+def convert_multipart_to_singlepart_edit_buffer(mp_layer):
+    """The previous implementation, kept as the baseline of the benchmark."""
+
+    feature_count = mp_layer.featureCount()
+    features_to_remove = []
+
+    if feature_count > 0:
+        mp_layer.startEditing()
+        for mp_feat in mp_layer.getFeatures():
+            geom = mp_feat.geometry()
+            if geom.isMultipart():
+                new_features = []
+                temp_feature = QgsFeature(mp_feat)
+                features_to_remove.append(mp_feat.id())
+
+                for mp_part in geom.asGeometryCollection():
+                    temp_feature.setGeometry(mp_part)
+                    new_features.append(QgsFeature(temp_feature))
+                mp_layer.addFeatures(new_features)
+
+        for feat_to_remove_id in features_to_remove:
+            mp_layer.deleteFeature(feat_to_remove_id)
+
+        new_index = 0
+        for new_feat in mp_layer.getFeatures():
+            mp_layer.changeAttributeValue(new_feat.id(), 0, new_index)
+
+            new_index = new_index + 1
+
+        mp_layer.commitChanges()
+
+
+def create_multipoint_layer(feature_count, part_count, seed=0):
+    """Creates a memory layer of multipoint features at random locations.
+
+    :param feature_count: Number of multipoint features
+    :type feature_count: int
+
+    :param part_count: Number of points per feature
+    :type part_count: int
+
+    :returns: The layer
+    :rtype: QgsVectorLayer
+    """
+
+    random.seed(seed)
+    layer = QgsVectorLayer('MultiPoint?crs=EPSG:4326&field=id:integer&field=name:string', 'multipoints', 'memory')
+
+    list_features = []
+    for i in range(feature_count):
+        points = [QgsPointXY(random.uniform(16.0, 33.0), random.uniform(-35.0, -22.0)) for j in range(part_count)]
+        feature = QgsFeature(layer.fields())
+        feature.setAttributes([i, 'feature {}'.format(i)])
+        feature.setGeometry(QgsGeometry.fromMultiPointXY(points))
+        list_features.append(feature)
+    layer.dataProvider().addFeatures(list_features)
+
+    return layer
+
+
+def run_benchmark(name, convert_function, feature_count, part_count):
+    layer = create_multipoint_layer(feature_count, part_count)
+
+    start = time.perf_counter()
+    convert_function(layer)
+    duration = time.perf_counter() - start
+
+    expected = feature_count * part_count
+    if layer.featureCount() != expected:
+        raise RuntimeError('{} created {} features, expected {}'.format(name, layer.featureCount(), expected))
+
+    print('{:<14} {:>10.2f} s {:>12.0f} features/s'.format(name, duration, feature_count / duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the multipart to singlepart conversion.')
+    parser.add_argument('--features', type=int, default=100000, help='Number of multipoint features')
+    parser.add_argument('--parts', type=int, default=3, help='Number of points per feature')
+    parser.add_argument('--skip-baseline', action='store_true', help='Only runs the bulk conversion')
+    args = parser.parse_args()
+
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+
+    print('{} multipoint features with {} parts'.format(args.features, args.parts))
+    run_benchmark('bulk', convert_multipart_to_singlepart, args.features, args.parts)
+    if not args.skip_baseline:
+        run_benchmark('edit buffer', convert_multipart_to_singlepart_edit_buffer, args.features, args.parts)
+
+    qgs.exitQgis()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# coding=utf-8
+"""Benchmark of the GeoPackage export of docking panel tables.
+
+Compares the bulk export_table, which writes the file once from the results of
+a tab, with the previous implementation, which read the rows from a
+QTableWidget, committed an edit session and rewrote the whole GeoPackage for
+every row. The previous implementation takes quadratic time,
+so it is only run on the first --baseline-rows rows of the table.
+
+Run from the plugin directory using the Python of a QGIS installation:
+
+    python benchmarks/benchmark_table_export.py --rows 10000 --baseline-rows 1000
+"""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+# The table is created without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.PyQt.QtWidgets import QTableWidget, QTableWidgetItem
+from qgis.core import (
+    QgsApplication,
+    QgsCoordinateReferenceSystem,
+    QgsFeature,
+    QgsField,
+    QgsGeometry,
+    QgsPointXY,
+    QgsVectorLayer
+)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.utilities import export_table, create_vector_file
+from utilities.result_store import ResultStore
+from bridge_api.default import TABLE_DATA_TYPE, TABLE_VALUE, TABLE_LONG, TABLE_LAT, COORDINATE_SYSTEM
+
+
+def export_table_per_row(output_file, table):
+    """The previous GeoPackage export, kept as the baseline of the benchmark."""
+
+    new_layer = QgsVectorLayer("Point", "temporary_points", "memory")
+    layer_provider = new_layer.dataProvider()
+
+    new_layer.startEditing()
+    layer_provider.addAttributes([
+        QgsField(TABLE_DATA_TYPE['file'], QVariant.String),
+        QgsField(TABLE_VALUE['file'], QVariant.String),
+        QgsField(TABLE_LONG['file'], QVariant.Double),
+        QgsField(TABLE_LAT['file'], QVariant.Double)])
+    new_layer.updateFields()
+    new_layer.commitChanges()
+
+    success, msg = False, ''
+    i = table.rowCount() - 1
+    while i >= 0:
+        key = table.item(i, 0).text()
+        value = table.item(i, 1).text()
+        x = float(table.item(i, 2).text())
+        y = float(table.item(i, 3).text())
+
+        new_layer.startEditing()
+        new_feat = QgsFeature()
+        new_feat.setAttributes([key, value, x, y])
+        new_feat.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+        layer_provider.addFeatures([new_feat])
+        new_layer.commitChanges()
+
+        target_crs = QgsCoordinateReferenceSystem(COORDINATE_SYSTEM)
+        success, created_layer, msg = create_vector_file(new_layer, output_file, target_crs)
+
+        i = i - 1
+
+    return success, msg
+
+
+def create_result_rows(row_count, seed=0):
+    """Creates rows with random values at random locations, from the oldest to the most recent.
+
+    :param row_count: Number of rows
+    :type row_count: int
+
+    :returns: (Data type, value, longitude, latitude) of each row
+    :rtype: list
+    """
+
+    random.seed(seed)
+    return [
+        ('Altitude', str(round(random.uniform(0, 3000), 3)), random.uniform(16.0, 33.0), random.uniform(-35.0, -22.0))
+        for i in range(row_count)
+    ]
+
+
+def create_result_store(row_count):
+    """Creates the results of a docking panel tab.
+
+    :returns: The results
+    :rtype: ResultStore
+    """
+
+    store = ResultStore()
+    for key, value, x, y in create_result_rows(row_count):
+        store.append(key, value, x, y)
+
+    return store
+
+
+def create_result_table(row_count):
+    """Creates a table as filled by the previous docking panel, the most recent row at the top.
+
+    :returns: The table
+    :rtype: QTableWidget
+    """
+
+    list_rows = create_result_rows(row_count)
+    table = QTableWidget()
+    table.setColumnCount(4)
+    table.setHorizontalHeaderLabels(['Data type', 'Value', 'Longitude', 'Latitude'])
+    table.setRowCount(row_count)
+    for i, (key, value, x, y) in enumerate(reversed(list_rows)):
+        table.setItem(i, 0, QTableWidgetItem(key))
+        table.setItem(i, 1, QTableWidgetItem(value))
+        table.setItem(i, 2, QTableWidgetItem(str(x)))
+        table.setItem(i, 3, QTableWidgetItem(str(y)))
+
+    return table
+
+
+def run_benchmark(name, create_function, export_function, row_count, output_file):
+    results = create_function(row_count)
+
+    start = time.perf_counter()
+    success, msg = export_function(output_file, results)
+    duration = time.perf_counter() - start
+    if not success:
+        raise RuntimeError('{} failed: {}'.format(name, msg))
+
+    layer = QgsVectorLayer(output_file, 'exported')
+    if layer.featureCount() != row_count:
+        raise RuntimeError('{} wrote {} features, expected {}'.format(name, layer.featureCount(), row_count))
+
+    print('{:<14} {:>8} {:>10.2f} s {:>12.0f} rows/s'.format(name, row_count, duration, row_count / duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the GeoPackage export of docking panel tables.')
+    parser.add_argument('--rows', type=int, default=10000, help='Number of table rows')
+    parser.add_argument('--baseline-rows', type=int, default=1000,
+                        help='Number of rows exported by the previous implementation. 0 skips the baseline')
+    args = parser.parse_args()
+
+    qgs = QgsApplication([], True)
+    qgs.initQgis()
+
+    temp_dir = tempfile.mkdtemp()
+    run_benchmark('bulk', create_result_store, export_table, args.rows, os.path.join(temp_dir, 'bulk.gpkg'))
+    if args.baseline_rows > 0:
+        run_benchmark('per row', create_result_table, export_table_per_row, min(args.rows, args.baseline_rows),
+                      os.path.join(temp_dir, 'per_row.gpkg'))
+
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    qgs.exitQgis()
+
+
+if __name__ == '__main__':
+    main()
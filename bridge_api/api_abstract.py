@@ -2,8 +2,50 @@
 """Abstract class implementation of Bridge API Interface.
 """
 import os
-
-from requests import get, post
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from requests import Session
+from requests.exceptions import ConnectionError, Timeout
+from urllib3.util.retry import Retry
+
+from .default import (
+    CONNECTION_POOL_SIZE,
+    CONNECTION_MAX_RETRIES,
+    CONNECTION_BACKOFF_FACTOR,
+    CONNECTION_MAX_BACKOFF,
+    CONNECTION_RETRY_STATUS,
+    RATE_LIMIT,
+    AIMD_MINIMUM_REQUESTS,
+    AIMD_INCREASE,
+    AIMD_DECREASE,
+    AIMD_LATENCY_FACTOR,
+    TOOL_DEFAULT_CONCURRENT_REQUESTS,
+    TOOL_MAXIMUM_CONCURRENT_REQUESTS,
+    CONNECTION_TIMEOUT,
+    QUERY_ENDPOINT,
+    BATCH_QUERY_ENDPOINT,
+    BATCH_QUERY_CHUNK_SIZE,
+    METRICS_MAX_SAMPLES,
+    SERVICE
+)
+from .instrumentation import (
+    RequestMetrics,
+    TimedHTTPAdapter,
+    attempt_timings,
+    connection_timings,
+    reset_connection_timings,
+    start_attempt
+)
+from .json_decoder import loads
+from .rate_limit import (
+    AimdController,
+    TokenBucket,
+    backoff_delay,
+    retry_after_seconds
+)
 
 __copyright__ = "Copyright 2019, Kartoza"
 __license__ = "GPL version 3"
@@ -11,11 +53,47 @@ __email__ = "rohmat@kartoza.com"
 __revision__ = "$Format:%H$"
 
 
+class ApiError(Exception):
+    """The API responded with an error status, also after retrying."""
+
+    def __init__(self, status_code, url=''):
+        super(ApiError, self).__init__("The server responded with status {} for {}".format(status_code, url))
+        self.status_code = status_code
+        self.url = url
+
+
 class ApiClient(object):
     """Abstract class for API Client."""
 
     VERSION = 0
 
+    # A single session is shared by every client so that connections are
+    # kept alive and pooled between requests, instead of a new TCP/TLS
+    # connection being opened for every GeoContext query.
+    _session = None
+    _session_lock = threading.Lock()
+    _pool_size = CONNECTION_POOL_SIZE
+    _max_retries = CONNECTION_MAX_RETRIES
+    _backoff_factor = CONNECTION_BACKOFF_FACTOR
+
+    # Whether the batch query endpoint is available, per API url
+    _batch_support = {}
+
+    # Timings of the queries of every client, per registry and key
+    metrics = RequestMetrics(METRICS_MAX_SAMPLES)
+
+    # Requests per second of every client, and the adaptive number of concurrent
+    # bulk requests. Both learn from every request sent to the server
+    rate_limiter = TokenBucket(RATE_LIMIT)
+    concurrency = AimdController(
+        initial=TOOL_DEFAULT_CONCURRENT_REQUESTS,
+        minimum=AIMD_MINIMUM_REQUESTS,
+        maximum=TOOL_MAXIMUM_CONCURRENT_REQUESTS,
+        increase=AIMD_INCREASE,
+        decrease=AIMD_DECREASE,
+        latency_factor=AIMD_LATENCY_FACTOR
+    )
+
     def __init__(self, access_token='', endpoint_url=''):
         """Base class for API client.
 
@@ -64,6 +142,94 @@ class ApiClient(object):
             for protocol in ['http', 'https', 'ftp']:
                 self.proxy[protocol] = '%s://%s' % (protocol, proxy_url)
 
+    @classmethod
+    def configure_session(cls, pool_size=None, max_retries=None, backoff_factor=None):
+        """Set the connection pool size and retry policy of the shared session.
+
+        The current session is closed and a new one is created on the next
+        request if any of the values changed.
+
+        :param pool_size: Maximum number of connections kept alive per host.
+        :type pool_size: int
+
+        :param max_retries: Number of retries for failed connections and
+            gateway errors.
+        :type max_retries: int
+
+        :param backoff_factor: Backoff factor (seconds) between retries.
+        :type backoff_factor: float
+        """
+        with cls._session_lock:
+            new_pool_size = cls._pool_size if pool_size is None else max(1, int(pool_size))
+            new_max_retries = cls._max_retries if max_retries is None else max(0, int(max_retries))
+            new_backoff_factor = cls._backoff_factor if backoff_factor is None else float(backoff_factor)
+
+            changed = (
+                new_pool_size != cls._pool_size or
+                new_max_retries != cls._max_retries or
+                new_backoff_factor != cls._backoff_factor
+            )
+            cls._pool_size = new_pool_size
+            cls._max_retries = new_max_retries
+            cls._backoff_factor = new_backoff_factor
+
+            if changed and cls._session is not None:
+                cls._session.close()
+                cls._session = None
+
+    @classmethod
+    def session(cls):
+        """Returns the shared session, creating it on first use.
+
+        :return: Session with keep-alive connection pooling.
+        :rtype: requests.Session
+        """
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    cls._session = cls._create_session()
+        return cls._session
+
+    @classmethod
+    def close_session(cls):
+        """Closes the shared session and all of its pooled connections."""
+        with cls._session_lock:
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
+
+    @classmethod
+    def configure_rate_limit(cls, requests_per_second, burst=None):
+        """Set the maximum number of requests per second sent by all of the clients.
+
+        :param requests_per_second: Requests per second. 0 does not limit the rate.
+        :type requests_per_second: float
+
+        :param burst: Number of requests which can be sent at once after
+            being idle. Defaults to one second of requests.
+        :type burst: float
+        """
+        cls.rate_limiter.configure(requests_per_second, burst)
+
+    @classmethod
+    def _create_session(cls):
+        """Creates a session using the configured pool size. Failed requests
+        are retried by request() rather than by the connection pool.
+
+        :return: New session.
+        :rtype: requests.Session
+        """
+        adapter = TimedHTTPAdapter(
+            pool_connections=cls._pool_size,
+            pool_maxsize=cls._pool_size,
+            max_retries=Retry(0, read=False)
+        )
+
+        session = Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     @property
     def base_url(self):
         """Base url of the API.
@@ -84,6 +250,57 @@ class ApiClient(object):
             full_url = os.path.join(full_url, item)
         return full_url
 
+    def request(self, method, url, **kwargs):
+        """Performs a request, retrying failed connections, throttled requests
+        and gateway errors. Each attempt waits on the rate limiter. Retries are
+        delayed using exponential backoff with jitter, or for the time the
+        server asked for using Retry-After, in which case all of the clients
+        are paused. The outcome of each attempt is recorded by the adaptive
+        concurrency controller.
+
+        :param method: HTTP method, e.g. 'GET'.
+        :type method: str
+
+        :param url: API url.
+        :type url: str
+
+        :param kwargs: requests.request parameters
+        :type kwargs: dict
+
+        :return: The API response; the last response if all of the attempts were refused.
+        :rtype: response object
+        """
+        attempt = 0
+        delay = 0.0
+        while True:
+            wait = self.rate_limiter.acquire()
+            start_attempt((delay + wait) * 1000, attempt)
+
+            start = time.perf_counter()
+            try:
+                response = self.session().request(method, url, proxies=self.proxy, **kwargs)
+            except (ConnectionError, Timeout):
+                self.concurrency.record((time.perf_counter() - start) * 1000, False)
+                if attempt >= self._max_retries:
+                    raise
+                delay = backoff_delay(attempt, self._backoff_factor, CONNECTION_MAX_BACKOFF)
+            else:
+                retry = response.status_code in CONNECTION_RETRY_STATUS
+                self.concurrency.record(response.elapsed.total_seconds() * 1000, not retry)
+                if not retry or attempt >= self._max_retries:
+                    return response
+
+                delay = retry_after_seconds(response, CONNECTION_MAX_BACKOFF)
+                if delay is not None:
+                    # The server is overloaded, other requests wait as well
+                    self.rate_limiter.pause(delay)
+                else:
+                    delay = backoff_delay(attempt, self._backoff_factor, CONNECTION_MAX_BACKOFF)
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
     def get(self, url, **kwargs):
         """Fetch JSON response from get request to the API.
 
@@ -99,11 +316,11 @@ class ApiClient(object):
         if kwargs.get('headers'):
             kwargs['headers'].update(self.headers)
 
-        response = get(url, proxies=self.proxy, **kwargs)
-        return response
+        return self.request('GET', url, **kwargs)
 
     def post(self, url, **kwargs):
-        """Fetch JSON response from post request to the API.
+        """Fetch JSON response from post request to the API. Queries are
+        read-only, so posted queries are retried like get requests.
 
         :param url: API url.
         :type url: str
@@ -117,8 +334,240 @@ class ApiClient(object):
         if kwargs.get('headers'):
             kwargs['headers'].update(self.headers)
 
-        response = post(url, proxies=self.proxy, **kwargs)
-        return response
+        return self.request('POST', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        """Performs a head request, e.g. to check if the API is available.
+
+        :param url: API url.
+        :type url: str
+
+        :param kwargs: requests.head parameters
+        :type kwargs: dict
+
+        :return: The API response.
+        :rtype: response object
+        """
+        return self.request('HEAD', url, **kwargs)
+
+    def query(self, registry, key, x, y, **kwargs):
+        """Performs a query for a single point.
+
+        :param registry: Registry: Service, group or collection
+        :type registry: str
+
+        :param key: Key of the requested data
+        :type key: str
+
+        :param x: Longitude coordinate
+        :type x: float
+
+        :param y: Latitude coordinate
+        :type y: float
+
+        :param kwargs: requests.get parameters
+        :type kwargs: dict
+
+        :return: The API response.
+        :rtype: response object
+        """
+        params = {
+            'registry': registry.lower(),
+            'key': key,
+            'x': x,
+            'y': y,
+            'outformat': 'json'
+        }
+        kwargs.setdefault('timeout', CONNECTION_TIMEOUT)
+        return self.get(self.full_url(QUERY_ENDPOINT), params=params, **kwargs)
+
+    def query_data(self, registry, key, x, y, decoder=loads):
+        """Performs a query for a single point and parses the response. The
+        phases of the request are recorded in the metrics of the client.
+
+        :param registry: Registry: Service, group or collection
+        :type registry: str
+
+        :param key: Key of the requested data
+        :type key: str
+
+        :param x: Longitude coordinate
+        :type x: float
+
+        :param y: Latitude coordinate
+        :type y: float
+
+        :param decoder: Decodes the response content. Defaults to decoding the full JSON document.
+        :type decoder: function
+
+        :return: The response data (None unless the status is 200) and the response status code.
+        :rtype: tuple
+        """
+        reset_connection_timings()
+        start = time.perf_counter()
+        try:
+            response = self.query(registry, key, x, y)
+        except Exception:
+            attempt_start, wait_ms, retries = attempt_timings()
+            self.metrics.record(
+                registry, key, status=None, retries=retries,
+                total_ms=(time.perf_counter() - start) * 1000, wait_ms=wait_ms)
+            raise
+        end = time.perf_counter()
+
+        # Error responses, e.g. an overloaded server, are not necessarily JSON
+        parse_start = time.perf_counter()
+        try:
+            data = decoder(response.content) if response.status_code == 200 else None
+        finally:
+            parse_ms = (time.perf_counter() - parse_start) * 1000
+
+            # Elapsed is measured from the start of the last attempt until its headers were received
+            attempt_start, wait_ms, retries = attempt_timings()
+            dns_ms, connect_ms = connection_timings()
+            headers_ms = response.elapsed.total_seconds() * 1000
+            self.metrics.record(
+                registry,
+                key,
+                status=response.status_code,
+                size=len(response.content),
+                retries=retries,
+                total_ms=(end - start) * 1000 + parse_ms,
+                wait_ms=wait_ms,
+                dns_ms=dns_ms,
+                connect_ms=connect_ms,
+                ttfb_ms=max(0.0, headers_ms - dns_ms - connect_ms),
+                download_ms=max(0.0, (end - attempt_start) * 1000 - headers_ms),
+                parse_ms=parse_ms
+            )
+
+        return data, response.status_code
+
+    def query_point(self, registry, key, x, y):
+        """Performs a query for a single point and returns the response data.
+
+        :return: The response data; None if the request failed.
+        :rtype: dict
+        """
+        try:
+            data, status_code = self.query_data(registry, key, x, y)
+        except Exception:  # Connection error or invalid response
+            return None
+
+        if status_code != 200:
+            return None
+        return data
+
+    def post_batch(self, registry, key, points):
+        """Performs a single batch query request.
+
+        :param registry: Registry: Service, group or collection
+        :type registry: str
+
+        :param key: Key of the requested data
+        :type key: str
+
+        :param points: List of (x, y) coordinates
+        :type points: list
+
+        :return: The API response.
+        :rtype: response object
+        """
+        payload = {
+            'registry': registry.lower(),
+            'key': key,
+            'points': [[x, y] for x, y in points],
+            'outformat': 'json'
+        }
+        return self.post(
+            self.full_url(BATCH_QUERY_ENDPOINT), json=payload, timeout=CONNECTION_TIMEOUT)
+
+    def supports_batch_query(self, refresh=False):
+        """Checks whether the API provides the batch query endpoint. An empty
+        batch is requested, and the result is kept for the API url.
+
+        :param refresh: Probe the API again, even if the result is known.
+        :type refresh: bool
+
+        :return: True if batch queries can be performed.
+        :rtype: bool
+        """
+        if not refresh and self.base_url in self._batch_support:
+            return self._batch_support[self.base_url]
+
+        try:
+            response = self.post_batch(SERVICE['key'], '', [])
+            supported = response.status_code == 200 and 'results' in response.json()
+        except Exception:  # Endpoint not available or not a JSON response
+            supported = False
+
+        ApiClient._batch_support[self.base_url] = supported
+        return supported
+
+    def query_batch(self, registry, key, points, chunk_size=BATCH_QUERY_CHUNK_SIZE, max_requests=None):
+        """Performs a query for multiple points. The points are requested in
+        chunks using the batch endpoint. If the API does not provide the batch
+        endpoint, or a batch request fails, the points are requested using
+        concurrent single point queries instead.
+
+        :param registry: Registry: Service, group or collection
+        :type registry: str
+
+        :param key: Key of the requested data
+        :type key: str
+
+        :param points: (x, y) coordinates of the points
+        :type points: iterable
+
+        :param chunk_size: Maximum number of points per batch request.
+        :type chunk_size: int
+
+        :param max_requests: Maximum number of concurrent single point
+            queries. Defaults to the connection pool size.
+        :type max_requests: int
+
+        :return: The response data of each point, in the order of the points.
+            None for points of which the request failed.
+        :rtype: list
+        """
+        points = list(points)
+        chunk_size = max(1, int(chunk_size))
+        if max_requests is None:
+            max_requests = self._pool_size
+
+        if not self.supports_batch_query():
+            return self.query_points(registry, key, points, max_requests)
+
+        results = []
+        for i in range(0, len(points), chunk_size):
+            chunk = points[i:i + chunk_size]
+            try:
+                response = self.post_batch(registry, key, chunk)
+                chunk_results = loads(response.content)['results'] if response.status_code == 200 else None
+            except Exception:  # Connection error or invalid response
+                chunk_results = None
+
+            if chunk_results is None or len(chunk_results) != len(chunk):
+                chunk_results = self.query_points(registry, key, chunk, max_requests)
+            results.extend(chunk_results)
+
+        return results
+
+    def query_points(self, registry, key, points, max_requests):
+        """Performs concurrent single point queries.
+
+        :return: The response data of each point, in the order of the points.
+            None for points of which the request failed.
+        :rtype: list
+        """
+        if len(points) == 0:
+            return []
+
+        def request(point):
+            return self.query_point(registry, key, point[0], point[1])
+
+        with ThreadPoolExecutor(max_workers=max(1, int(max_requests))) as executor:
+            return list(executor.map(request, points))
 
     def get_content(self, url, params=None):
         """Get the response content.
@@ -132,7 +581,7 @@ class ApiClient(object):
         :return: Response content.
         :rtype: bytes
         """
-        response = get(
+        response = self.session().get(
             url, headers=self.headers, params=params, proxies=self.proxy,
             stream=True)
         return response.content
@@ -20,9 +20,45 @@ COLLECTION = {
 }
 
 COORDINATE_SYSTEM = "EPSG:4326"
+REQUEST_CRS = "WGS84 (EPSG:4326)"  # Request coordinate system option of the options dialog
+DECIMAL_PLACES = 3  # Decimal places of the panel and processing tool values
+TRANSFORM_CACHE_CONTEXTS = 4  # Number of project transform contexts for which transforms are kept, per CRS pair
 
 CONNECTION_TIMEOUT = 3
 
+# Shared HTTP session used by the API client
+CONNECTION_POOL_SIZE = 10  # Number of keep-alive connections per host
+CONNECTION_MAX_RETRIES = 3  # Retries for failed connections, throttled requests and gateway errors
+CONNECTION_BACKOFF_FACTOR = 0.3  # Sleep between retries: random up to {backoff factor} * (2 ** {retry number})
+CONNECTION_MAX_BACKOFF = 30  # Maximum sleep (seconds) between retries, also when asked by Retry-After
+CONNECTION_RETRY_STATUS = [429, 502, 503, 504]  # Response status codes which will be retried
+
+# Requests per second sent to the API by all of the clients. 0 does not limit the rate
+RATE_LIMIT = 0
+
+# Adaptive number of concurrent requests (additive increase, multiplicative decrease)
+AIMD_MINIMUM_REQUESTS = 1
+AIMD_INCREASE = 1  # Requests added once a limit's worth of requests succeeded
+AIMD_DECREASE = 0.5  # Factor applied when requests are throttled, fail or slow down
+AIMD_LATENCY_FACTOR = 2.0  # Average latency relative to the lowest latency which counts as slowing down
+
+# Query endpoints, relative to the API URL
+QUERY_ENDPOINT = 'query'  # Single point: query?registry=..&key=..&x=..&y=..
+BATCH_QUERY_ENDPOINT = 'query/batch'  # Multiple points in a single POST request, if available on the server
+BATCH_QUERY_CHUNK_SIZE = 100  # Maximum number of points per batch request
+
+# Persistent query cache. Stored in the QGIS profile directory
+CACHE_DIRECTORY = 'geocontext'
+CACHE_FILE_NAME = 'query_cache.sqlite'
+CACHE_TTL = 604800  # Seconds after which a cached response expires (7 days)
+CACHE_MAX_ENTRIES = 100000  # Least recently used entries are removed when exceeded
+CACHE_SNAP_DECIMALS = 5  # Coordinates are rounded to this many decimals (roughly 1 m) for the cache key
+REGISTRY_CACHE_FILE_NAME = 'registries.json'  # Service, group and collection lists
+PANEL_MEMORY_CACHE_SIZE = 256  # Number of recent panel responses kept in memory
+
+# Request instrumentation
+METRICS_MAX_SAMPLES = 10000  # Number of recent request timings kept per registry and key
+
 # JSON response variables
 VALUE_JSON = 'value'
 KEY_JSON = 'key'
@@ -37,6 +73,18 @@ TOOL_REGISTRY = 'Registry'
 TOOL_KEY = 'Key'
 TOOL_FIELD_NAME = 'Field name'
 TOOL_OUTPUT_POINT_LAYER = 'Output point layer'
+TOOL_MAX_CONCURRENT_REQUESTS = 'Maximum concurrent requests'
+TOOL_WRITE_CHUNK_SIZE = 'Features per commit'
+TOOL_SNAP_TOLERANCE = 'Snapping tolerance (m)'
+TOOL_RESUME = 'Resume an interrupted run'
+
+# Processing tool defaults
+TOOL_DEFAULT_CONCURRENT_REQUESTS = 8
+TOOL_MAXIMUM_CONCURRENT_REQUESTS = 64
+TOOL_DEFAULT_WRITE_CHUNK_SIZE = 1000
+TOOL_DEFAULT_SNAP_TOLERANCE = 0  # Only points at exactly the same location share a request
+TOOL_TRANSFORM_BATCH_SIZE = 1000  # Number of points transformed to WGS84 per call
+TOOL_SHARED_RESULTS = 10000  # Number of recent location results reused by later points at the same location
 
 # Graphs
 PLOT_LINE_WIDTH = 2
@@ -59,3 +107,4 @@ TABLE_LAT = {
     'table': 'Latitude',
     'file': 'lat'
 }
+TABLE_EXPORT_CHUNK_SIZE = 1000  # Number of rows added to the output file at a time
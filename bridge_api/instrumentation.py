@@ -0,0 +1,335 @@
+# coding=utf-8
+"""Request instrumentation of the API client.
+
+The connections of the shared session record the time spent resolving the
+host name and connecting, and the client records the remaining phases of each
+query: waiting on the rate limiter and retries, time to first byte, download
+and JSON parsing, together with the response status, response size, number of
+retries and whether the response came from a cache.
+RequestMetrics keeps the most recent records per registry and key, and
+summarises them as p50/p95/p99 percentiles.
+"""
+import csv
+import json
+import math
+import time
+import socket
+import threading
+
+from collections import deque, OrderedDict
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+__copyright__ = "Copyright 2022, Kartoza"
+__license__ = "GPL version 3"
+__revision__ = "$Format:%H$"
+
+# Phases of a request, in milliseconds
+PHASES = ['total', 'wait', 'dns', 'connect', 'ttfb', 'download', 'parse']
+PERCENTILES = [50, 95, 99]
+
+# Cache state of a record
+CACHE_MISS = 'miss'  # Requested from the server
+CACHE_HIT = 'hit'  # Persistent query cache
+CACHE_MEMORY = 'memory'  # In-memory cache of the panel
+
+# Connection phases of the request performed by the current thread
+_connection_timings = threading.local()
+
+
+def reset_connection_timings():
+    """Resets the phases of the current thread, prior to a request."""
+    _connection_timings.dns = 0.0
+    _connection_timings.connect = 0.0
+    _connection_timings.wait = 0.0
+    _connection_timings.retries = 0
+    _connection_timings.attempt_start = time.perf_counter()
+
+
+def start_attempt(wait_ms, retry):
+    """Records the start of an attempt of the request of the current thread.
+    Only the connection phases of the last attempt are kept.
+
+    :param wait_ms: Time (ms) waited on the rate limiter and retry backoff before the attempt.
+    :type wait_ms: float
+
+    :param retry: Number of the attempt, 0 for the first attempt.
+    :type retry: int
+    """
+    _connection_timings.dns = 0.0
+    _connection_timings.connect = 0.0
+    _connection_timings.wait = getattr(_connection_timings, 'wait', 0.0) + wait_ms
+    _connection_timings.retries = retry
+    _connection_timings.attempt_start = time.perf_counter()
+
+
+def connection_timings():
+    """Returns the connection phases of the last request of the current thread.
+    Both are 0 if a kept-alive connection were reused.
+
+    :return: Host name resolution and connection time (ms).
+    :rtype: tuple
+    """
+    return getattr(_connection_timings, 'dns', 0.0), getattr(_connection_timings, 'connect', 0.0)
+
+
+def attempt_timings():
+    """Returns the attempts of the last request of the current thread.
+
+    :return: Start (time.perf_counter) of the last attempt, time (ms) waited on the
+        rate limiter and retry backoff, and the number of retries.
+    :rtype: tuple
+    """
+    return (
+        getattr(_connection_timings, 'attempt_start', time.perf_counter()),
+        getattr(_connection_timings, 'wait', 0.0),
+        getattr(_connection_timings, 'retries', 0)
+    )
+
+
+class _TimedConnectionMixin(object):
+    """Records the time spent resolving the host name and connecting. The host name is
+    resolved once, here, and the connection is made to the resolved addresses.
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except (socket.gaierror, OSError):
+            addresses = []
+        _connection_timings.dns = getattr(_connection_timings, 'dns', 0.0) + (time.perf_counter() - start) * 1000
+
+        if len(addresses) == 0:
+            # The connection reports the resolution error
+            return super(_TimedConnectionMixin, self)._new_conn()
+
+        # Each address is tried in turn, as by the connection itself. The host name is still
+        # used for the TLS handshake, only the address connected to is replaced
+        error = None
+        try:
+            for family, socktype, proto, canonname, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super(_TimedConnectionMixin, self)._new_conn()
+                except ConnectTimeoutError as e:  # Also a failed connection (NewConnectionError)
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        start = time.perf_counter()
+        dns_before = getattr(_connection_timings, 'dns', 0.0)
+        super(_TimedConnectionMixin, self).connect()
+        dns_ms = getattr(_connection_timings, 'dns', 0.0) - dns_before
+
+        # Includes the TLS handshake for HTTPS connections
+        connect_ms = (time.perf_counter() - start) * 1000 - dns_ms
+        _connection_timings.connect = getattr(_connection_timings, 'connect', 0.0) + connect_ms
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Adapter of which the connections record their connection phases.
+    Connections through a proxy are not timed.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+
+def percentile(sorted_values, percent):
+    """Returns the nearest-rank percentile of sorted values.
+
+    :param sorted_values: Values in ascending order.
+    :type sorted_values: list
+
+    :param percent: Percentile, e.g. 95.
+    :type percent: int
+
+    :return: The percentile; None if there are no values.
+    :rtype: float
+    """
+    if len(sorted_values) == 0:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[max(0, min(rank, len(sorted_values)) - 1)]
+
+
+class RequestMetrics(object):
+    """Keeps the most recent request records per registry and key."""
+
+    def __init__(self, max_samples=10000):
+        """Constructor.
+
+        :param max_samples: Number of records kept per registry and key.
+        :type max_samples: int
+        """
+        self.max_samples = max(1, int(max_samples))
+        self.lock = threading.Lock()
+        self.records = OrderedDict()  # (registry, key): deque of records
+
+    def record(self, registry, key, status=None, size=0, cache=CACHE_MISS, retries=0, **phases):
+        """Adds the record of a request.
+
+        :param registry: Registry: Service, group or collection.
+        :type registry: str
+
+        :param key: Key of the requested data.
+        :type key: str
+
+        :param status: Response status code. None for cached responses.
+        :type status: int
+
+        :param size: Response size (bytes).
+        :type size: int
+
+        :param cache: CACHE_MISS, CACHE_HIT or CACHE_MEMORY.
+        :type cache: str
+
+        :param retries: Number of times the request was retried.
+        :type retries: int
+
+        :param phases: Time (ms) of each of the phases, e.g. total_ms=12.5.
+        :type phases: dict
+        """
+        entry = {
+            'time': time.time(),
+            'registry': registry.lower(),
+            'key': key,
+            'status': status,
+            'size': size,
+            'cache': cache,
+            'retries': retries
+        }
+        for phase in PHASES:
+            entry[phase + '_ms'] = phases.get(phase + '_ms', 0.0)
+
+        with self.lock:
+            samples = self.records.get((entry['registry'], key))
+            if samples is None:
+                samples = deque(maxlen=self.max_samples)
+                self.records[(entry['registry'], key)] = samples
+            samples.append(entry)
+
+    def samples(self, since=None):
+        """Returns the records, optionally only those made after a time.
+
+        :param since: Time (seconds since the epoch) from which records are returned.
+        :type since: float
+
+        :return: The records in the order they were made per registry and key.
+        :rtype: list
+        """
+        with self.lock:
+            list_records = [entry for samples in self.records.values() for entry in samples]
+        if since is not None:
+            list_records = [entry for entry in list_records if entry['time'] >= since]
+        return list_records
+
+    def summary(self, since=None):
+        """Summarises the records per registry and key.
+
+        :param since: Time (seconds since the epoch) from which records are summarised.
+        :type since: float
+
+        :return: Per registry and key: the number of requests, cache hits,
+            errors, retries and bytes received, and the p50/p95/p99 of each phase of the
+            requests performed on the server (e.g. total_p95).
+        :rtype: list
+        """
+        grouped = OrderedDict()
+        for entry in self.samples(since):
+            grouped.setdefault((entry['registry'], entry['key']), []).append(entry)
+
+        list_summary = []
+        for (registry, key), list_records in grouped.items():
+            list_requested = [entry for entry in list_records if entry['cache'] == CACHE_MISS]
+            row = OrderedDict([
+                ('registry', registry),
+                ('key', key),
+                ('requests', len(list_records)),
+                ('cache_hits', len(list_records) - len(list_requested)),
+                ('errors', len([entry for entry in list_requested if entry['status'] != 200])),
+                ('retries', sum(entry['retries'] for entry in list_requested)),
+                ('bytes', sum(entry['size'] for entry in list_requested))
+            ])
+            for phase in PHASES:
+                values = sorted(entry[phase + '_ms'] for entry in list_requested)
+                for percent in PERCENTILES:
+                    value = percentile(values, percent)
+                    row['{}_p{}'.format(phase, percent)] = None if value is None else round(value, 3)
+            list_summary.append(row)
+
+        return list_summary
+
+    def summary_lines(self, since=None):
+        """Returns a line of text per registry and key, e.g. for the processing log.
+
+        :return: Summary lines.
+        :rtype: list
+        """
+        list_lines = []
+        for row in self.summary(since):
+            line = "{} {}: {} requests, {} cache hits, {} errors, {} retries".format(
+                row['registry'], row['key'], row['requests'], row['cache_hits'], row['errors'], row['retries'])
+            if row['total_p50'] is not None:
+                line = "{}. Request (ms) p50/p95/p99: {}/{}/{}, TTFB p50: {}, parse p50: {}".format(
+                    line, row['total_p50'], row['total_p95'], row['total_p99'], row['ttfb_p50'], row['parse_p50'])
+            list_lines.append(line)
+        return list_lines
+
+    def export_csv(self, output_file, since=None):
+        """Writes the summary to a CSV file, with a row per registry and key.
+
+        :param output_file: Directory and file name of the CSV file.
+        :type output_file: str
+        """
+        list_summary = self.summary(since)
+        field_names = list(list_summary[0].keys()) if list_summary else ['registry', 'key', 'requests']
+        with open(output_file, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=field_names)
+            writer.writeheader()
+            writer.writerows(list_summary)
+
+    def export_json(self, output_file, since=None):
+        """Writes the summary, and each of the records, to a JSON file.
+
+        :param output_file: Directory and file name of the JSON file.
+        :type output_file: str
+        """
+        with open(output_file, 'w') as json_file:
+            json.dump({
+                'summary': self.summary(since),
+                'requests': self.samples(since)
+            }, json_file, indent=1)
+
+    def clear(self):
+        """Removes all of the records."""
+        with self.lock:
+            self.records.clear()
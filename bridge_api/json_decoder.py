@@ -0,0 +1,82 @@
+# coding=utf-8
+"""JSON decoding of the API responses.
+
+orjson is used to decode and encode responses when it is installed, otherwise
+the standard library json module is used.
+
+extract_values reads the key and value of each service of a service, group or
+collection response in a single pass, without the registry of the response,
+and leaves out the values of services which are not requested.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # The standard library decoder is used
+    orjson = None
+
+__copyright__ = "Copyright 2022, Kartoza"
+__license__ = "GPL version 3"
+__revision__ = "$Format:%H$"
+
+from .default import KEY_JSON, VALUE_JSON, SERVICE_JSON, GROUP_JSON
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(content):
+    """Decodes a JSON document.
+
+    :param content: JSON document, e.g. the content of a response.
+    :type content: bytes or str
+
+    :return: The decoded document.
+    :rtype: dict
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def dumps(data):
+    """Encodes data as a JSON document.
+
+    :param data: Data to encode.
+    :type data: dict
+
+    :return: JSON document.
+    :rtype: str
+    """
+    if orjson is not None:
+        return orjson.dumps(data).decode('utf-8')
+    return json.dumps(data)
+
+
+def extract_values(content, keys=None):
+    """Extracts the key and value of each service in a response, in the order of the response.
+
+    :param content: Content of a service, group or collection response.
+    :type content: bytes or str
+
+    :param keys: Service keys of which the values are returned. The values of
+        other services are returned as None. All values are returned if not provided.
+    :type keys: set
+
+    :return: (Service key, value) pairs.
+    :rtype: list
+    """
+    list_values = []
+    stack = [loads(content)]
+    while stack:
+        data = stack.pop()
+        if VALUE_JSON in data:
+            key = data.get(KEY_JSON)
+            if key is not None:
+                list_values.append((key, data[VALUE_JSON] if keys is None or key in keys else None))
+            continue
+
+        # Groups of a collection, or services of a group. Added in reverse as the last is popped first
+        children = data.get(GROUP_JSON) or data.get(SERVICE_JSON) or []
+        stack.extend(reversed(children))
+
+    return list_values
@@ -0,0 +1,250 @@
+# coding=utf-8
+"""Rate limiting, retry backoff and adaptive concurrency of the API client.
+
+TokenBucket limits the number of requests per second sent to the server, and
+pauses all of the requests when the server asks to retry after a time.
+AimdController adjusts the number of concurrent requests from the observed
+latency and errors: it is increased by a step while requests succeed at low
+latency, and halved once the server is throttling, failing or slowing down.
+"""
+import time
+import random
+import threading
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+__copyright__ = "Copyright 2022, Kartoza"
+__license__ = "GPL version 3"
+__revision__ = "$Format:%H$"
+
+
+def backoff_delay(attempt, backoff_factor, maximum):
+    """Returns the time to sleep before a retry: exponential backoff with full jitter,
+    so that concurrent requests which failed together are not retried together.
+
+    :param attempt: Number of the retry, starting at 0.
+    :type attempt: int
+
+    :param backoff_factor: Backoff factor (seconds).
+    :type backoff_factor: float
+
+    :param maximum: Maximum delay (seconds).
+    :type maximum: float
+
+    :return: Delay (seconds).
+    :rtype: float
+    """
+    return random.uniform(0, min(maximum, backoff_factor * (2 ** attempt)))
+
+
+def retry_after_seconds(response, maximum):
+    """Returns the time the server asked to wait using the Retry-After header,
+    given in seconds or as an HTTP date.
+
+    :param response: The API response.
+    :type response: response object
+
+    :param maximum: Maximum delay (seconds).
+    :type maximum: float
+
+    :return: Delay (seconds); None if the response has no valid header.
+    :rtype: float
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        seconds = (date - datetime.now(timezone.utc)).total_seconds()
+
+    return min(maximum, max(0.0, seconds))
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket. Each request takes a token; tokens are added at
+    a fixed rate up to the capacity of the bucket, which allows short bursts.
+    """
+
+    def __init__(self, rate=0, capacity=None):
+        """Constructor.
+
+        :param rate: Requests per second. 0 does not limit the rate.
+        :type rate: float
+
+        :param capacity: Maximum burst of requests. Defaults to one second of requests.
+        :type capacity: float
+        """
+        self.lock = threading.Lock()
+        self.paused_until = 0.0
+        self.configure(rate, capacity)
+
+    def configure(self, rate, capacity=None):
+        """Sets the rate and capacity. The bucket starts full.
+
+        :param rate: Requests per second. 0 does not limit the rate.
+        :type rate: float
+
+        :param capacity: Maximum burst of requests. Defaults to one second of requests.
+        :type capacity: float
+        """
+        with self.lock:
+            self.rate = max(0.0, float(rate))
+            self.capacity = max(1.0, float(capacity if capacity is not None else self.rate))
+            self.tokens = self.capacity
+            self.updated = time.monotonic()
+
+    def pause(self, seconds):
+        """No tokens are handed out for the given time, e.g. when the server responded with Retry-After.
+
+        :param seconds: Time (seconds) to pause.
+        :type seconds: float
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """Takes a token, waiting until one is available.
+
+        :return: Time waited (seconds).
+        :rtype: float
+        """
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.rate <= 0:
+                    return now - start
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - start
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AimdController(object):
+    """Additive increase, multiplicative decrease of the number of concurrent requests.
+
+    Requests hold a slot (acquire/release) while in flight, and the responses are
+    recorded. The limit is increased by a step once a limit's worth of requests
+    succeeded while all slots were in use. It is decreased when a request is
+    throttled (429), fails (5xx, connection error), or when the average latency
+    rises above the baseline latency by the latency factor, at most once per
+    average latency so that a single burst of errors only counts once.
+
+    The baseline follows the lowest average latency, and only drifts slowly
+    towards higher latencies, so that sustained slowness keeps being treated as
+    congestion while the server's normal latency may still change over time.
+    """
+
+    # Fraction of the difference by which the baseline moves towards a higher average latency
+    BASELINE_DRIFT = 0.01
+
+    def __init__(self, initial=8, minimum=1, maximum=64, increase=1, decrease=0.5, latency_factor=2.0):
+        """Constructor.
+
+        :param initial: Initial number of concurrent requests.
+        :type initial: int
+
+        :param minimum: Minimum number of concurrent requests.
+        :type minimum: int
+
+        :param maximum: Maximum number of concurrent requests.
+        :type maximum: int
+
+        :param increase: Requests added to the limit when increasing.
+        :type increase: int
+
+        :param decrease: Factor by which the limit is multiplied when decreasing.
+        :type decrease: float
+
+        :param latency_factor: Average latency relative to the baseline which is treated as congestion.
+        :type latency_factor: float
+        """
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.initial = initial
+        self.increase = max(1, int(increase))
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.reset()
+
+    def reset(self):
+        """Restores the initial limit and forgets the observed latency."""
+        with self.condition:
+            self.limit = min(self.maximum, max(self.minimum, int(self.initial)))
+            self.latency_ms = None  # Exponentially weighted average
+            self.baseline_ms = None  # Lowest average latency, slowly drifting upwards
+            self.successes = 0  # Since the limit last changed
+            self.saturated = False  # All slots were in use since the limit last changed
+            self.last_decrease = 0.0
+            self.condition.notify_all()
+
+    def acquire(self):
+        """Waits until a slot is available, and takes it."""
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.saturated = True
+                self.condition.wait()
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self.saturated = True
+
+    def release(self):
+        """Returns a slot."""
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def record(self, latency_ms, success):
+        """Records the outcome of a request, and adjusts the limit.
+
+        :param latency_ms: Time (ms) the request took.
+        :type latency_ms: float
+
+        :param success: False if the request was throttled or failed.
+        :type success: bool
+        """
+        with self.condition:
+            if success:
+                if self.latency_ms is None:
+                    self.latency_ms = latency_ms
+                else:
+                    self.latency_ms += 0.2 * (latency_ms - self.latency_ms)
+                if self.baseline_ms is None or self.latency_ms < self.baseline_ms:
+                    self.baseline_ms = self.latency_ms
+                else:
+                    self.baseline_ms += self.BASELINE_DRIFT * (self.latency_ms - self.baseline_ms)
+
+            congested = not success or self.latency_ms > self.baseline_ms * self.latency_factor
+            if congested:
+                now = time.monotonic()
+                if now - self.last_decrease >= (self.latency_ms or 0) / 1000.0:
+                    self.limit = max(self.minimum, int(self.limit * self.decrease))
+                    self.last_decrease = now
+                    self.successes = 0
+                    self.saturated = False
+                return
+
+            self.successes += 1
+            if self.successes >= self.limit and self.saturated and self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + self.increase)
+                self.successes = 0
+                self.saturated = False
+                self.condition.notify_all()
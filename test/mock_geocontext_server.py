@@ -0,0 +1,270 @@
+# coding=utf-8
+"""Local stand-in for the GeoContext API, used to test the plugin requests offline.
+
+The server answers the registries, single point query and (optionally) batch
+query endpoints with deterministic values, so that results can be checked.
+"""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import json
+import time
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+API_PATH = '/api/v2/'
+
+# Services returned for group and collection requests
+GROUP_SERVICES = ['altitude', 'rainfall']
+
+
+def point_value(key, x, y):
+    """Returns the value the server answers for a service at a location.
+
+    :param key: Service key
+    :type key: str
+
+    :param x: Longitude coordinate
+    :type x: float
+
+    :param y: Latitude coordinate
+    :type y: float
+
+    :returns: The value, as a string like the GeoContext API
+    :rtype: str
+    """
+
+    return str(round(len(key) + float(x) + float(y), 6))
+
+
+def service_response(key, x, y):
+    return {'key': key, 'name': key.title(), 'value': point_value(key, x, y)}
+
+
+def group_response(key, x, y):
+    return {
+        'key': key,
+        'name': key.title(),
+        'services': [service_response(service_key, x, y) for service_key in GROUP_SERVICES]
+    }
+
+
+def collection_response(key, x, y):
+    return {
+        'key': key,
+        'name': key.title(),
+        'groups': [group_response(key + '_group', x, y)]
+    }
+
+
+def query_response(registry, key, x, y):
+    """Returns the response of a query for a single point.
+
+    :returns: The response data; None if the registry is unknown
+    :rtype: dict
+    """
+
+    if registry == 'service':
+        return service_response(key, x, y)
+    elif registry == 'group':
+        return group_response(key, x, y)
+    elif registry == 'collection':
+        return collection_response(key, x, y)
+
+    return None
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MockGeoContextHandler(BaseHTTPRequestHandler):
+    """Handles the requests of the mock server."""
+
+    # Connections are kept alive, as by the GeoContext servers
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keeps the test output clean
+        pass
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        endpoint = url.path[len(API_PATH):] if url.path.startswith(API_PATH) else None
+
+        if endpoint == 'query':
+            if mock.count('query') <= mock.throttled:
+                headers = {'Retry-After': mock.retry_after} if mock.retry_after is not None else None
+                self.send_json(429, {'error': 'Too many requests'}, headers)
+                return
+            mock.wait()
+            try:
+                data = query_response(params['registry'], params['key'], params['x'], params['y'])
+            except (KeyError, ValueError):
+                data = None
+            if data is None:
+                self.send_json(400, {'error': 'Invalid query'})
+            else:
+                self.send_json(200, data)
+        elif endpoint == 'registries':
+            mock.count('registries')
+            registry = params.get('registry')
+            self.send_json(200, [{'key': key, 'name': key.title()} for key in mock.registries.get(registry, [])])
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        endpoint = url.path[len(API_PATH):] if url.path.startswith(API_PATH) else None
+
+        # The body is read in any case, so that the connection can be reused
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        if endpoint != 'query/batch' or not mock.batch:
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        mock.count('batch')
+        try:
+            payload = json.loads(body.decode('utf-8'))
+            points = payload['points']
+        except (ValueError, KeyError):
+            self.send_json(400, {'error': 'Invalid batch'})
+            return
+
+        if len(points) > mock.max_batch_size:
+            self.send_json(413, {'error': 'Batch too large'})
+            return
+
+        if len(points) > 0:
+            mock.wait()
+        results = [query_response(payload['registry'], payload['key'], x, y) for x, y in points]
+        self.send_json(200, {'results': results})
+
+
+class MockGeoContextServer(object):
+    """GeoContext API stand-in running on a local port in a background thread."""
+
+    def __init__(self, batch=True, latency=0, max_batch_size=1000, throttled=0, retry_after=None):
+        """Constructor.
+
+        :param batch: Whether the batch query endpoint is available
+        :type batch: bool
+
+        :param latency: Time (seconds) each query takes to answer
+        :type latency: float
+
+        :param max_batch_size: Batches with more points are refused
+        :type max_batch_size: int
+
+        :param throttled: Number of queries, from the first, answered with 429 Too Many Requests
+        :type throttled: int
+
+        :param retry_after: Retry-After header value of throttled queries, e.g. '1'
+        :type retry_after: str
+        """
+
+        self.batch = batch
+        self.latency = latency
+        self.max_batch_size = max_batch_size
+        self.throttled = throttled
+        self.retry_after = retry_after
+        self.registries = {
+            'service': ['altitude', 'rainfall'],
+            'group': ['elevation_group'],
+            'collection': ['climate_collection']
+        }
+
+        self.lock = threading.Lock()
+        self.request_counts = {}
+
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        """Base API URL of the running server, e.g. http://127.0.0.1:8000/api/v2/
+
+        :rtype: str
+        """
+
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}{}'.format(host, port, API_PATH)
+
+    def count(self, endpoint):
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+            return self.request_counts[endpoint]
+
+    def requests(self, endpoint):
+        """Returns the number of requests received by an endpoint: query, batch or registries.
+
+        :rtype: int
+        """
+
+        with self.lock:
+            return self.request_counts.get(endpoint, 0)
+
+    def wait(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def start(self):
+        """Starts the server on a free local port."""
+
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), MockGeoContextHandler)
+        self.server.mock = self
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        return self
+
+    def stop(self):
+        """Stops the server."""
+
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+if __name__ == '__main__':
+    # Runs the server until interrupted, e.g. to point the plugin options at it
+    with MockGeoContextServer() as mock_server:
+        print('Mock GeoContext API: ' + mock_server.url)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,78 @@
+# coding=utf-8
+"""Tests for the API client queries, using the local mock server."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bridge_api.api_abstract import ApiClient
+from mock_geocontext_server import MockGeoContextServer, point_value
+
+
+class TestApiClient(unittest.TestCase):
+    """Class for testing the single point and batch queries."""
+
+    def setUp(self):
+        ApiClient._batch_support = {}
+        self.points = [(18.0 + i * 0.01, -33.0 - i * 0.01) for i in range(25)]
+
+    def tearDown(self):
+        ApiClient.close_session()
+
+    def test_query(self):
+        """A single point query should encode its parameters."""
+
+        with MockGeoContextServer() as server:
+            client = ApiClient(endpoint_url=server.url)
+            response = client.query('Service', 'altitude', 18.5, -33.5)
+
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(point_value('altitude', 18.5, -33.5), response.json()['value'])
+
+    def test_batch_query_chunks(self):
+        """Points should be requested in chunks, and results returned in the order of the points."""
+
+        with MockGeoContextServer() as server:
+            client = ApiClient(endpoint_url=server.url)
+            results = client.query_batch('service', 'altitude', self.points, chunk_size=10)
+
+            expected = [point_value('altitude', x, y) for x, y in self.points]
+            self.assertEqual(expected, [data['value'] for data in results])
+            # Probe, followed by three chunks of 10, 10 and 5 points
+            self.assertEqual(4, server.requests('batch'))
+            self.assertEqual(0, server.requests('query'))
+
+    def test_batch_query_fallback(self):
+        """Single point queries should be used if the server has no batch endpoint."""
+
+        with MockGeoContextServer(batch=False) as server:
+            client = ApiClient(endpoint_url=server.url)
+            self.assertFalse(client.supports_batch_query())
+
+            results = client.query_batch('group', 'elevation_group', self.points, max_requests=4)
+
+            self.assertEqual(len(self.points), len(results))
+            self.assertEqual(len(self.points), server.requests('query'))
+            x, y = self.points[3]
+            self.assertEqual(point_value('rainfall', x, y), results[3]['services'][1]['value'])
+
+    def test_failed_batch_falls_back(self):
+        """A refused batch should be requested using single point queries."""
+
+        with MockGeoContextServer(max_batch_size=5) as server:
+            client = ApiClient(endpoint_url=server.url)
+            results = client.query_batch('service', 'altitude', self.points[:8], chunk_size=8)
+
+            self.assertEqual(8, len(results))
+            self.assertEqual(8, server.requests('query'))
+
+
+if __name__ == '__main__':
+    unittest.main()
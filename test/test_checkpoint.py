@@ -0,0 +1,68 @@
+# coding=utf-8
+"""Tests for the processing checkpoint."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.checkpoint import ProcessingCheckpoint
+
+
+class TestProcessingCheckpoint(unittest.TestCase):
+    """Class for testing the processing checkpoint."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.gpkg_path = os.path.join(self.temp_dir, 'output.gpkg')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_resume(self):
+        """Completed features should be available to a run with the same registry and key."""
+
+        checkpoint = ProcessingCheckpoint(self.gpkg_path, 'service', 'altitude')
+        checkpoint.start()
+        checkpoint.record({1: {'altitude': '168.0'}, 4: {'altitude': '172.5'}})
+        checkpoint.close()
+
+        checkpoint = ProcessingCheckpoint(self.gpkg_path, 'service', 'altitude')
+        self.assertTrue(checkpoint.can_resume())
+        self.assertEqual({1, 4}, checkpoint.completed_fids())
+        self.assertEqual({'altitude': '172.5'}, checkpoint.completed_values(4))
+        self.assertIsNone(checkpoint.completed_values(2))
+        checkpoint.close()
+
+        checkpoint = ProcessingCheckpoint(self.gpkg_path, 'service', 'rainfall')
+        self.assertFalse(checkpoint.can_resume())
+        checkpoint.close()
+
+    def test_start_and_remove(self):
+        """A new run should remove the previous records, and remove should drop the tables."""
+
+        checkpoint = ProcessingCheckpoint(self.gpkg_path, 'group', 'elevation_group')
+        checkpoint.start()
+        checkpoint.record({1: {'altitude': '168.0'}})
+        checkpoint.start()
+        self.assertEqual(set(), checkpoint.completed_fids())
+
+        checkpoint.remove()
+        checkpoint.close()
+
+        connection = sqlite3.connect(self.gpkg_path)
+        tables = connection.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        connection.close()
+        self.assertEqual([], tables)
+
+
+if __name__ == '__main__':
+    unittest.main()
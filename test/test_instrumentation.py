@@ -0,0 +1,103 @@
+# coding=utf-8
+"""Tests for the request instrumentation of the API client."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import csv
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bridge_api.api_abstract import ApiClient
+from bridge_api.instrumentation import RequestMetrics, CACHE_HIT, percentile
+from mock_geocontext_server import MockGeoContextServer, point_value
+
+
+class TestRequestMetrics(unittest.TestCase):
+    """Class for testing the request metrics and their export."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        ApiClient.close_session()
+
+    def test_percentiles(self):
+        """The summary should contain nearest-rank percentiles of the requests, excluding cache hits."""
+
+        self.assertEqual(50, percentile(list(range(1, 101)), 50))
+        self.assertEqual(99, percentile(list(range(1, 101)), 99))
+        self.assertIsNone(percentile([], 95))
+
+        metrics = RequestMetrics(max_samples=101)
+        for i in range(1, 101):
+            metrics.record('Service', 'altitude', status=200, size=10, total_ms=float(i))
+        metrics.record('service', 'altitude', status=500, total_ms=1000.0)
+        metrics.record('service', 'altitude', cache=CACHE_HIT)  # The oldest record (1 ms) is removed
+
+        summary = metrics.summary()
+        self.assertEqual(1, len(summary))
+        row = summary[0]
+        self.assertEqual(('service', 'altitude'), (row['registry'], row['key']))
+        self.assertEqual(101, row['requests'])
+        self.assertEqual(1, row['cache_hits'])
+        self.assertEqual(1, row['errors'])
+        self.assertEqual(990, row['bytes'])  # 2 ms to 100 ms
+        self.assertEqual(51.0, row['total_p50'])
+        self.assertEqual(96.0, row['total_p95'])
+        self.assertEqual(100.0, row['total_p99'])
+
+    def test_export(self):
+        """The summary should be exported to CSV, and the requests to JSON."""
+
+        metrics = RequestMetrics()
+        metrics.record('service', 'altitude', status=200, total_ms=2.0)
+        metrics.record('group', 'rainfall', status=200, total_ms=4.0)
+
+        csv_file = os.path.join(self.temp_dir, 'metrics.csv')
+        metrics.export_csv(csv_file)
+        with open(csv_file) as csv_input:
+            rows = list(csv.DictReader(csv_input))
+        self.assertEqual(['altitude', 'rainfall'], [row['key'] for row in rows])
+        self.assertEqual('4.0', rows[1]['total_p95'])
+
+        json_file = os.path.join(self.temp_dir, 'metrics.json')
+        metrics.export_json(json_file)
+        with open(json_file) as json_input:
+            data = json.load(json_input)
+        self.assertEqual(2, len(data['summary']))
+        self.assertEqual(2, len(data['requests']))
+
+    def test_query_phases(self):
+        """Queries should record their status, size and phases in the client metrics."""
+
+        ApiClient.close_session()
+        ApiClient.metrics.clear()
+        with MockGeoContextServer() as server:
+            client = ApiClient(endpoint_url=server.url)
+            data, status_code = client.query_data('Service', 'altitude', 18.5, -33.5)
+            client.query_data('Service', 'altitude', 18.6, -33.5)
+
+        self.assertEqual(200, status_code)
+        self.assertEqual(point_value('altitude', 18.5, -33.5), data['value'])
+
+        first, second = ApiClient.metrics.samples()
+        self.assertEqual(200, first['status'])
+        self.assertGreater(first['size'], 0)
+        self.assertGreater(first['connect_ms'], 0)
+        self.assertGreaterEqual(first['total_ms'], first['ttfb_ms'] + first['download_ms'])
+        # The second query reuses the kept-alive connection
+        self.assertEqual(0, second['connect_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
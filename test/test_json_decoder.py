@@ -0,0 +1,72 @@
+# coding=utf-8
+"""Tests for the decoding of the API responses."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bridge_api.json_decoder import loads, dumps, extract_values
+from utilities.result_schema import ResultSchema, response_services
+from mock_geocontext_server import query_response
+
+
+class TestJsonDecoder(unittest.TestCase):
+    """Class for testing the extraction of the service values from responses."""
+
+    def test_loads_dumps(self):
+        """Documents should decode to the same data as the standard library decoder."""
+
+        data = query_response('collection', 'climate', 18.5, -33.5)
+        self.assertEqual(data, loads(dumps(data)))
+        self.assertEqual(data, loads(json.dumps(data).encode('utf-8')))
+
+    def test_extract_values(self):
+        """The values should match those of the fully decoded service, group and collection responses."""
+
+        for registry, key in [('service', 'altitude'), ('group', 'elevation_group'), ('collection', 'climate')]:
+            data = query_response(registry, key, 18.5, -33.5)
+            expected = [(service['key'], service['value']) for service in response_services(registry, data)]
+            self.assertEqual(expected, extract_values(json.dumps(data).encode('utf-8')))
+            self.assertEqual(expected, extract_values(json.dumps(data, indent=2)))
+
+    def test_extract_values_types(self):
+        """Escaped text, numbers and null values should be decoded as by the standard library."""
+
+        data = {'key': 'group', 'services': [
+            {'key': 'name', 'name': 'Name {with} [brackets]', 'value': 'Café "Karoo"\n'},
+            {'key': 'count', 'value': 12},
+            {'key': 'ratio', 'value': -1.5e-3},
+            {'key': 'missing', 'value': None},
+            {'name': 'No key', 'value': '1'}
+        ]}
+        self.assertEqual(
+            [('name', 'Café "Karoo"\n'), ('count', 12), ('ratio', -1.5e-3), ('missing', None)],
+            extract_values(json.dumps(data))
+        )
+        self.assertEqual([], extract_values(json.dumps({'key': 'group', 'services': []})))
+
+    def test_extract_selected_values(self):
+        """Only the values of the requested keys should be decoded, and fill the columns of the schema."""
+
+        content = json.dumps(query_response('group', 'elevation_group', 18.5, -33.5))
+        list_values = extract_values(content, {'rainfall'})
+        self.assertEqual([('altitude', None), ('rainfall', str(8 + 18.5 - 33.5))], list_values)
+
+        schema = ResultSchema('group', ['rainfall'])
+        columns = schema.new_columns(1)
+        self.assertEqual(1, columns.append_values(list_values))
+        self.assertEqual([(str(8 + 18.5 - 33.5),)], list(columns.rows()))
+        self.assertEqual({'altitude'}, schema.ignored_keys)
+        self.assertEqual(['altitude', 'rainfall'], ResultSchema.from_values('group', list_values).field_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
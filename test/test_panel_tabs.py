@@ -0,0 +1,82 @@
+# coding=utf-8
+"""Tests for the result tabs of the docking panel. Requires QGIS."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from qgis.gui import QgsMapToolEmitPoint
+    from utilities_for_testing import get_qgis_app
+    from utilities.registry_catalogue import RegistryCatalogue
+    from widgets.GeoContextQGISPlugin_dockwidget import GeoContextQGISPluginDockWidget
+except ImportError:  # QGIS is not available
+    get_qgis_app = None
+
+LIST_SERVICES = [
+    {'key': 'altitude', 'name': 'Altitude', 'description': 'Elevation'},
+    {'key': 'rainfall', 'name': 'Rainfall', 'description': 'Annual rainfall'}
+]
+
+
+@unittest.skipIf(get_qgis_app is None, 'QGIS is not available')
+class TestPanelTabs(unittest.TestCase):
+    """Class for testing the result tabs when the selected key changes."""
+
+    def setUp(self):
+        qgis_app, canvas, iface, parent = get_qgis_app()
+
+        # Registries are provided by the test, not requested from the server
+        self.catalogue = RegistryCatalogue('http://localhost', os.path.join(tempfile.mkdtemp(), 'registries.json'))
+        self.catalogue.registries['service'] = LIST_SERVICES
+        with mock.patch('widgets.GeoContextQGISPlugin_dockwidget.get_registry_catalogue',
+                        return_value=self.catalogue), mock.patch.object(self.catalogue, 'refresh'):
+            self.dockwidget = GeoContextQGISPluginDockWidget(canvas, QgsMapToolEmitPoint(canvas), iface)
+
+    def test_key_change_empty_tab(self):
+        """An empty tab should be renamed to the new key."""
+
+        self.dockwidget.cbKey.setCurrentText('Rainfall')
+
+        self.assertEqual(1, self.dockwidget.tabResults.count())
+        self.assertEqual(['rainfall'], self.dockwidget.get_tab_names())
+
+    def test_key_change_tab_with_results(self):
+        """A tab with results should be kept, and a tab added for the new key."""
+
+        self.dockwidget.result_models[0].append_rows([('Altitude', '1234.5', 18.5, -33.5)])
+        self.assertEqual(1, self.dockwidget.current_row_count())
+
+        self.dockwidget.cbKey.setCurrentText('Rainfall')
+
+        self.assertEqual(['altitude', 'rainfall'], self.dockwidget.get_tab_names())
+        self.assertEqual(1, self.dockwidget.tabResults.currentIndex())
+        self.assertEqual(0, self.dockwidget.current_row_count())
+        self.assertEqual(1, self.dockwidget.result_models[0].rowCount())
+
+    def test_list_order(self):
+        """The list should show the results from the oldest to the most recent."""
+
+        self.dockwidget.result_models[0].append_rows([('Altitude', '1', 18.5, -33.5)])
+        self.dockwidget.result_models[0].append_rows([('Altitude', '2', 19.0, -34.0)])
+
+        list_view = self.dockwidget.tabResults.currentWidget()
+        values = [list_view.model().index(row, 1).data() for row in range(list_view.model().rowCount())]
+        self.assertEqual(['1', '2'], values)
+        self.assertEqual('2', self.dockwidget.result_models[0].index(0, 1).data())  # Table: most recent at the top
+
+        list_view.model().remove_row(0)
+        self.assertEqual([('Altitude', '2', 19.0, -34.0)], self.dockwidget.result_models[0].store.rows())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# coding=utf-8
+"""Tests for the grouping of points by location."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.point_grouping import group_points, PointGrouper, METRES_PER_DEGREE
+
+
+class TestPointGrouping(unittest.TestCase):
+    """Class for testing the point grouping."""
+
+    def test_exact_duplicates(self):
+        """Without a tolerance, only points at the same coordinates should be grouped."""
+
+        points = [(1, 18.5, -33.5), (2, 18.6, -33.5), (3, 18.5, -33.5), (4, 18.50001, -33.5)]
+        groups = group_points(points)
+
+        self.assertEqual([[1, 3], [2], [4]], [group.fids for group in groups])
+        self.assertEqual((18.5, -33.5), (groups[0].x, groups[0].y))
+
+    def test_tolerance(self):
+        """Points within the tolerance should be grouped, also across grid cell borders."""
+
+        offset = 3.0 / METRES_PER_DEGREE  # 3 metres of latitude
+        points = [
+            (1, 18.5, -33.5),
+            (2, 18.5, -33.5 + offset),  # 3 m north
+            (3, 18.5, -33.5 - offset * 4),  # 12 m south
+            (4, 18.5, -33.5 - offset * 5)  # 3 m from point 3
+        ]
+        groups = group_points(points, tolerance=5)
+
+        self.assertEqual([[1, 2], [3, 4]], [group.fids for group in groups])
+
+    def test_longitude_scale(self):
+        """The longitude distance should shrink towards the poles."""
+
+        offset = 8.0 / METRES_PER_DEGREE  # 8 metres at the equator, 4 metres at 60 degrees
+        points = [(1, 10.0, 60.0), (2, 10.0 + offset, 60.0), (3, 10.0, 0.0), (4, 10.0 + offset, 0.0)]
+        groups = group_points(points, tolerance=5)
+
+        self.assertEqual([[1, 2], [3], [4]], [group.fids for group in groups])
+
+    def test_streaming(self):
+        """The grouper should return the same group for later points at a location."""
+
+        grouper = PointGrouper(tolerance=5)
+        group, is_new = grouper.find_group(18.5, -33.5)
+        self.assertTrue(is_new)
+
+        offset = 2.0 / METRES_PER_DEGREE
+        same_group, is_new = grouper.find_group(18.5 + offset, -33.5)
+        self.assertFalse(is_new)
+        self.assertIs(group, same_group)
+
+    def test_bounded_groups(self):
+        """Only the most recently used groups should be kept."""
+
+        grouper = PointGrouper(tolerance=5, max_groups=2)
+        first, is_new = grouper.find_group(18.5, -33.5)
+        second, is_new = grouper.find_group(19.5, -33.5)
+        grouper.find_group(18.5, -33.5)  # The first group is used again
+        third, is_new = grouper.find_group(20.5, -33.5)
+
+        self.assertEqual(2, len(grouper))
+        self.assertIs(first, grouper.find_group(18.5, -33.5)[0])
+
+        # The second group has been evicted, a new group is started at its location
+        group, is_new = grouper.find_group(19.5, -33.5)
+        self.assertTrue(is_new)
+        self.assertIsNot(second, group)
+        self.assertEqual(2, sum(len(list_groups) for list_groups in grouper.grid.values()))
+
+        exact_grouper = PointGrouper(max_groups=1)
+        exact_grouper.find_group(18.5, -33.5)
+        exact_grouper.find_group(19.5, -33.5)
+        self.assertTrue(exact_grouper.find_group(18.5, -33.5)[1])
+        self.assertEqual(1, len(exact_grouper.grid))
+
+
+if __name__ == '__main__':
+    unittest.main()
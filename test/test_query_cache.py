@@ -0,0 +1,148 @@
+# coding=utf-8
+"""Tests for the persistent query cache."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.query_cache import QueryCache, MemoryQueryCache
+
+ENDPOINT_URL = "https://staging.geocontext.kartoza.com/api/v2/"
+
+
+class TestQueryCache(unittest.TestCase):
+    """Class for testing the query cache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.temp_dir, 'query_cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_hit_and_miss(self):
+        """A stored response should be returned for coordinates which snap to the same location."""
+
+        cache = QueryCache(self.cache_path, snap_decimals=3)
+        data = {'key': 'altitude', 'value': 168}
+
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 18.8662, -33.5922))
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 18.8662, -33.5922, data)
+
+        result = cache.get(ENDPOINT_URL, 'service', 'altitude', 18.86621, -33.59221)
+        msg = "Expected %s but got %s for a cached request" % (str(data), str(result))
+        self.assertEqual(data, result, msg)
+
+        # Different key should not be returned
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'monthly_max_temperature_september', 18.8662, -33.5922))
+
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+        cache.close()
+
+    def test_persistence(self):
+        """Responses should still be available once the cache has been reopened."""
+
+        cache = QueryCache(self.cache_path)
+        cache.put(ENDPOINT_URL, 'Group', 'rainfall_group', 19.0, -33.0, {'services': []})
+        cache.close()
+
+        cache = QueryCache(self.cache_path)
+        self.assertEqual({'services': []}, cache.get(ENDPOINT_URL, 'Group', 'rainfall_group', 19.0, -33.0))
+        cache.close()
+
+    def test_expiry(self):
+        """Expired responses should not be returned."""
+
+        cache = QueryCache(self.cache_path, ttl=1)
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 18.0, -33.0, {'value': 1})
+        cache.connection.execute('UPDATE query_cache SET created = created - 10')
+
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 18.0, -33.0))
+        cache.close()
+
+    def test_lru_eviction(self):
+        """The least recently used responses should be removed once the cache is full."""
+
+        cache = QueryCache(self.cache_path, max_entries=10)
+        for i in range(10):
+            cache.put(ENDPOINT_URL, 'Service', 'altitude', i, 0, {'value': i})
+
+        # Uses the first entry, so that it is no longer the least recently used
+        cache.connection.execute('UPDATE query_cache SET accessed = accessed + 100 WHERE x = 0')
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 10, 0, {'value': 10})
+
+        self.assertLessEqual(cache.entry_count, 10)
+        self.assertIsNotNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 0, 0))
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 1, 0))
+        cache.close()
+
+    def test_deferred_access_times(self):
+        """Cache hits should not write to the database until flushed, but still count for the eviction."""
+
+        cache = QueryCache(self.cache_path, max_entries=10)
+        for i in range(10):
+            cache.put(ENDPOINT_URL, 'Service', 'altitude', i, 0, {'value': i})
+
+        select_accessed = 'SELECT accessed FROM query_cache WHERE x = 0'
+        stored = cache.connection.execute(select_accessed).fetchone()[0]
+        self.assertIsNotNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 0, 0))
+        self.assertEqual(stored, cache.connection.execute(select_accessed).fetchone()[0])
+        self.assertFalse(cache.connection.in_transaction)
+
+        # The first entry has been used most recently, so the second entry is removed
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 10, 0, {'value': 10})
+        self.assertIsNotNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 0, 0))
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 1, 0))
+
+        cache.flush()
+        self.assertLess(stored, cache.connection.execute(select_accessed).fetchone()[0])
+        self.assertEqual(0, len(cache.pending_access))
+        cache.close()
+
+
+class TestMemoryQueryCache(unittest.TestCase):
+    """Class for testing the in-memory cache of recent panel responses."""
+
+    def test_lru(self):
+        """Only the most recently used responses should be kept."""
+
+        cache = MemoryQueryCache(max_entries=2)
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 1, 1, {'value': 1})
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 2, 2, {'value': 2})
+        cache.get(ENDPOINT_URL, 'Service', 'altitude', 1, 1)  # Most recently used
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 3, 3, {'value': 3})
+
+        self.assertEqual({'value': 1}, cache.get(ENDPOINT_URL, 'Service', 'altitude', 1, 1))
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 2, 2))
+        self.assertEqual({'value': 3}, cache.get(ENDPOINT_URL, 'Service', 'altitude', 3, 3))
+
+    def test_invalidation(self):
+        """Responses should be removed when the endpoint or the registry lists change."""
+
+        cache = MemoryQueryCache()
+        cache.invalidate_if_changed(ENDPOINT_URL, [[{'key': 'altitude'}], [], []])
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 1, 1, {'value': 1})
+
+        # Nothing changed
+        cache.invalidate_if_changed(ENDPOINT_URL, [[{'key': 'altitude'}], [], []])
+        self.assertIsNotNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 1, 1))
+
+        cache.invalidate_if_changed(registry_lists=[[{'key': 'altitude'}, {'key': 'slope'}], [], []])
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 1, 1))
+
+        cache.put(ENDPOINT_URL, 'Service', 'altitude', 1, 1, {'value': 1})
+        cache.invalidate_if_changed(endpoint="https://geocontext.kartoza.com/api/v2/")
+        self.assertIsNone(cache.get(ENDPOINT_URL, 'Service', 'altitude', 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
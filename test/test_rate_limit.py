@@ -0,0 +1,144 @@
+# coding=utf-8
+"""Tests for the rate limiting, retry backoff and adaptive concurrency of the API client."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import time
+import unittest
+
+from email.utils import formatdate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bridge_api.api_abstract import ApiClient
+from bridge_api.default import CONNECTION_MAX_RETRIES, CONNECTION_BACKOFF_FACTOR
+from bridge_api.rate_limit import AimdController, TokenBucket, backoff_delay, retry_after_seconds
+from mock_geocontext_server import MockGeoContextServer, point_value
+
+
+class _Response(object):
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class TestRateLimit(unittest.TestCase):
+    """Class for testing the rate limiter, backoff and concurrency controller."""
+
+    def tearDown(self):
+        ApiClient.configure_session(max_retries=CONNECTION_MAX_RETRIES, backoff_factor=CONNECTION_BACKOFF_FACTOR)
+        ApiClient.close_session()
+
+    def test_backoff_delay(self):
+        """Delays should be jittered up to the exponential backoff, and capped."""
+
+        for attempt in range(6):
+            delay = backoff_delay(attempt, 0.5, 4)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4, 0.5 * 2 ** attempt))
+
+    def test_retry_after(self):
+        """Retry-After should be read as seconds or as an HTTP date."""
+
+        self.assertEqual(2.0, retry_after_seconds(_Response({'Retry-After': '2'}), 30))
+        self.assertEqual(30, retry_after_seconds(_Response({'Retry-After': '120'}), 30))
+        self.assertIsNone(retry_after_seconds(_Response({}), 30))
+        self.assertIsNone(retry_after_seconds(_Response({'Retry-After': 'soon'}), 30))
+
+        seconds = retry_after_seconds(_Response({'Retry-After': formatdate(time.time() + 10, usegmt=True)}), 30)
+        self.assertTrue(8 <= seconds <= 10)
+
+    def test_token_bucket(self):
+        """Requests beyond the burst should be spaced at the rate."""
+
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for i in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+        unlimited = TokenBucket(rate=0)
+        unlimited.pause(0.05)
+        self.assertGreaterEqual(unlimited.acquire(), 0.04)
+
+    def test_aimd(self):
+        """The limit should increase while saturated and successful, and halve on errors or slow responses."""
+
+        controller = AimdController(initial=4, minimum=1, maximum=6)
+        for i in range(4):
+            controller.acquire()
+        for i in range(4):
+            controller.record(10, True)
+            controller.release()
+        self.assertEqual(5, controller.limit)
+
+        # Not all slots were in use, so the limit is kept
+        for i in range(10):
+            controller.acquire()
+            controller.record(10, True)
+            controller.release()
+        self.assertEqual(5, controller.limit)
+
+        controller.record(10, False)
+        self.assertEqual(2, controller.limit)
+        # Errors of requests which were already in flight are only counted once
+        controller.record(10, False)
+        self.assertEqual(2, controller.limit)
+
+        controller.last_decrease = 0
+        for i in range(10):
+            controller.record(100, True)
+        self.assertEqual(1, controller.limit)
+
+    def test_aimd_sustained_latency(self):
+        """The limit should keep decreasing while the latency stays high, as the baseline is kept."""
+
+        controller = AimdController(initial=32, minimum=1, maximum=64)
+        for i in range(20):
+            controller.record(10, True)
+        self.assertEqual(32, controller.limit)
+
+        list_limits = []
+        for i in range(5):
+            for j in range(10):
+                controller.last_decrease = 0  # Not limited to one decrease per average latency
+                controller.record(200, True)
+            list_limits.append(controller.limit)
+
+        self.assertEqual(1, controller.limit)
+        self.assertEqual(sorted(list_limits, reverse=True), list_limits)
+        self.assertLess(controller.baseline_ms, 200 / controller.latency_factor)
+
+    def test_throttled_query_retried(self):
+        """Throttled queries should be retried, and the retries recorded."""
+
+        ApiClient.configure_session(max_retries=3, backoff_factor=0.01)
+        ApiClient.metrics.clear()
+        with MockGeoContextServer(throttled=2, retry_after='0') as server:
+            client = ApiClient(endpoint_url=server.url)
+            data, status_code = client.query_data('service', 'altitude', 18.5, -33.5)
+
+            self.assertEqual(200, status_code)
+            self.assertEqual(point_value('altitude', 18.5, -33.5), data['value'])
+            self.assertEqual(3, server.requests('query'))
+        self.assertEqual(2, ApiClient.metrics.samples()[0]['retries'])
+
+    def test_throttled_query_fails(self):
+        """Once the retries are used up, the error status should be returned without parsing the response."""
+
+        ApiClient.configure_session(max_retries=1, backoff_factor=0.01)
+        with MockGeoContextServer(throttled=10) as server:
+            client = ApiClient(endpoint_url=server.url)
+            data, status_code = client.query_data('service', 'altitude', 18.5, -33.5)
+
+            self.assertEqual(429, status_code)
+            self.assertIsNone(data)
+            self.assertEqual(2, server.requests('query'))
+
+
+if __name__ == '__main__':
+    unittest.main()
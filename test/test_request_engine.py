@@ -0,0 +1,125 @@
+# coding=utf-8
+"""Tests for the concurrent request engine."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bridge_api.rate_limit import AimdController
+from utilities.request_engine import ordered_concurrent_requests, SharedRequests
+
+
+class TestRequestEngine(unittest.TestCase):
+    """Class for testing the concurrent request engine."""
+
+    def test_results_in_item_order(self):
+        """Results should be received in the order of the items, even if the
+        requests complete in a different order.
+        """
+
+        def request(item):
+            time.sleep((10 - item) * 0.005)  # Earlier items finish last
+            return item * 2
+
+        results = list(ordered_concurrent_requests(request, range(10), 4))
+
+        expected = [(i, i * 2, None) for i in range(10)]
+        msg = "Expected %s but got %s for ordered requests" % (str(expected), str(results))
+        self.assertEqual(expected, results, msg)
+
+    def test_failed_request(self):
+        """A failed request should return its exception and not stop the other requests."""
+
+        def request(item):
+            if item == 2:
+                raise ValueError('Request failed')
+            return item
+
+        results = list(ordered_concurrent_requests(request, range(5), 2))
+
+        self.assertEqual(5, len(results))
+        self.assertIsNone(results[2][1])
+        self.assertIsInstance(results[2][2], ValueError)
+
+    def test_cancel(self):
+        """No more results should be received once the operation has been canceled."""
+
+        canceled = []
+        results = []
+        for item, result, error in ordered_concurrent_requests(lambda i: i, range(100), 4, lambda: bool(canceled)):
+            results.append(result)
+            if len(results) == 3:
+                canceled.append(True)
+
+        self.assertEqual(3, len(results))
+
+    def test_concurrency_limit(self):
+        """The concurrency controller should limit the requests in flight below max_requests."""
+
+        lock = threading.Lock()
+        in_flight = []
+        peak = []
+
+        def request(item):
+            with lock:
+                in_flight.append(item)
+                peak.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.remove(item)
+            return item
+
+        controller = AimdController(initial=2, maximum=2)
+        results = list(ordered_concurrent_requests(request, range(20), 8, concurrency=controller))
+
+        self.assertEqual(list(range(20)), [result for item, result, error in results])
+        self.assertEqual(2, max(peak))
+
+
+class TestSharedRequests(unittest.TestCase):
+    """Class for testing the sharing of requests between items."""
+
+    def test_single_request_per_key(self):
+        """Items with the same key should share a single request, also while it is in progress."""
+
+        calls = []
+
+        def request(value):
+            calls.append(value)
+            time.sleep(0.02)
+            return value * 2
+
+        shared = SharedRequests(request)
+        items = [('a', 1), ('b', 2), ('a', 1), ('a', 1), ('b', 2)]
+        results = list(ordered_concurrent_requests(lambda item: shared(*item), items, 4))
+
+        self.assertEqual([2, 4, 2, 2, 4], [result for item, result, error in results])
+        self.assertEqual([1, 2], sorted(calls))
+
+    def test_failed_request_is_retried(self):
+        """A failed request should not be reused by later items."""
+
+        calls = []
+
+        def request(value):
+            calls.append(value)
+            if len(calls) == 1:
+                raise ValueError('Request failed')
+            return value
+
+        shared = SharedRequests(request)
+        self.assertRaises(ValueError, shared, 'a', 1)
+        self.assertEqual(1, shared('a', 1))
+        self.assertEqual(2, len(calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
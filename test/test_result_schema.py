@@ -0,0 +1,70 @@
+# coding=utf-8
+"""Tests for the result schema and its column arrays."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bridge_api.json_decoder import extract_values
+from utilities.result_schema import ResultSchema, round_value
+from mock_geocontext_server import query_response
+
+
+def response_values(registry, key, x, y):
+    """Returns the (service key, value) pairs of a response, as decoded by the processing tool."""
+    return extract_values(json.dumps(query_response(registry, key, x, y)))
+
+
+class TestResultSchema(unittest.TestCase):
+    """Class for testing the decoding of responses into columns."""
+
+    def test_round_value(self):
+        """Decimal values should be rounded, integers and text kept."""
+
+        self.assertEqual('1.235', round_value('1.23456', 3))
+        self.assertEqual('12', round_value('12', 3))
+        self.assertEqual('Grassland', round_value('Grassland', 3))
+        self.assertEqual('0.5', round_value(0.5, 3))
+        self.assertIsNone(round_value(None, 3))
+
+    def test_columns(self):
+        """Responses should be decoded in the order of the schema, with empty values for missing services."""
+
+        schema = ResultSchema('collection', ['rainfall', 'altitude', 'temperature'], rounding_factor=2)
+        columns = schema.new_columns(2)
+
+        self.assertEqual(2, columns.append_values(response_values('collection', 'climate', 18.5, -33.5)))
+        self.assertEqual(0, columns.append_values(None))
+        self.assertEqual(2, columns.append_values(response_values('collection', 'climate', 19.0, -33.0)))  # Grows
+
+        rows = list(columns.rows())
+        self.assertEqual(3, len(rows))
+        self.assertEqual((str(round(8 + 18.5 - 33.5, 2)), str(round(8 + 18.5 - 33.5, 2)), None), rows[0])
+        self.assertEqual((None, None, None), rows[1])
+
+        columns.clear()
+        columns.append_values(None)
+        self.assertEqual([(None, None, None)], list(columns.rows()))
+
+    def test_from_values(self):
+        """The schema should be created from a response, and services outside of it ignored."""
+
+        schema = ResultSchema.from_values('group', response_values('group', 'elevation_group', 18.5, -33.5))
+        self.assertEqual(['altitude', 'rainfall'], schema.field_names)
+
+        service_schema = ResultSchema('service', ['altitude'])
+        columns = service_schema.new_columns(4)
+        self.assertEqual(0, columns.append_values(response_values('service', 'rainfall', 18.5, -33.5)))
+        self.assertEqual({'rainfall'}, service_schema.ignored_keys)
+
+
+if __name__ == '__main__':
+    unittest.main()
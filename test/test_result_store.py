@@ -0,0 +1,83 @@
+# coding=utf-8
+"""Tests for the result store of the docking panel."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import math
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.result_store import ResultStore, numeric_value
+
+
+class TestResultStore(unittest.TestCase):
+    """Class for testing the columnar store of the panel results."""
+
+    def setUp(self):
+        self.store = ResultStore('elevation')
+        self.store.append('Altitude', '1234.5', 18.5, -33.5, timestamp=10.0)
+        self.store.append('Land cover', 'Forest', 19.0, -33.0, timestamp=11.0)
+        self.store.append('Rainfall', '12', 20.0, -34.0, timestamp=12.0)
+
+    def test_append(self):
+        """Rows should be kept in the order added, with the numeric values parsed once."""
+
+        self.assertEqual(3, len(self.store))
+        self.assertEqual(('Altitude', '1234.5', 18.5, -33.5), self.store.row(0))
+        self.assertEqual([18.5, 19.0, 20.0], list(self.store.x))
+        self.assertEqual([10.0, 11.0, 12.0], list(self.store.timestamps))
+        self.assertEqual(1234.5, self.store.numbers[0])
+        self.assertTrue(math.isnan(self.store.numbers[1]))  # Text value
+        self.assertEqual(12.0, self.store.numbers[2])
+
+    def test_numeric_value(self):
+        """Values which are not numbers should be NaN."""
+
+        self.assertEqual(2.5, numeric_value('2.5'))
+        self.assertEqual(3.0, numeric_value(3))
+        self.assertTrue(math.isnan(numeric_value(None)))
+        self.assertTrue(math.isnan(numeric_value(True)))
+        self.assertTrue(math.isnan(numeric_value('Forest')))
+
+    def test_remove_and_clear(self):
+        """Removing a row should remove it from each column."""
+
+        self.store.remove(1)
+        self.assertEqual(
+            [('Altitude', '1234.5', 18.5, -33.5), ('Rainfall', '12', 20.0, -34.0)],
+            self.store.rows()
+        )
+        self.assertEqual([1234.5, 12.0], list(self.store.numbers))
+        self.assertEqual([10.0, 12.0], list(self.store.timestamps))
+
+        self.store.clear()
+        self.assertEqual(0, len(self.store))
+        self.assertEqual([], self.store.rows())
+        self.assertEqual(0, len(self.store.numbers))
+
+    def test_snapshot(self):
+        """A snapshot should keep its rows while the results change."""
+
+        snapshot = self.store.snapshot()
+        self.store.append('Altitude', '10', 21.0, -35.0)
+        self.store.remove(0)
+
+        self.assertEqual(3, len(snapshot))
+        self.assertEqual(('Altitude', '1234.5', 18.5, -33.5), snapshot[0])
+        self.assertEqual(('Rainfall', '12', 20.0, -34.0), snapshot[-1])
+        self.assertEqual([('Land cover', 'Forest', 19.0, -33.0), ('Rainfall', '12', 20.0, -34.0)], snapshot[1:10])
+        with self.assertRaises(IndexError):
+            snapshot[3]
+
+        self.store.clear()
+        self.assertEqual(['Altitude', 'Land cover', 'Rainfall'], [row[0] for row in snapshot])
+        self.assertEqual(0, len(self.store.snapshot()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# coding=utf-8
+"""Tests for the CSV and Parquet export of docking panel tables."""
+
+__author__ = 'Kartoza'
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+
+import os
+import sys
+import csv
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.table_export import write_points_csv, write_points_parquet, parquet_available, export_file_filter
+
+ROWS = [
+    ('Altitude', '1234.5', 18.5, -33.5),
+    ('Land cover', 'Forest, dense', 19.0, -33.0),  # Value containing a comma
+    ('Name', 'Cape "Point"\nReserve', 18.49, -34.35),  # Quotes and line break
+    ('Température', '12', 20.0, -34.0)
+]
+
+
+class TestTableExport(unittest.TestCase):
+    """Class for testing the streaming export of table rows."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_csv(self):
+        """Values should be quoted, not altered, and all rows written across chunks."""
+
+        output_file = os.path.join(self.temp_dir, 'table.csv')
+        list_progress = []
+        success, msg = write_points_csv(output_file, ROWS, chunk_size=3, progress=list_progress.append)
+        self.assertTrue(success, msg)
+        self.assertEqual([75.0, 100.0], list_progress)
+
+        with open(output_file, newline='', encoding='utf-8') as csv_file:
+            list_read = list(csv.reader(csv_file))
+        self.assertEqual(['Data type', 'Value', 'Longitude', 'Latitude'], list_read[0])
+        self.assertEqual([[key, value, str(x), str(y)] for key, value, x, y in ROWS], list_read[1:])
+
+    def test_csv_canceled(self):
+        """Canceled exports should not report success."""
+
+        output_file = os.path.join(self.temp_dir, 'table.csv')
+        success, msg = write_points_csv(output_file, ROWS, chunk_size=1, is_canceled=lambda: True)
+        self.assertFalse(success)
+
+    def test_file_filter(self):
+        """Parquet should only be offered if pyarrow is installed."""
+
+        self.assertEqual(parquet_available(), '*.parquet' in export_file_filter())
+
+    @unittest.skipUnless(parquet_available(), 'pyarrow is not installed')
+    def test_parquet(self):
+        """The rows should be written as typed columns."""
+
+        import pyarrow.parquet
+
+        output_file = os.path.join(self.temp_dir, 'table.parquet')
+        success, msg = write_points_parquet(output_file, ROWS, chunk_size=3)
+        self.assertTrue(success, msg)
+
+        table = pyarrow.parquet.read_table(output_file)
+        self.assertEqual(['data_type', 'value', 'long', 'lat'], table.column_names)
+        self.assertEqual([row[1] for row in ROWS], table.column('value').to_pylist())
+        self.assertEqual([row[2] for row in ROWS], table.column('long').to_pylist())
+
+    @unittest.skipUnless(parquet_available(), 'pyarrow is not installed')
+    def test_parquet_mixed_values(self):
+        """Integer, float, text and missing values should be written as text, missing values as nulls."""
+
+        import pyarrow.parquet
+
+        list_rows = [
+            ('Altitude', 168, 18.5, -33.5),
+            ('Rainfall', 12.25, 19.0, -33.0),
+            ('Land cover', 'Forest', 20.0, -34.0),
+            ('Soil', None, 21.0, -34.5)
+        ]
+        output_file = os.path.join(self.temp_dir, 'mixed.parquet')
+        success, msg = write_points_parquet(output_file, list_rows, chunk_size=3)
+        self.assertTrue(success, msg)
+
+        table = pyarrow.parquet.read_table(output_file)
+        self.assertEqual(['168', '12.25', 'Forest', None], table.column('value').to_pylist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+"""Processing checkpoint.
+
+Records the points which have been written to the output file of the
+processing tool, together with the written values. Points are identified by
+their position in the stream of (exploded) input points. The records are kept
+in a table in the output GeoPackage, so that an interrupted run can be resumed
+without requesting the completed features again.
+"""
+
+import json
+import time
+import sqlite3
+
+
+class ProcessingCheckpoint(object):
+    """Completed features of a processing run, stored in the output GeoPackage."""
+
+    RUN_TABLE = 'geocontext_checkpoint_run'
+    FEATURE_TABLE = 'geocontext_checkpoint'
+
+    def __init__(self, gpkg_path, registry, key):
+        """Constructor.
+
+        :param gpkg_path: Directory and filename of the output GeoPackage
+        :type gpkg_path: str
+
+        :param registry: Registry key of the run: service, group or collection
+        :type registry: str
+
+        :param key: Key of the requested data
+        :type key: str
+        """
+
+        self.gpkg_path = gpkg_path
+        self.registry = registry
+        self.key = key
+
+        # Opened on first use, as the output file might not have been created yet
+        self._connection = None
+
+    @property
+    def connection(self):
+        """Connection to the GeoPackage. The checkpoint tables are created if they do not exist.
+
+        :rtype: sqlite3.Connection
+        """
+
+        if self._connection is None:
+            # The GeoPackage is also opened by the layer provider, so waits on its locks
+            self._connection = sqlite3.connect(self.gpkg_path, timeout=30)
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS {} ('
+                'registry TEXT NOT NULL, '
+                'key TEXT NOT NULL, '
+                'started REAL NOT NULL)'.format(self.RUN_TABLE)
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS {} ('
+                'fid INTEGER PRIMARY KEY, '
+                'response TEXT NOT NULL, '
+                'completed REAL NOT NULL)'.format(self.FEATURE_TABLE)
+            )
+            self._connection.commit()
+
+        return self._connection
+
+    def can_resume(self):
+        """Checks whether the checkpoint is of a run with the same registry and key.
+
+        :returns: True if the completed features of the checkpoint can be reused
+        :rtype: Boolean
+        """
+
+        row = self.connection.execute('SELECT registry, key FROM {}'.format(self.RUN_TABLE)).fetchone()
+
+        return row is not None and row[0] == self.registry and row[1] == self.key
+
+    def start(self):
+        """Removes the records of a previous run and starts a new checkpoint."""
+
+        self.connection.execute('DELETE FROM {}'.format(self.FEATURE_TABLE))
+        self.connection.execute('DELETE FROM {}'.format(self.RUN_TABLE))
+        self.connection.execute(
+            'INSERT INTO {} (registry, key, started) VALUES (?, ?, ?)'.format(self.RUN_TABLE),
+            (self.registry, self.key, time.time())
+        )
+        self.connection.commit()
+
+    def completed_fids(self):
+        """Returns the feature IDs of the completed features.
+
+        :returns: Feature IDs
+        :rtype: set
+        """
+
+        rows = self.connection.execute('SELECT fid FROM {}'.format(self.FEATURE_TABLE))
+
+        return set(row[0] for row in rows)
+
+    def completed_values(self, fid):
+        """Returns the values which has been written for a feature.
+
+        :param fid: Feature ID (position of the point in the input)
+        :type fid: int
+
+        :returns: Field name: value. None if the feature has not been completed
+        :rtype: dict
+        """
+
+        row = self.connection.execute(
+            'SELECT response FROM {} WHERE fid=?'.format(self.FEATURE_TABLE), (fid,)).fetchone()
+        if row is None:
+            return None
+
+        return json.loads(row[0])
+
+    def record(self, dict_feature_values):
+        """Records features as completed. Called once their values has been written to the layer.
+
+        :param dict_feature_values: Feature ID (position of the point in the input): {field name: value}
+        :type dict_feature_values: dict
+        """
+
+        now = time.time()
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO {} (fid, response, completed) VALUES (?, ?, ?)'.format(self.FEATURE_TABLE),
+            [(fid, json.dumps(dict_values), now) for fid, dict_values in dict_feature_values.items()]
+        )
+        self.connection.commit()
+
+    def remove(self):
+        """Removes the checkpoint tables, e.g. once all of the features are completed."""
+
+        self.connection.execute('DROP TABLE IF EXISTS {}'.format(self.FEATURE_TABLE))
+        self.connection.execute('DROP TABLE IF EXISTS {}'.format(self.RUN_TABLE))
+        self.connection.commit()
+
+    def close(self):
+        """Closes the connection to the GeoPackage."""
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
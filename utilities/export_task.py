@@ -0,0 +1,77 @@
+"""Table export task.
+
+Writes the results of a docking panel tab to a GeoPackage, CSV or Parquet file in
+a background task, so that the QGIS interface does not block while exporting
+large histories.
+"""
+
+import os
+import sys
+import inspect
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from utilities.utilities import export_rows
+
+
+class ExportTableTask(QgsTask):
+    """Cancellable task which exports a table to a file, with progress."""
+
+    # Emitted in the main thread with the task once the export is done
+    exportFinished = pyqtSignal(object)
+
+    def __init__(self, output_file, store):
+        """Constructor. A snapshot of the results is taken here, in the main thread, so the
+        results can be changed while the file is written. The rows are not copied.
+
+        :param output_file: Directory and output file name (gpkg, csv or parquet)
+        :type output_file: str
+
+        :param store: Results of which the rows will be exported
+        :type store: ResultStore
+        """
+
+        super(ExportTableTask, self).__init__('GeoContext export: {}'.format(output_file), QgsTask.CanCancel)
+
+        self.output_file = output_file
+        self.list_rows = store.snapshot()
+
+        self.success = False
+        self.msg = ''
+
+    def run(self):
+        """Writes the file. Runs in a background thread, no GUI changes can be made here.
+
+        :returns: True if the file were written
+        :rtype: Boolean
+        """
+
+        try:
+            self.success, self.msg = export_rows(
+                self.output_file,
+                self.list_rows,
+                progress=self.setProgress,
+                is_canceled=self.isCanceled
+            )
+        except Exception as e:
+            self.success, self.msg = False, "Could not create {}. Unknown error: {}".format(self.output_file, str(e))
+
+        return self.success
+
+    def finished(self, result):
+        """Called in the main thread once the task is done.
+
+        :param result: The return value of run()
+        :type result: Boolean
+        """
+
+        if not result and self.msg == '':
+            self.msg = 'Export of {} canceled'.format(self.output_file)
+
+        self.exportFinished.emit(self)
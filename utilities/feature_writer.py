@@ -0,0 +1,235 @@
+"""Feature writer used by the processing tool.
+
+Writes the input points, together with the requested data, to the output
+GeoPackage as they are processed. The values of the responses are added to the column
+arrays of the result schema, the features are added to the file in chunks, and
+the features of each written chunk are recorded in the checkpoint. The output
+file is created once the result schema is known, and feature IDs are assigned
+by the file when the features are written.
+"""
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (
+    QgsFeature,
+    QgsFeatureSink,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsVectorFileWriter,
+    QgsWkbTypes
+)
+
+from utilities.result_schema import ResultSchema
+
+# Field in which GeoPackages store the feature ID
+FID_FIELD_NAME = 'fid'
+
+
+class FeatureWriter(object):
+    """Buffers output features and writes them to a GeoPackage in chunks."""
+
+    def __init__(self, output_path, source_fields, crs, transform_context, chunk_size=1000, checkpoint=None,
+                 append=False):
+        """Constructor.
+
+        :param output_path: Directory and filename of the output GeoPackage
+        :type output_path: str
+
+        :param source_fields: Fields of the input layer, which are copied to the output
+        :type source_fields: QgsFields
+
+        :param crs: Coordinate system of the output points
+        :type crs: QgsCoordinateReferenceSystem
+
+        :param transform_context: Transform context of the project
+        :type transform_context: QgsCoordinateTransformContext
+
+        :param chunk_size: Number of features written per commit
+        :type chunk_size: int
+
+        :param checkpoint: Checkpoint in which the written features are recorded
+        :type checkpoint: ProcessingCheckpoint
+
+        :param append: Adds the features to the existing output file, e.g. when resuming a run.
+            Otherwise the file is replaced, and a new checkpoint is started
+        :type append: bool
+        """
+
+        self.output_path = output_path
+        self.source_fields = source_fields
+        self.crs = crs
+        self.transform_context = transform_context
+        self.chunk_size = max(1, int(chunk_size))
+        self.checkpoint = checkpoint
+        self.append = append
+
+        self.schema = None  # ResultSchema
+        self.columns = None  # ResultColumns of the buffered features
+        self.buffer = []  # (Point ID, attributes, point) of the buffered features
+        self.pending_values = []  # Values of the buffered features received before the schema were set
+
+        self.sink = None
+        self.fields = None
+        self.fid_index = -1
+        self.error_msg = ''
+
+    def has_schema(self):
+        """Checks whether the result schema has been set.
+
+        :returns: True if the schema has been set, otherwise False
+        :rtype: Boolean
+        """
+
+        return self.schema is not None
+
+    def set_schema(self, schema):
+        """Sets the result schema, of which the fields are added to the output.
+
+        :param schema: The result schema
+        :type schema: ResultSchema
+        """
+
+        self.schema = schema
+        self.columns = schema.new_columns(self.chunk_size)
+        for list_values in self.pending_values:
+            self.columns.append_values(list_values)
+        self.pending_values = []
+
+    @property
+    def ignored_field_names(self):
+        """Keys which were received, but are not part of the result schema.
+
+        :rtype: set
+        """
+
+        return self.schema.ignored_keys if self.schema is not None else set()
+
+    def add_feature(self, point_id, attributes, point, list_values):
+        """Adds the values of a point to the columns, and buffers the feature.
+        The buffer is written to the file once it contains chunk_size features.
+
+        :param point_id: Position of the point in the input, recorded in the checkpoint
+        :type point_id: int
+
+        :param attributes: Attributes of the input feature
+        :type attributes: list
+
+        :param point: Location of the point, None if the feature has no geometry
+        :type point: QgsPointXY
+
+        :param list_values: (Service key, value) pairs of the response, None if the point were not requested
+        :type list_values: list
+
+        :returns: True if successful, otherwise False
+        :rtype: Boolean
+        """
+
+        if self.columns is None:
+            self.pending_values.append(list_values)
+        else:
+            self.columns.append_values(list_values)
+        self.buffer.append((point_id, attributes, point))
+
+        if len(self.buffer) >= self.chunk_size:
+            return self.flush()
+
+        return True
+
+    def create_sink(self):
+        """Creates the output file using the input fields and the fields of the result schema.
+        A new checkpoint is started in the file, unless features are appended.
+
+        :returns: True if successful, otherwise False
+        :rtype: Boolean
+        """
+
+        self.fields = QgsFields(self.source_fields)
+        for field_name in self.schema.field_names:
+            if self.fields.lookupField(field_name) == -1:
+                self.fields.append(QgsField(field_name, QVariant.String))
+        self.fid_index = self.fields.lookupField(FID_FIELD_NAME)
+
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = 'GPKG'
+        options.fileEncoding = 'UTF-8'
+        if self.append:
+            options.actionOnExistingFile = QgsVectorFileWriter.AppendToLayerNoNewFields
+
+        self.sink = QgsVectorFileWriter.create(
+            self.output_path,
+            self.fields,
+            QgsWkbTypes.Point,
+            self.crs,
+            self.transform_context,
+            options
+        )
+        if self.sink.hasError() != QgsVectorFileWriter.NoError:
+            self.error_msg = "Could not create {}: {}".format(self.output_path, self.sink.errorMessage())
+            self.sink = None
+            return False
+
+        if self.checkpoint is not None and not self.append:
+            self.checkpoint.start()
+
+        return True
+
+    def flush(self):
+        """Writes all of the buffered features to the file. The output file is created on the first call.
+
+        :returns: True if successful, otherwise False
+        :rtype: Boolean
+        """
+
+        if len(self.buffer) == 0:
+            return True
+
+        if self.schema is None:
+            # None of the buffered features received data, the output has no result fields
+            self.set_schema(ResultSchema(None, []))
+
+        if self.sink is None and not self.create_sink():
+            return False
+
+        field_names = self.schema.field_names
+        list_rows = list(self.columns.rows())
+        list_features = []
+        for (point_id, attributes, point), row in zip(self.buffer, list_rows):
+            feature = QgsFeature(self.fields)
+            feature_attributes = list(attributes) + list(row)
+            if self.fid_index != -1:
+                # A new feature ID is assigned by the file, as multipart features share the ID of the input
+                feature_attributes[self.fid_index] = None
+            feature.setAttributes(feature_attributes)
+            if point is not None:
+                feature.setGeometry(QgsGeometry.fromPointXY(point))
+            list_features.append(feature)
+
+        success = self.sink.addFeatures(list_features, QgsFeatureSink.FastInsert)
+        if success:
+            # Features are recorded in the checkpoint once they are in the file
+            self.sink.flushBuffer()
+            if self.checkpoint is not None:
+                self.checkpoint.record({
+                    point_id: dict(zip(field_names, row)) for (point_id, attributes, point), row in zip(
+                        self.buffer, list_rows)
+                })
+        else:
+            self.error_msg = "Could not write to {}: {}".format(self.output_path, self.sink.lastError())
+        self.buffer = []
+        self.columns.clear()
+
+        return success
+
+    def close(self):
+        """Writes the remaining features and closes the output file.
+
+        :returns: True if successful, otherwise False
+        :rtype: Boolean
+        """
+
+        success = self.flush()
+
+        # The file is closed once the writer is deleted
+        self.sink = None
+
+        return success
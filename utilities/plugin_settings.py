@@ -0,0 +1,134 @@
+"""Snapshot of the plugin settings.
+
+The settings stored in QgsSettings are read once into an immutable
+PluginSettings, which is shared by the panel, the processing tool and the
+request functions. Operations read the snapshot once and pass the values on,
+instead of querying QgsSettings for each point or service. The snapshot is
+read again after the options dialog saved the settings (settingsChanged).
+"""
+
+import os
+import sys
+import inspect
+import threading
+
+from dataclasses import dataclass
+
+from qgis.core import QgsSettings
+
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from bridge_api.default import (
+    API_DEFAULT_URL,
+    REQUEST_CRS,
+    DECIMAL_PLACES,
+    CONNECTION_POOL_SIZE,
+    CONNECTION_MAX_RETRIES,
+    CONNECTION_BACKOFF_FACTOR,
+    RATE_LIMIT,
+    CACHE_TTL,
+    CACHE_MAX_ENTRIES,
+    CACHE_SNAP_DECIMALS,
+    TOOL_TRANSFORM_BATCH_SIZE,
+    TOOL_SHARED_RESULTS
+)
+
+# Current snapshot. Read on first use, and again once invalidated
+_settings = None
+_settings_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PluginSettings:
+    """Immutable snapshot of the plugin settings."""
+
+    api_url: str = API_DEFAULT_URL  # Base request URL
+    request_crs: str = REQUEST_CRS  # Coordinate system option of the requests
+    dec_places_panel: int = DECIMAL_PLACES
+    dec_places_tool: int = DECIMAL_PLACES
+    auto_clear_table: bool = False  # Clears the panel table on each canvas click
+
+    # Connections and request rate
+    pool_size: int = CONNECTION_POOL_SIZE
+    max_retries: int = CONNECTION_MAX_RETRIES
+    backoff_factor: float = CONNECTION_BACKOFF_FACTOR
+    rate_limit: float = RATE_LIMIT
+
+    # Query cache
+    cache_enabled: bool = True
+    cache_ttl: int = CACHE_TTL
+    cache_max_entries: int = CACHE_MAX_ENTRIES
+    cache_snap_decimals: int = CACHE_SNAP_DECIMALS
+
+    # Processing tool
+    transform_batch_size: int = TOOL_TRANSFORM_BATCH_SIZE  # Points transformed to WGS84 per call
+    shared_results: int = TOOL_SHARED_RESULTS  # Recent location results reused by later points
+
+    @classmethod
+    def read(cls, settings=None):
+        """Reads the settings. Settings which have not been set keep their defaults.
+
+        :param settings: Settings to read. The QGIS settings are read if not provided
+        :type settings: QgsSettings
+
+        :returns: The settings
+        :rtype: PluginSettings
+        """
+
+        if settings is None:
+            settings = QgsSettings()
+
+        return cls(
+            api_url=settings.value('geocontext-qgis-plugin/url', API_DEFAULT_URL, type=str),
+            request_crs=settings.value('geocontext-qgis-plugin/request_crs', REQUEST_CRS, type=str),
+            dec_places_panel=settings.value('geocontext-qgis-plugin/dec_places_panel', DECIMAL_PLACES, type=int),
+            dec_places_tool=settings.value('geocontext-qgis-plugin/dec_places_tool', DECIMAL_PLACES, type=int),
+            auto_clear_table=settings.value('geocontext-qgis-plugin/auto_clear_table', False, type=bool),
+            pool_size=settings.value('geocontext-qgis-plugin/pool_size', CONNECTION_POOL_SIZE, type=int),
+            max_retries=settings.value('geocontext-qgis-plugin/max_retries', CONNECTION_MAX_RETRIES, type=int),
+            backoff_factor=settings.value('geocontext-qgis-plugin/backoff_factor', CONNECTION_BACKOFF_FACTOR,
+                                          type=float),
+            rate_limit=settings.value('geocontext-qgis-plugin/rate_limit', RATE_LIMIT, type=float),
+            cache_enabled=settings.value('geocontext-qgis-plugin/cache_enabled', True, type=bool),
+            cache_ttl=settings.value('geocontext-qgis-plugin/cache_ttl', CACHE_TTL, type=int),
+            cache_max_entries=settings.value('geocontext-qgis-plugin/cache_max_entries', CACHE_MAX_ENTRIES, type=int),
+            cache_snap_decimals=settings.value('geocontext-qgis-plugin/cache_snap_decimals', CACHE_SNAP_DECIMALS,
+                                               type=int),
+            transform_batch_size=settings.value('geocontext-qgis-plugin/transform_batch_size',
+                                                TOOL_TRANSFORM_BATCH_SIZE, type=int),
+            shared_results=settings.value('geocontext-qgis-plugin/shared_results', TOOL_SHARED_RESULTS, type=int)
+        )
+
+
+def get_settings():
+    """Returns the current settings snapshot. The settings are read on first use,
+    and again after invalidate_settings has been called.
+
+    :returns: The settings
+    :rtype: PluginSettings
+    """
+
+    global _settings
+
+    settings = _settings
+    if settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = PluginSettings.read()
+            settings = _settings
+
+    return settings
+
+
+def invalidate_settings():
+    """Discards the settings snapshot, e.g. once the options dialog saved the settings.
+    Operations in progress keep the snapshot they started with.
+    """
+
+    global _settings
+
+    with _settings_lock:
+        _settings = None
@@ -0,0 +1,179 @@
+"""Point grouping used by the processing tool.
+
+Groups the input points by location, so that a single request is performed for
+points at the same location (or within the snapping tolerance of each other),
+and the received data is written to all of the points of the group.
+
+Points are hashed into a grid with cells of the tolerance size. A point joins
+the nearest group within the tolerance in its own or the neighbouring cells,
+otherwise it starts a new group at its location. PointGrouper does this one
+point at a time, so it can be used on a stream of features. It keeps a bounded
+number of the most recently used groups, so memory does not grow with the
+number of locations in the stream.
+"""
+
+import math
+
+from collections import OrderedDict
+
+# Approximate length of a degree of latitude (and of longitude at the equator)
+METRES_PER_DEGREE = 111320.0
+
+# Limits the number of cells searched in longitude close to the poles
+MIN_LONGITUDE_SCALE = 0.01
+
+
+class PointGroup(object):
+    """Points which share a single request."""
+
+    __slots__ = ('x', 'y', 'fids', 'cell')
+
+    def __init__(self, x, y):
+        """Constructor.
+
+        :param x: Longitude coordinate at which the request is performed
+        :type x: float
+
+        :param y: Latitude coordinate at which the request is performed
+        :type y: float
+        """
+
+        self.x = x
+        self.y = y
+        self.fids = []  # Feature IDs of the points in the group
+        self.cell = None  # Grid cell of the group
+
+
+def distance_metres(x1, y1, x2, y2):
+    """Returns the approximate distance between two WGS84 coordinates. Accurate for
+    the short distances used by the snapping tolerance.
+
+    :returns: Distance in metres
+    :rtype: float
+    """
+
+    scale = math.cos(math.radians((y1 + y2) / 2.0))
+    dx = (x1 - x2) * scale * METRES_PER_DEGREE
+    dy = (y1 - y2) * METRES_PER_DEGREE
+
+    return math.hypot(dx, dy)
+
+
+class PointGrouper(object):
+    """Finds the group of each point as the points are read, so that points can be
+    grouped while streaming. Only the most recently used groups are kept; a later
+    point at the location of an evicted group starts a new group.
+    """
+
+    def __init__(self, tolerance=0, max_groups=None):
+        """Constructor.
+
+        :param tolerance: Snapping tolerance in metres. If 0, only points at
+            exactly the same coordinates are grouped
+        :type tolerance: float
+
+        :param max_groups: Number of groups kept, e.g. the number of shared
+            request results. All of the groups are kept if None
+        :type max_groups: int
+        """
+
+        self.tolerance = tolerance
+        self.cell_size = tolerance / METRES_PER_DEGREE  # Degrees
+        self.max_groups = None if max_groups is None else max(1, int(max_groups))
+        self.grid = {}  # Grid cell (or coordinates without a tolerance): groups of which the location is in the cell
+        self.recent = OrderedDict()  # Group: None, least recently used first
+
+    def __len__(self):
+        return len(self.recent)
+
+    def use_group(self, group):
+        # Marks a group as the most recently used
+        self.recent.move_to_end(group)
+
+    def add_group(self, group, cell):
+        # Adds a new group to its cell, and evicts the least recently used groups
+        group.cell = cell
+        self.grid.setdefault(cell, []).append(group)
+        self.recent[group] = None
+
+        while self.max_groups is not None and len(self.recent) > self.max_groups:
+            evicted, _ = self.recent.popitem(last=False)
+            list_groups = self.grid[evicted.cell]
+            list_groups.remove(evicted)
+            if len(list_groups) == 0:
+                del self.grid[evicted.cell]
+
+    def find_group(self, x, y):
+        """Returns the group of a point. A new group is started at the point if
+        there is no group within the tolerance.
+
+        :param x: Longitude coordinate (WGS84)
+        :type x: float
+
+        :param y: Latitude coordinate (WGS84)
+        :type y: float
+
+        :returns: The group, and True if the group is new
+        :rtype: tuple
+        """
+
+        if self.tolerance <= 0:
+            list_groups = self.grid.get((x, y))
+            if list_groups:
+                group = list_groups[0]
+                self.use_group(group)
+                return group, False
+
+            group = PointGroup(x, y)
+            self.add_group(group, (x, y))
+            return group, True
+
+        cell_x = int(math.floor(x / self.cell_size))
+        cell_y = int(math.floor(y / self.cell_size))
+
+        # A degree of longitude gets shorter towards the poles, so more cells are checked
+        scale = max(math.cos(math.radians(y)), MIN_LONGITUDE_SCALE)
+        reach_x = int(math.ceil(1.0 / scale))
+
+        nearest_group = None
+        nearest_distance = self.tolerance
+        for i in range(cell_x - reach_x, cell_x + reach_x + 1):
+            for j in range(cell_y - 1, cell_y + 2):
+                for group in self.grid.get((i, j), ()):
+                    distance = distance_metres(x, y, group.x, group.y)
+                    if distance <= nearest_distance:
+                        nearest_group = group
+                        nearest_distance = distance
+
+        if nearest_group is not None:
+            self.use_group(nearest_group)
+            return nearest_group, False
+
+        group = PointGroup(x, y)
+        self.add_group(group, (cell_x, cell_y))
+        return group, True
+
+
+def group_points(points, tolerance=0):
+    """Groups points which are within the tolerance of each other.
+
+    :param points: Feature ID, longitude and latitude (WGS84) of each point
+    :type points: iterable
+
+    :param tolerance: Snapping tolerance in metres. If 0, only points at
+        exactly the same coordinates are grouped
+    :type tolerance: float
+
+    :returns: The groups, in the order in which their first point were provided
+    :rtype: list
+    """
+
+    grouper = PointGrouper(tolerance)
+    list_groups = []
+    for fid, x, y in points:
+        group, is_new = grouper.find_group(x, y)
+        if is_new:
+            list_groups.append(group)
+        group.fids.append(fid)
+
+    return list_groups
@@ -0,0 +1,94 @@
+"""Point request task.
+
+Performs a panel request in a background task, so that the QGIS interface does
+not block while waiting on the server.
+"""
+
+import os
+import sys
+import time
+import inspect
+
+from requests import exceptions
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from utilities.utilities import request_panel_data
+from bridge_api.api_abstract import ApiError
+
+
+class PointRequestTask(QgsTask):
+    """Cancellable task which requests the data for a single location."""
+
+    # Emitted in the main thread with the task once the request is done
+    requestFinished = pyqtSignal(object)
+
+    def __init__(self, request, api_url):
+        """Constructor.
+
+        :param request: The request details: x, y, registry, key, key_name and model
+        :type request: dict
+
+        :param api_url: Endpoint URL used to perform request
+        :type api_url: str
+        """
+
+        description = 'GeoContext request: {} ({}, {})'.format(request['key'], request['x'], request['y'])
+        super(PointRequestTask, self).__init__(description, QgsTask.CanCancel)
+
+        self.request = request
+        self.api_url = api_url
+
+        self.data = None  # Response data
+        self.error_msg = ''
+        self.request_time_ms = 0
+
+    def run(self):
+        """Performs the request. Runs in a background thread, no GUI changes can be made here.
+
+        :returns: True if the request were successful
+        :rtype: Boolean
+        """
+
+        start = time.time()
+        try:
+            self.data = request_panel_data(
+                self.request['registry'],
+                self.request['key'],
+                self.request['x'],
+                self.request['y'],
+                self.api_url
+            )
+        except ApiError as e:
+            self.error_msg = "Could not request " + self.request['key'] + ". " + str(e)
+            return False
+        except exceptions.RequestException as e:
+            self.error_msg = "Could not request " + self.request['key'] + ". Check if the URL is available: " + str(e)
+            return False
+        except Exception as e:
+            self.error_msg = "Could not request " + self.request['key'] + ". Unknown error: " + str(e)
+            return False
+        end = time.time()
+
+        self.request_time_ms = (end - start) * 1000
+
+        # Results of a canceled request are discarded
+        return not self.isCanceled()
+
+    def finished(self, result):
+        """Called in the main thread once the task is done.
+
+        :param result: The return value of run()
+        :type result: Boolean
+        """
+
+        if not result and self.error_msg == '' and not self.isCanceled():
+            self.error_msg = "Could not perform data request. Check if the URL is available."
+
+        self.requestFinished.emit(self)
@@ -0,0 +1,385 @@
+"""Query caches.
+
+QueryCache stores GeoContext query responses in a SQLite database so that the
+same site does not have to be requested from the server again. Entries are keyed
+by the endpoint, registry, key and the snapped coordinates of the request, expire
+after a time-to-live and the least recently used entries are removed once the
+cache is full. Access times of cache hits are kept in memory and written in a
+single transaction, with the next stored response or once enough has gathered,
+so reading from the cache does not commit to disk.
+
+MemoryQueryCache keeps the most recent responses in memory, so that repeated
+panel requests for the same location are answered without any I/O.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from bridge_api.json_decoder import loads, dumps
+
+
+class QueryCache(object):
+    """SQLite backed cache of query responses."""
+
+    # Once full, the cache is reduced to this fraction of its maximum size
+    EVICTION_TARGET = 0.9
+
+    # Number of access times of cache hits kept in memory before they are written
+    ACCESS_FLUSH_SIZE = 1000
+
+    def __init__(self, db_path, ttl=604800, max_entries=100000, snap_decimals=5):
+        """Constructor.
+
+        :param db_path: Directory and filename of the cache database
+        :type db_path: str
+
+        :param ttl: Time (seconds) after which an entry expires. 0 or less never expires
+        :type ttl: int
+
+        :param max_entries: Maximum number of entries stored in the cache
+        :type max_entries: int
+
+        :param snap_decimals: Number of decimals the coordinates are rounded to,
+            requests which snap to the same coordinates share an entry
+        :type snap_decimals: int
+        """
+
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self.snap_decimals = int(snap_decimals)
+
+        self.hits = 0
+        self.misses = 0
+
+        # Access times of cache hits not yet written to the database, least recently used first
+        self.pending_access = OrderedDict()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir != '' and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        # The cache is shared by the processing tool worker threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS query_cache ('
+            'endpoint TEXT NOT NULL, '
+            'registry TEXT NOT NULL, '
+            'key TEXT NOT NULL, '
+            'x REAL NOT NULL, '
+            'y REAL NOT NULL, '
+            'response TEXT NOT NULL, '
+            'created REAL NOT NULL, '
+            'accessed REAL NOT NULL, '
+            'PRIMARY KEY (endpoint, registry, key, x, y))'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS query_cache_accessed ON query_cache (accessed)')
+        self.connection.commit()
+
+        self.entry_count = self.connection.execute('SELECT COUNT(*) FROM query_cache').fetchone()[0]
+
+    def snap(self, x, y):
+        """Snaps the coordinates to the cache grid.
+
+        :param x: Longitude coordinate
+        :type x: float
+
+        :param y: Latitude coordinate
+        :type y: float
+
+        :returns: The snapped coordinates
+        :rtype: tuple
+        """
+
+        return round(float(x), self.snap_decimals), round(float(y), self.snap_decimals)
+
+    def get(self, endpoint, registry, key, x, y):
+        """Returns the cached response of a request.
+
+        :returns: The response data, None if the request is not cached or has expired
+        :rtype: dict
+        """
+
+        response = self.get_response(endpoint, registry, key, x, y)
+        if response is None:
+            return None
+
+        return loads(response)
+
+    def get_response(self, endpoint, registry, key, x, y):
+        """Returns the cached response document of a request, without decoding it.
+
+        :param endpoint: API URL
+        :type endpoint: str
+
+        :param registry: Registry: Service, group or collection
+        :type registry: str
+
+        :param key: Key of the requested data
+        :type key: str
+
+        :param x: Longitude coordinate
+        :type x: float
+
+        :param y: Latitude coordinate
+        :type y: float
+
+        :returns: The JSON response, None if the request is not cached or has expired
+        :rtype: str
+        """
+
+        x, y = self.snap(x, y)
+        now = time.time()
+        entry_key = (endpoint, registry.lower(), key, x, y)
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT response, created FROM query_cache '
+                'WHERE endpoint=? AND registry=? AND key=? AND x=? AND y=?', entry_key
+            ).fetchone()
+
+            if row is None:
+                self.misses = self.misses + 1
+                return None
+
+            response, created = row
+            if 0 < self.ttl < now - created:
+                # Entry has expired
+                self.connection.execute(
+                    'DELETE FROM query_cache WHERE endpoint=? AND registry=? AND key=? AND x=? AND y=?', entry_key)
+                self.connection.commit()
+                self.pending_access.pop(entry_key, None)
+                self.entry_count = self.entry_count - 1
+                self.misses = self.misses + 1
+                return None
+
+            # The access time is written later, together with the access times of other hits
+            self.pending_access[entry_key] = now
+            self.pending_access.move_to_end(entry_key)
+            if len(self.pending_access) >= self.ACCESS_FLUSH_SIZE:
+                self.write_access_times()
+                self.connection.commit()
+            self.hits = self.hits + 1
+
+        return response
+
+    def put(self, endpoint, registry, key, x, y, data):
+        """Adds the response of a request to the cache. The least recently used entries
+        are removed if the cache is full.
+
+        :param endpoint: API URL
+        :type endpoint: str
+
+        :param registry: Registry: Service, group or collection
+        :type registry: str
+
+        :param key: Key of the requested data
+        :type key: str
+
+        :param x: Longitude coordinate
+        :type x: float
+
+        :param y: Latitude coordinate
+        :type y: float
+
+        :param data: The response data
+        :type data: dict
+        """
+
+        self.put_response(endpoint, registry, key, x, y, dumps(data))
+
+    def put_response(self, endpoint, registry, key, x, y, response):
+        """Adds the response document of a request to the cache, e.g. the content of the
+        response as received. The least recently used entries are removed if the cache is full.
+
+        :param response: The JSON response
+        :type response: str
+        """
+
+        x, y = self.snap(x, y)
+        now = time.time()
+        entry_key = (endpoint, registry.lower(), key, x, y)
+        with self.lock:
+            self.pending_access.pop(entry_key, None)
+            cursor = self.connection.execute(
+                'UPDATE query_cache SET response=?, created=?, accessed=? '
+                'WHERE endpoint=? AND registry=? AND key=? AND x=? AND y=?', (response, now, now) + entry_key)
+            if cursor.rowcount == 0:
+                self.connection.execute(
+                    'INSERT INTO query_cache (endpoint, registry, key, x, y, response, created, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', entry_key + (response, now, now))
+                self.entry_count = self.entry_count + 1
+
+            if self.entry_count > self.max_entries:
+                self.evict()
+            self.connection.commit()
+
+    def write_access_times(self):
+        """Writes the access times of recent cache hits, so that they are used by the eviction.
+        The changes are committed by the caller. The lock needs to be held by the caller.
+        """
+
+        if len(self.pending_access) == 0:
+            return
+
+        self.connection.executemany(
+            'UPDATE query_cache SET accessed=? '
+            'WHERE endpoint=? AND registry=? AND key=? AND x=? AND y=?',
+            [(accessed,) + entry_key for entry_key, accessed in self.pending_access.items()]
+        )
+        self.pending_access.clear()
+
+    def flush(self):
+        """Writes the access times of recent cache hits to the database."""
+
+        with self.lock:
+            self.write_access_times()
+            self.connection.commit()
+
+    def evict(self):
+        """Removes expired entries and the least recently used entries until the
+        cache is within its size limit. The lock needs to be held by the caller.
+        """
+
+        target_entries = int(self.max_entries * self.EVICTION_TARGET)
+
+        # Recently used entries are kept
+        self.write_access_times()
+
+        if self.ttl > 0:
+            self.connection.execute('DELETE FROM query_cache WHERE created < ?', (time.time() - self.ttl,))
+
+        self.connection.execute(
+            'DELETE FROM query_cache WHERE rowid IN ('
+            'SELECT rowid FROM query_cache ORDER BY accessed ASC LIMIT MAX(0, (SELECT COUNT(*) FROM query_cache) - ?))',
+            (target_entries,)
+        )
+        self.entry_count = self.connection.execute('SELECT COUNT(*) FROM query_cache').fetchone()[0]
+
+    def clear(self):
+        """Removes all of the entries from the cache and resets the counters."""
+
+        with self.lock:
+            self.connection.execute('DELETE FROM query_cache')
+            self.connection.commit()
+            self.pending_access.clear()
+            self.entry_count = 0
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Writes the access times of recent cache hits and closes the cache database."""
+
+        with self.lock:
+            self.write_access_times()
+            self.connection.commit()
+            self.connection.close()
+
+
+class MemoryQueryCache(object):
+    """Bounded in-memory least recently used cache of query responses."""
+
+    def __init__(self, max_entries=256, snap_decimals=5):
+        """Constructor.
+
+        :param max_entries: Maximum number of responses kept in memory
+        :type max_entries: int
+
+        :param snap_decimals: Number of decimals the coordinates are rounded to
+        :type snap_decimals: int
+        """
+
+        self.max_entries = max(1, int(max_entries))
+        self.snap_decimals = int(snap_decimals)
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # Least recently used entry first
+
+        # The endpoint and registry lists the entries were requested with
+        self.endpoint = None
+        self.registry_fingerprint = None
+
+    def entry_key(self, endpoint, registry, key, x, y):
+        """Returns the key under which a response is stored.
+
+        :returns: Endpoint, registry, key and the snapped coordinates
+        :rtype: tuple
+        """
+
+        return (
+            endpoint,
+            registry.lower(),
+            key,
+            round(float(x), self.snap_decimals),
+            round(float(y), self.snap_decimals)
+        )
+
+    def get(self, endpoint, registry, key, x, y):
+        """Returns the response of a recent request.
+
+        :returns: The response data, None if the request is not in memory
+        :rtype: dict
+        """
+
+        entry_key = self.entry_key(endpoint, registry, key, x, y)
+        with self.lock:
+            data = self.entries.get(entry_key)
+            if data is None:
+                self.misses = self.misses + 1
+                return None
+
+            self.entries.move_to_end(entry_key)
+            self.hits = self.hits + 1
+
+        return data
+
+    def put(self, endpoint, registry, key, x, y, data):
+        """Adds a response. The least recently used response is removed if the cache is full.
+        """
+
+        entry_key = self.entry_key(endpoint, registry, key, x, y)
+        with self.lock:
+            self.entries[entry_key] = data
+            self.entries.move_to_end(entry_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate_if_changed(self, endpoint=None, registry_lists=None):
+        """Removes all of the responses if the endpoint URL or the registry lists
+        differs from the ones the responses were requested with.
+
+        :param endpoint: Endpoint URL. Not checked if None
+        :type endpoint: str
+
+        :param registry_lists: Service, group and collection registry lists. Not checked if None
+        :type registry_lists: list
+        """
+
+        with self.lock:
+            if endpoint is not None and endpoint != self.endpoint:
+                self.entries.clear()
+                self.endpoint = endpoint
+
+            if registry_lists is not None:
+                dump = json.dumps(registry_lists, sort_keys=True).encode('utf-8')
+                fingerprint = hashlib.sha1(dump).hexdigest()
+                if fingerprint != self.registry_fingerprint:
+                    self.entries.clear()
+                    self.registry_fingerprint = fingerprint
+
+    def clear(self):
+        """Removes all of the responses."""
+
+        with self.lock:
+            self.entries.clear()
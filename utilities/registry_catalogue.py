@@ -0,0 +1,264 @@
+"""Registry catalogue.
+
+Keeps the lists of available service, group and collection registries. The lists
+are stored on disk, so that they are available instantly when the plugin starts,
+and are refreshed from the server in a background task.
+"""
+
+import os
+import sys
+import json
+import time
+import inspect
+
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+from qgis.core import (
+    QgsApplication,
+    QgsTask
+)
+
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from bridge_api.api_abstract import ApiClient
+from bridge_api.default import (
+    API_DEFAULT_URL,
+    SERVICE,
+    GROUP,
+    COLLECTION,
+    CONNECTION_TIMEOUT,
+    CACHE_DIRECTORY,
+    REGISTRY_CACHE_FILE_NAME
+)
+
+REGISTRY_KEYS = [SERVICE['key'], GROUP['key'], COLLECTION['key']]
+
+# Catalogue shared by the panel and the processing tool. Created on first use
+_registry_catalogue = None
+
+
+class RegistryRefreshTask(QgsTask):
+    """Background task which requests the registry lists from the server."""
+
+    def __init__(self, catalogue, api_url, etags):
+        """Constructor.
+
+        :param catalogue: The catalogue to which the received lists will be applied
+        :type catalogue: RegistryCatalogue
+
+        :param api_url: API URL used to request the registries
+        :type api_url: str
+
+        :param etags: ETag of each of the currently stored registry lists
+        :type etags: dict
+        """
+
+        super(RegistryRefreshTask, self).__init__('GeoContext registries refresh', QgsTask.CanCancel)
+
+        self.catalogue = catalogue
+        self.api_url = api_url
+        self.etags = etags
+
+        self.results = {}  # Registry key: (list, ETag). None list if unchanged
+        self.error_msg = ''
+
+    def run(self):
+        """Requests the lists. Runs in a background thread, no GUI changes can be made here.
+
+        :returns: True if all of the registries were received
+        :rtype: Boolean
+        """
+
+        client = ApiClient()
+        for registry in REGISTRY_KEYS:
+            if self.isCanceled():
+                return False
+
+            request_url = "{}/registries?registry={}".format(self.api_url, registry)
+            headers = {}
+            if self.etags.get(registry):
+                headers['If-None-Match'] = self.etags[registry]
+
+            try:
+                response = client.get(request_url, headers=headers, timeout=CONNECTION_TIMEOUT)
+            except Exception as e:  # Could not connect to the provided URL
+                self.error_msg = "Could not connect to " + request_url + ". Error: " + str(e)
+                return False
+
+            if response.status_code == 304:
+                # The stored list is still up to date
+                self.results[registry] = (None, self.etags.get(registry))
+            elif response.status_code == 200:
+                self.results[registry] = (response.json(), response.headers.get('ETag'))
+            else:
+                self.error_msg = "Could not retrieve " + request_url + ". Status code: " + str(response.status_code)
+                return False
+
+            self.setProgress(100 * len(self.results) / len(REGISTRY_KEYS))
+
+        return True
+
+    def finished(self, result):
+        """Called in the main thread once the task is done.
+
+        :param result: The return value of run()
+        :type result: Boolean
+        """
+
+        self.catalogue.refresh_finished(self, result)
+
+
+class RegistryCatalogue(QObject):
+    """Service, group and collection registry lists, with a cache on disk."""
+
+    # Emitted when new lists has been received from the server
+    updated = pyqtSignal()
+    # Emitted with an error message if the lists could not be refreshed
+    refreshFailed = pyqtSignal(str)
+
+    def __init__(self, api_url, cache_path, parent=None):
+        """Constructor.
+
+        :param api_url: API URL used to request the registries
+        :type api_url: str
+
+        :param cache_path: Directory and filename of the registry cache (json)
+        :type cache_path: str
+        """
+
+        super(RegistryCatalogue, self).__init__(parent)
+
+        self.api_url = api_url
+        self.cache_path = cache_path
+
+        self.registries = {registry: [] for registry in REGISTRY_KEYS}
+        self.etags = {}
+        self.timestamp = None  # Time of the last successful refresh
+
+        self.task = None
+
+        self.load_cached()
+
+    def registry_list(self, registry):
+        """Returns the list of available layers for the provided registry.
+
+        :param registry: Registry key: service, group or collection
+        :type registry: str
+
+        :returns: A list of available data in json format
+        :rtype: list
+        """
+
+        return self.registries.get(registry, [])
+
+    def is_empty(self):
+        """Checks whether any of the lists contains registries.
+
+        :returns: True if no registries are available
+        :rtype: Boolean
+        """
+
+        return all(len(list_registry) == 0 for list_registry in self.registries.values())
+
+    def load_cached(self):
+        """Loads the lists stored on disk.
+
+        :returns: True if the lists could be loaded
+        :rtype: Boolean
+        """
+
+        if not os.path.exists(self.cache_path):
+            return False
+
+        try:
+            with open(self.cache_path, 'r') as cache_file:
+                cached = json.load(cache_file)
+        except (IOError, ValueError):  # Unreadable file, the lists will be requested again
+            return False
+
+        if cached.get('api_url') != self.api_url:
+            # Stored lists are from another endpoint
+            return False
+
+        for registry in REGISTRY_KEYS:
+            self.registries[registry] = cached.get('registries', {}).get(registry, [])
+        self.etags = cached.get('etags', {})
+        self.timestamp = cached.get('timestamp')
+
+        return True
+
+    def save_cached(self):
+        """Stores the lists on disk."""
+
+        cache_dir = os.path.dirname(self.cache_path)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        cached = {
+            'api_url': self.api_url,
+            'timestamp': self.timestamp,
+            'etags': self.etags,
+            'registries': self.registries
+        }
+        with open(self.cache_path, 'w') as cache_file:
+            json.dump(cached, cache_file)
+
+    def refresh(self):
+        """Requests the lists from the server in a background task. The updated signal is
+        emitted once new lists has been received.
+        """
+
+        if self.task is not None:
+            # A refresh is already in progress
+            return
+
+        self.task = RegistryRefreshTask(self, self.api_url, dict(self.etags))
+        QgsApplication.taskManager().addTask(self.task)
+
+    def refresh_finished(self, task, result):
+        """Applies the lists received by the refresh task.
+
+        :param task: The finished refresh task
+        :type task: RegistryRefreshTask
+
+        :param result: True if the task were successful
+        :type result: Boolean
+        """
+
+        self.task = None
+
+        if not result:
+            self.refreshFailed.emit(task.error_msg)
+            return
+
+        changed = False
+        for registry, (list_registry, etag) in task.results.items():
+            if list_registry is not None:
+                changed = changed or list_registry != self.registries[registry]
+                self.registries[registry] = list_registry
+            self.etags[registry] = etag
+
+        self.timestamp = time.time()
+        self.save_cached()
+
+        if changed:
+            self.updated.emit()
+
+
+def get_registry_catalogue():
+    """Returns the registry catalogue shared by the plugin. The cached lists are loaded
+    when the catalogue is created.
+
+    :returns: The registry catalogue
+    :rtype: RegistryCatalogue
+    """
+
+    global _registry_catalogue
+
+    if _registry_catalogue is None:
+        cache_path = os.path.join(QgsApplication.qgisSettingsDirPath(), CACHE_DIRECTORY, REGISTRY_CACHE_FILE_NAME)
+        _registry_catalogue = RegistryCatalogue(API_DEFAULT_URL, cache_path)
+
+    return _registry_catalogue
@@ -0,0 +1,184 @@
+"""Concurrent request engine.
+
+Performs the GeoContext requests for a sequence of items using a pool of worker
+threads. A bounded number of requests is kept in flight and the results are
+returned in the same order as the items were provided. The number of requests
+in flight can be adjusted while running by a concurrency controller.
+
+SharedRequests lets items which need the same data share a single request.
+"""
+
+import time
+import threading
+
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+# How often (seconds) a cancel request is checked while waiting on a response
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def ordered_concurrent_requests(request_function, items, max_requests, is_canceled=None, concurrency=None):
+    """Calls request_function for each of the items with up to max_requests calls
+    in flight at the same time. Results are yielded in the order of the items.
+
+    The items are read lazily, so a feature iterator can be provided directly
+    without first loading all of the features in memory.
+
+    :param request_function: Function which performs the request for an item.
+        Called from a worker thread.
+    :type request_function: function
+
+    :param items: The items to request the data for, e.g. point features.
+    :type items: iterable
+
+    :param max_requests: Maximum number of concurrent requests.
+    :type max_requests: int
+
+    :param is_canceled: Returns True when the user canceled the operation,
+        e.g. QgsProcessingFeedback.isCanceled. Checked while waiting on results.
+    :type is_canceled: function
+
+    :param concurrency: Limits the requests in flight below max_requests, e.g.
+        ApiClient.concurrency. Each request holds one of its slots.
+    :type concurrency: AimdController
+
+    :returns: Tuples of the item, the request result (None if the request failed)
+        and the exception raised by the request (None if successful).
+    :rtype: generator
+    """
+
+    max_requests = max(1, int(max_requests))
+    items = iter(items)
+    pending = deque()  # (item, future) in the order of the items
+
+    def canceled():
+        return is_canceled is not None and is_canceled()
+
+    if concurrency is not None:
+        unlimited_function = request_function
+
+        def request_function(item):
+            concurrency.acquire()
+            try:
+                return unlimited_function(item)
+            finally:
+                concurrency.release()
+
+    def submit_next(executor):
+        for item in items:
+            pending.append((item, executor.submit(request_function, item)))
+            return True
+        return False
+
+    executor = ThreadPoolExecutor(max_workers=max_requests)
+    try:
+        # Fills the pool. Twice the number of workers are queued so that a
+        # worker never idles while the oldest result is being consumed
+        while len(pending) < max_requests * 2 and submit_next(executor):
+            pass
+
+        while pending:
+            item, future = pending[0]
+
+            # Waits for the oldest request, checking for cancellation in between
+            while True:
+                if canceled():
+                    return
+                try:
+                    result = future.result(timeout=CANCEL_POLL_INTERVAL)
+                    error = None
+                    break
+                except TimeoutError:
+                    continue
+                except Exception as e:  # The request itself failed
+                    result = None
+                    error = e
+                    break
+
+            pending.popleft()
+            submit_next(executor)
+
+            yield item, result, error
+    finally:
+        # Requests which has not started yet are dropped
+        for item, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def timed_request(request_function):
+    """Wraps a request function so that it also returns the time the request took.
+
+    :param request_function: Function which performs the request for an item.
+    :type request_function: function
+
+    :returns: Function which returns the request result and the request time (ms).
+    :rtype: function
+    """
+
+    def request(item):
+        start = time.time()
+        result = request_function(item)
+        end = time.time()
+
+        return result, (end - start) * 1000
+
+    return request
+
+
+class SharedRequests(object):
+    """Performs a single request for all of the calls with the same key. Calls
+    made while the request is in progress wait on its result, and later calls
+    receive the stored result. Only the most recent results are kept.
+    """
+
+    def __init__(self, request_function, max_entries=10000):
+        """Constructor.
+
+        :param request_function: Function which performs the request.
+        :type request_function: function
+
+        :param max_entries: Number of results kept for later calls.
+        :type max_entries: int
+        """
+
+        self.request_function = request_function
+        self.max_entries = max(1, int(max_entries))
+
+        self.lock = threading.Lock()
+        self.futures = OrderedDict()  # Key: future of the request, least recently used first
+
+    def __call__(self, key, *args):
+        """Returns the result of the request for the key. The request is performed
+        using the provided arguments if there is no result for the key.
+
+        :param key: Calls with the same key share a request, e.g. a location.
+        :type key: hashable
+
+        :returns: The request result
+        :rtype: object
+        """
+
+        with self.lock:
+            future = self.futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.futures[key] = future
+                while len(self.futures) > self.max_entries:
+                    self.futures.popitem(last=False)
+            else:
+                self.futures.move_to_end(key)
+
+        if is_owner:
+            try:
+                future.set_result(self.request_function(*args))
+            except Exception as e:
+                # Later calls will perform the request again
+                with self.lock:
+                    if self.futures.get(key) is future:
+                        del self.futures[key]
+                future.set_exception(e)
+
+        return future.result()
@@ -0,0 +1,198 @@
+"""Result schema used by the processing tool.
+
+The service keys which a request for a registry key returns are resolved once,
+into a fixed ordered list, either from the registries list or from the first
+response. Responses are then decoded straight into column arrays in the order
+of the schema, and the values are rounded once while decoding. The output
+writer reads the columns a chunk at a time.
+"""
+
+import os
+import sys
+import inspect
+
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from bridge_api.default import (
+    SERVICE,
+    GROUP,
+    COLLECTION,
+    SERVICE_JSON,
+    GROUP_JSON
+)
+
+
+def round_value(value, rounding_factor):
+    """Rounds a value to the decimal places of the processing tool. Integers
+    and text are returned as they are.
+
+    :param value: Value as received from the server
+    :type value: str
+
+    :param rounding_factor: Number of decimal places
+    :type rounding_factor: int
+
+    :returns: The rounded value
+    :rtype: str
+    """
+
+    if isinstance(value, str):
+        if value.isdigit():
+            return value
+        try:
+            return str(round(float(value), rounding_factor))
+        except ValueError:
+            return value
+    elif isinstance(value, float):
+        return str(round(value, rounding_factor))
+
+    return value
+
+
+def response_services(registry, data_json):
+    """Returns the services contained in a response, in the order of the response.
+
+    :param registry: Registry: Service, group or collection
+    :type registry: str
+
+    :param data_json: Response data
+    :type data_json: dict
+
+    :returns: Service dictionaries, each with a key and a value
+    :rtype: list
+    """
+
+    if registry == SERVICE['key']:
+        return [data_json]
+    elif registry == GROUP['key']:
+        return data_json.get(SERVICE_JSON, [])
+    elif registry == COLLECTION['key']:
+        return [service for group in data_json.get(GROUP_JSON, []) for service in group.get(SERVICE_JSON, [])]
+
+    return []
+
+
+class ResultSchema(object):
+    """Fixed ordered list of the service keys returned for a registry key."""
+
+    def __init__(self, registry, service_keys, rounding_factor=3):
+        """Constructor.
+
+        :param registry: Registry: Service, group or collection
+        :type registry: str
+
+        :param service_keys: Ordered service keys, which become the result fields
+        :type service_keys: list
+
+        :param rounding_factor: Number of decimal places of the values
+        :type rounding_factor: int
+        """
+
+        self.registry = registry
+        self.field_names = []
+        self.index = {}  # Service key: column
+        for key in service_keys:
+            if key not in self.index:
+                self.index[key] = len(self.field_names)
+                self.field_names.append(key)
+        self.rounding_factor = rounding_factor
+
+        self.ignored_keys = set()  # Received, but not part of the schema
+
+    @classmethod
+    def from_values(cls, registry, list_values, rounding_factor=3):
+        """Creates the schema from the (service key, value) pairs of a response.
+
+        :returns: The schema
+        :rtype: ResultSchema
+        """
+
+        return cls(registry, [key for key, value in list_values], rounding_factor)
+
+    def new_columns(self, capacity):
+        """Creates column arrays for this schema.
+
+        :param capacity: Number of rows
+        :type capacity: int
+
+        :rtype: ResultColumns
+        """
+
+        return ResultColumns(self, capacity)
+
+
+class ResultColumns(object):
+    """Preallocated column arrays, a column per field of the schema."""
+
+    def __init__(self, schema, capacity):
+        """Constructor.
+
+        :param schema: The result schema
+        :type schema: ResultSchema
+
+        :param capacity: Number of rows
+        :type capacity: int
+        """
+
+        self.schema = schema
+        self.capacity = max(1, int(capacity))
+        self.columns = [[None] * self.capacity for name in schema.field_names]
+        self.size = 0
+
+    def append_values(self, list_values):
+        """Adds the (service key, value) pairs of a response as the next row. A row of
+        empty values is added if there are no values, e.g. for features without a geometry.
+
+        :param list_values: (Service key, value) pairs, or None
+        :type list_values: list
+
+        :returns: Number of values decoded
+        :rtype: int
+        """
+
+        if self.size >= self.capacity:
+            # Grows the columns, e.g. if the writer could not flush
+            for column in self.columns:
+                column.extend([None] * self.capacity)
+            self.capacity *= 2
+
+        row = self.size
+        self.size += 1
+
+        columns = self.columns
+        for column in columns:
+            column[row] = None
+        if list_values is None:
+            return 0
+
+        schema = self.schema
+        index = schema.index
+        rounding_factor = schema.rounding_factor
+        count = 0
+        for key, value in list_values:
+            column = index.get(key)
+            if column is None:
+                schema.ignored_keys.add(key)
+                continue
+            columns[column][row] = round_value(value, rounding_factor)
+            count += 1
+
+        return count
+
+    def rows(self):
+        """Returns the values of each row, in the order of the schema fields.
+
+        :rtype: iterator of tuples
+        """
+
+        if len(self.columns) == 0:
+            return iter([()] * self.size)
+        return zip(*[column[:self.size] for column in self.columns])
+
+    def clear(self):
+        """Removes all of the rows. The arrays are kept for the next rows."""
+
+        self.size = 0
@@ -0,0 +1,208 @@
+"""Result store of the docking panel.
+
+The results of a panel tab are kept in columns: the data type (service name)
+and the value as shown, and typed arrays of the numeric value, longitude,
+latitude and request time. Rows are appended at the end in constant time, and
+the numeric values are parsed once, when a row is added, so that the plot and
+the export read the arrays directly. The rows are shown from the most recent
+to the oldest by ResultTableModel.
+
+Columns are only changed in place by appending. Removing and clearing rows
+replace the columns, so a ResultSnapshot keeps reading the rows it was created
+with, without copying them, while the results keep changing.
+"""
+
+import math
+import time
+import itertools
+
+from array import array
+
+
+def numeric_value(value):
+    """Returns the numeric value of a value received from the server.
+
+    :param value: Value as received from the server
+    :type value: str
+
+    :returns: The value as a float; NaN if the value is not numeric, e.g. text
+    :rtype: float
+    """
+
+    if isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class ResultStore(object):
+    """Columnar store of the results of a docking panel tab, from the oldest to the most recent."""
+
+    def __init__(self, name=''):
+        """Constructor.
+
+        :param name: Name of the results, e.g. the key of the tab
+        :type name: str
+        """
+
+        self.name = name
+
+        self.keys = []  # Data type (service name) shown in the table
+        self.values = []  # Value as shown in the table
+        self.numbers = array('d')  # Numeric value, NaN if not numeric
+        self.x = array('d')  # Longitude
+        self.y = array('d')  # Latitude
+        self.timestamps = array('d')  # Time of the request (seconds since the epoch)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def append(self, key, value, x, y, number=None, timestamp=None):
+        """Adds a row after the most recent row.
+
+        :param key: Data type (service name)
+        :type key: str
+
+        :param value: Value as shown in the table, e.g. rounded
+        :type value: str
+
+        :param x: Longitude
+        :type x: float
+
+        :param y: Latitude
+        :type y: float
+
+        :param number: Numeric value. Parsed from the value if not provided
+        :type number: float
+
+        :param timestamp: Time of the request. The current time if not provided
+        :type timestamp: float
+        """
+
+        self.keys.append(key)
+        self.values.append(value)
+        self.numbers.append(numeric_value(value) if number is None else number)
+        self.x.append(x)
+        self.y.append(y)
+        self.timestamps.append(time.time() if timestamp is None else timestamp)
+
+    def remove(self, index):
+        """Removes a row. The columns are replaced, so snapshots are not changed.
+
+        :param index: Position of the row, 0 being the oldest
+        :type index: int
+        """
+
+        if index < 0:
+            index = index + len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('Result row out of range')
+
+        self.keys = self.keys[:index] + self.keys[index + 1:]
+        self.values = self.values[:index] + self.values[index + 1:]
+        self.numbers = self.numbers[:index] + self.numbers[index + 1:]
+        self.x = self.x[:index] + self.x[index + 1:]
+        self.y = self.y[:index] + self.y[index + 1:]
+        self.timestamps = self.timestamps[:index] + self.timestamps[index + 1:]
+
+    def clear(self):
+        """Removes all of the rows. The columns are replaced, so snapshots are not changed."""
+
+        self.keys = []
+        self.values = []
+        self.numbers = array('d')
+        self.x = array('d')
+        self.y = array('d')
+        self.timestamps = array('d')
+
+    def row(self, index):
+        """Returns a row.
+
+        :param index: Position of the row, 0 being the oldest
+        :type index: int
+
+        :returns: (Data type, value, longitude, latitude)
+        :rtype: tuple
+        """
+
+        return self.keys[index], self.values[index], self.x[index], self.y[index]
+
+    def rows(self):
+        """Returns all of the rows, from the oldest to the most recent.
+
+        :returns: (Data type, value, longitude, latitude) of each row
+        :rtype: list
+        """
+
+        return list(zip(self.keys, self.values, self.x, self.y))
+
+    def snapshot(self):
+        """Returns a read-only view of the current rows, which can be read from another
+        thread, e.g. by an export task, while rows are added to the results.
+
+        :returns: The rows at this time
+        :rtype: ResultSnapshot
+        """
+
+        return ResultSnapshot(self)
+
+
+class ResultSnapshot(object):
+    """Read-only view of the rows of a result store at the time it was created.
+
+    The snapshot refers to the columns of the store and the number of rows, and
+    does not copy them. Rows are only built when read, e.g. a chunk at a time.
+    """
+
+    def __init__(self, store):
+        """Constructor.
+
+        :param store: The results
+        :type store: ResultStore
+        """
+
+        self.name = store.name
+        self.length = len(store)
+
+        self.keys = store.keys
+        self.values = store.values
+        self.numbers = store.numbers
+        self.x = store.x
+        self.y = store.y
+        self.timestamps = store.timestamps
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        """Returns a row, or a list of rows for a slice, as (data type, value, longitude, latitude).
+
+        :param index: Position of the row, 0 being the oldest, or a slice
+        :type index: int, slice
+        """
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            return list(zip(
+                self.keys[start:stop:step],
+                self.values[start:stop:step],
+                self.x[start:stop:step],
+                self.y[start:stop:step]
+            ))
+
+        if index < 0:
+            index = index + self.length
+        if index < 0 or index >= self.length:
+            raise IndexError('Result row out of range')
+
+        return self.keys[index], self.values[index], self.x[index], self.y[index]
+
+    def __iter__(self):
+        return zip(
+            itertools.islice(self.keys, self.length),
+            itertools.islice(self.values, self.length),
+            itertools.islice(self.x, self.length),
+            itertools.islice(self.y, self.length)
+        )
@@ -0,0 +1,175 @@
+"""Table model of the docking panel results.
+
+Exposes a ResultStore to Qt views (the panel list, and the tables of the table
+dialog). The most recent row is shown at the top; rows are added to the store
+at the end, so adding a row does not move the existing rows. Rows are only
+added, removed and cleared through the model, so that all of its views are
+updated. OldestFirstProxyModel shows the rows of a model from the oldest to the
+most recent, as in the panel list.
+"""
+
+import os
+import sys
+import inspect
+
+from qgis.PyQt.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from bridge_api.default import (
+    TABLE_DATA_TYPE,
+    TABLE_VALUE,
+    TABLE_LONG,
+    TABLE_LAT
+)
+from utilities.result_store import ResultStore
+
+# Column labels, in the order of the store rows
+COLUMN_NAMES = [TABLE_DATA_TYPE['table'], TABLE_VALUE['table'], TABLE_LONG['table'], TABLE_LAT['table']]
+
+# Column of the values, e.g. shown by the panel list
+VALUE_COLUMN = 1
+
+# Data role of the position of a row in the store, 0 being the oldest
+STORE_INDEX_ROLE = Qt.UserRole
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Read-only table model of a result store, from the most recent to the oldest row."""
+
+    def __init__(self, store=None, parent=None):
+        """Constructor.
+
+        :param store: The results. A new, empty store is created if not provided
+        :type store: ResultStore
+
+        :param parent: Parent object
+        :type parent: QObject
+        """
+
+        super(ResultTableModel, self).__init__(parent)
+
+        self.store = store if store is not None else ResultStore()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMN_NAMES)
+
+    def store_index(self, row):
+        """Returns the position in the store of a row of the model.
+
+        :param row: Row of the model, 0 being the most recent
+        :type row: int
+
+        :returns: Position in the store, 0 being the oldest
+        :rtype: int
+        """
+
+        return len(self.store) - 1 - row
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        store_index = self.store_index(index.row())
+        if role == STORE_INDEX_ROLE:
+            return store_index
+        if role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+
+        column = index.column()
+        if column == 0:
+            return self.store.keys[store_index]
+        elif column == VALUE_COLUMN:
+            return str(self.store.values[store_index])
+        elif column == 2:
+            return str(self.store.x[store_index])
+        elif column == 3:
+            return str(self.store.y[store_index])
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMN_NAMES[section] if section < len(COLUMN_NAMES) else None
+
+        return str(section + 1)
+
+    def append_rows(self, list_rows):
+        """Adds rows, which are shown at the top of the views.
+
+        :param list_rows: (Data type, value, longitude, latitude) of each row, from the oldest to the most recent
+        :type list_rows: list
+        """
+
+        if len(list_rows) == 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), 0, len(list_rows) - 1)
+        for key, value, x, y in list_rows:
+            self.store.append(key, value, x, y)
+        self.endInsertRows()
+
+    def remove_row(self, row):
+        """Removes a row.
+
+        :param row: Row of the model, 0 being the most recent
+        :type row: int
+        """
+
+        if row < 0 or row >= len(self.store):
+            return
+
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.store.remove(self.store_index(row))
+        self.endRemoveRows()
+
+    def clear(self):
+        """Removes all of the rows."""
+
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+
+class OldestFirstProxyModel(QSortFilterProxyModel):
+    """Shows the rows of a ResultTableModel from the oldest to the most recent."""
+
+    def __init__(self, model, parent=None):
+        """Constructor.
+
+        :param model: The results
+        :type model: ResultTableModel
+
+        :param parent: Parent object
+        :type parent: QObject
+        """
+
+        super(OldestFirstProxyModel, self).__init__(parent)
+
+        self.setSourceModel(model)
+        self.setSortRole(STORE_INDEX_ROLE)
+        self.setDynamicSortFilter(True)  # Added rows are placed at the end
+        self.sort(0, Qt.AscendingOrder)
+
+    def remove_row(self, row):
+        """Removes a row.
+
+        :param row: Row of the proxy, 0 being the oldest
+        :type row: int
+        """
+
+        source_index = self.mapToSource(self.index(row, 0))
+        if source_index.isValid():
+            self.sourceModel().remove_row(source_index.row())
@@ -0,0 +1,163 @@
+"""Streaming CSV and Parquet export of docking panel tables.
+
+The rows are written in chunks as they are read, so large result histories are
+not first built into a single string. CSV files are written using the csv
+module, which quotes values containing commas, quotes or line breaks. Parquet
+files are written a row group at a time using pyarrow, when it is installed.
+"""
+
+import os
+import sys
+import csv
+import inspect
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is not available
+    pyarrow = None
+
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from bridge_api.default import (
+    TABLE_DATA_TYPE,
+    TABLE_VALUE,
+    TABLE_LONG,
+    TABLE_LAT,
+    TABLE_EXPORT_CHUNK_SIZE
+)
+
+
+def parquet_available():
+    """Checks whether tables can be exported to Parquet, which requires pyarrow.
+
+    :returns: True if pyarrow is installed
+    :rtype: bool
+    """
+
+    return pyarrow is not None
+
+
+def export_file_filter():
+    """Returns the file filter of the table export file widgets.
+
+    :returns: File filter, e.g. '*.gpkg;;*.csv'
+    :rtype: str
+    """
+
+    list_filters = ['*.gpkg', '*.csv']
+    if parquet_available():
+        list_filters.append('*.parquet')
+
+    return ';;'.join(list_filters)
+
+
+def _chunks(list_rows, chunk_size, progress=None, is_canceled=None):
+    # Splits the rows into chunks. Progress is reported once a chunk has been handled
+    total = len(list_rows)
+    chunk_size = max(1, int(chunk_size))
+    for start in range(0, total, chunk_size):
+        if is_canceled is not None and is_canceled():
+            return
+        yield list_rows[start:start + chunk_size]
+        if progress is not None:
+            progress(min(total, start + chunk_size) * 100.0 / total)
+
+
+def write_points_csv(output_file, list_rows, chunk_size=TABLE_EXPORT_CHUNK_SIZE, progress=None, is_canceled=None):
+    """Writes table rows to a CSV file. The header contains the table column labels.
+
+    :param output_file: Directory and output file name (csv)
+    :type output_file: str
+
+    :param list_rows: (Data type, value, longitude, latitude) of each row
+    :type list_rows: list or ResultSnapshot
+
+    :param chunk_size: Number of rows written at a time
+    :type chunk_size: int
+
+    :param progress: Called with the percentage of rows written after each chunk
+    :type progress: function
+
+    :param is_canceled: Returns True once the export should stop
+    :type is_canceled: function
+
+    :returns: success
+    :rtype: boolean
+
+    :returns: msg
+    :rtype: str
+    """
+
+    try:
+        with open(output_file, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow([TABLE_DATA_TYPE['table'], TABLE_VALUE['table'], TABLE_LONG['table'], TABLE_LAT['table']])
+            for chunk in _chunks(list_rows, chunk_size, progress, is_canceled):
+                writer.writerows(chunk)
+    except (IOError, OSError) as e:
+        return False, 'Could not create {}: {}'.format(output_file, str(e))
+
+    if is_canceled is not None and is_canceled():
+        return False, 'Export of {} canceled'.format(output_file)
+
+    return True, 'Successfully created {}'.format(output_file)
+
+
+def write_points_parquet(output_file, list_rows, chunk_size=TABLE_EXPORT_CHUNK_SIZE, progress=None,
+                         is_canceled=None):
+    """Writes table rows to a Parquet file, a row group per chunk. Requires pyarrow.
+    The columns are named as the fields of GeoPackage exports.
+
+    :param output_file: Directory and output file name (parquet)
+    :type output_file: str
+
+    :param list_rows: (Data type, value, longitude, latitude) of each row
+    :type list_rows: list or ResultSnapshot
+
+    :param chunk_size: Number of rows written at a time
+    :type chunk_size: int
+
+    :param progress: Called with the percentage of rows written after each chunk
+    :type progress: function
+
+    :param is_canceled: Returns True once the export should stop
+    :type is_canceled: function
+
+    :returns: success
+    :rtype: boolean
+
+    :returns: msg
+    :rtype: str
+    """
+
+    if pyarrow is None:
+        return False, 'Parquet export requires pyarrow, which is not installed'
+
+    schema = pyarrow.schema([
+        (TABLE_DATA_TYPE['file'], pyarrow.string()),
+        (TABLE_VALUE['file'], pyarrow.string()),
+        (TABLE_LONG['file'], pyarrow.float64()),
+        (TABLE_LAT['file'], pyarrow.float64())
+    ])
+    try:
+        with pyarrow.parquet.ParquetWriter(output_file, schema) as writer:
+            for chunk in _chunks(list_rows, chunk_size, progress, is_canceled):
+                columns = list(zip(*chunk))
+                # Values are written as text, as shown in the table. Integers are not rounded, and are
+                # therefore not strings; missing values are kept as nulls
+                columns[1] = [None if value is None else str(value) for value in columns[1]]
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema
+                ))
+    except (IOError, OSError, pyarrow.ArrowException) as e:
+        return False, 'Could not create {}: {}'.format(output_file, str(e))
+
+    if is_canceled is not None and is_canceled():
+        return False, 'Export of {} canceled'.format(output_file)
+
+    return True, 'Successfully created {}'.format(output_file)
@@ -3,22 +3,30 @@
 import os
 import sys
 import inspect
-import requests
+import threading
+
+try:
+    import numpy
+except ImportError:  # NumPy arrays are not supported by the batch transform
+    numpy = None
 
 from qgis.PyQt.QtCore import QVariant
 from qgis.core import (
+    QgsApplication,
     QgsProject,
-    QgsSettings,
     QgsVectorFileWriter,
     QgsVectorLayer,
     QgsField,
+    QgsFields,
+    QgsFeatureSink,
+    QgsWkbTypes,
     QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
     QgsPointXY,
     QgsFeature,
     QgsCoordinateReferenceSystem,
     QgsGeometry
 )
-from qgis.PyQt.QtWidgets import QTableWidget, QTableWidgetItem
 
 # Adds the plugin core path to the system path
 cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
@@ -29,20 +37,45 @@ from bridge_api.default import (
     SERVICE,
     GROUP,
     COLLECTION,
-    VALUE_JSON,
     KEY_JSON,
-    NAME_JSON,
     SERVICE_JSON,
     GROUP_JSON,
     COLLECTION_JSON,
     CONNECTION_TIMEOUT,
+    QUERY_ENDPOINT,
     COORDINATE_SYSTEM,
     TABLE_DATA_TYPE,
     TABLE_VALUE,
     TABLE_LAT,
-    TABLE_LONG
+    TABLE_LONG,
+    TABLE_EXPORT_CHUNK_SIZE,
+    REQUEST_CRS,
+    CACHE_DIRECTORY,
+    CACHE_FILE_NAME,
+    PANEL_MEMORY_CACHE_SIZE,
+    TRANSFORM_CACHE_CONTEXTS
 )
-from bridge_api.api_abstract import ApiClient
+from bridge_api.api_abstract import ApiClient, ApiError
+from bridge_api.instrumentation import CACHE_HIT, CACHE_MEMORY
+from bridge_api.json_decoder import extract_values
+from utilities.query_cache import QueryCache, MemoryQueryCache
+from utilities.plugin_settings import get_settings
+from utilities.table_export import write_points_csv, write_points_parquet
+
+# Query cache shared by the panel and the processing tool. Created on first use
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+# Query caches replaced after a change of the settings. These may still be used by a
+# running processing tool, so are only closed when the plugin is unloaded
+_replaced_query_caches = []
+
+# Recent responses of the panel requests (canvas clicks and fetch)
+_panel_memory_cache = MemoryQueryCache(PANEL_MEMORY_CACHE_SIZE)
+
+# Coordinate transforms, as creating the transform pipeline is expensive
+_transform_cache = {}  # (Source CRS, destination CRS): [(transform context, transform)]
+_transform_cache_lock = threading.Lock()
 
 
 def get_canvas_crs(iface):
@@ -67,18 +100,29 @@ def get_request_crs():
 
     # Gets the coordinate system set by the user. Defaults to WGS84
     # NOTE: At the moment only WGS84 is selectable
-    settings = QgsSettings()
-    request_crs = settings.value('geocontext-qgis-plugin/request_crs', "WGS84 (EPSG:4326)", type=str)
+    request_crs = get_settings().request_crs
 
-    if request_crs == "WGS84 (EPSG:4326)":  # WGS84 coordinate system
+    if request_crs == REQUEST_CRS:  # WGS84 coordinate system
         return QgsCoordinateReferenceSystem("EPSG:4326")
     else:  # Unknown coordinate system
         return
 
 
+def configure_api_session():
+    """Applies the connection pool size, retry policy and rate limit stored in the
+    settings to the session shared by all of the API clients.
+    """
+
+    settings = get_settings()
+
+    ApiClient.configure_session(settings.pool_size, settings.max_retries, settings.backoff_factor)
+    ApiClient.configure_rate_limit(settings.rate_limit)
+
+
 def check_connection(url):
     try:
-        response = requests.head(url, timeout=CONNECTION_TIMEOUT)
+        client = ApiClient()
+        response = client.head(url, timeout=CONNECTION_TIMEOUT)
         if response.status_code == 200:
             return True, ''
         else:
@@ -87,6 +131,43 @@ def check_connection(url):
         return False, str(e)
 
 
+def get_coordinate_transform(cur_crs, target_crs, transform_context=None):
+    """Returns a transform between two coordinate systems. Transforms are cached and reused
+    for as long as the transform context of the project does not change.
+
+    :param cur_crs: The current coordinate system of the coordinates
+    :type cur_crs: QgsCoordinateReferenceSystem
+
+    :param target_crs: The target coordinate system to which the coordinates will be transformed to
+    :type target_crs: QgsCoordinateReferenceSystem
+
+    :param transform_context: Transform context. The context of the current project is used if not provided
+    :type transform_context: QgsCoordinateTransformContext
+
+    :returns: The coordinate transform
+    :rtype: QgsCoordinateTransform
+    """
+
+    if transform_context is None:
+        transform_context = QgsProject.instance().transformContext()
+
+    cache_key = (cur_crs.authid() or cur_crs.toWkt(), target_crs.authid() or target_crs.toWkt())
+    with _transform_cache_lock:
+        list_transforms = _transform_cache.setdefault(cache_key, [])
+        for context, xform in list_transforms:
+            if context == transform_context:
+                # Transforms are implicitly shared, the copy can be used by the calling thread
+                return QgsCoordinateTransform(xform)
+
+        xform = QgsCoordinateTransform(cur_crs, target_crs, transform_context)
+        list_transforms.append((QgsCoordinateTransformContext(transform_context), xform))
+        if len(list_transforms) > TRANSFORM_CACHE_CONTEXTS:
+            # Transforms of previous project contexts
+            list_transforms.pop(0)
+
+    return QgsCoordinateTransform(xform)
+
+
 def transform_point_coordinates(point, cur_crs, target_crs):
     """Transforms point coordinates to the target coordinate system.
 
@@ -103,8 +184,7 @@ def transform_point_coordinates(point, cur_crs, target_crs):
     :rtype: QgsPointXY
     """
 
-    transform_context = QgsProject.instance().transformContext()
-    xform = QgsCoordinateTransform(cur_crs, target_crs, transform_context)
+    xform = get_coordinate_transform(cur_crs, target_crs)
 
     pt = xform.transform(QgsPointXY(point.x(), point.y()))  # Transformed point
 
@@ -130,8 +210,7 @@ def transform_xy_coordinates(x, y, cur_crs, target_crs):
     :rtype: Float
     """
 
-    transform_context = QgsProject.instance().transformContext()
-    xform = QgsCoordinateTransform(cur_crs, target_crs, transform_context)
+    xform = get_coordinate_transform(cur_crs, target_crs)
 
     pt = xform.transform(QgsPointXY(x, y))  # Transformed point
     x = pt.x()
@@ -140,6 +219,52 @@ def transform_xy_coordinates(x, y, cur_crs, target_crs):
     return x, y
 
 
+def transform_coordinates(x_values, y_values, cur_crs, target_crs, transform_context=None):
+    """Transforms arrays of coordinates to the target coordinate system using a single transform call.
+
+    :param x_values: Longitude (or easting) coordinates. A list or NumPy array
+    :type x_values: list
+
+    :param y_values: Latitude (or northing) coordinates. A list or NumPy array
+    :type y_values: list
+
+    :param cur_crs: The current coordinate system of the coordinates
+    :type cur_crs: QgsCoordinateReferenceSystem
+
+    :param target_crs: The target coordinate system to which the coordinates will be transformed to
+    :type target_crs: QgsCoordinateReferenceSystem
+
+    :param transform_context: Transform context. The context of the current project is used if not provided
+    :type transform_context: QgsCoordinateTransformContext
+
+    :returns: The transformed x and y coordinates. NumPy arrays if NumPy arrays were provided, otherwise lists
+    :rtype: tuple
+    """
+
+    is_array = numpy is not None and isinstance(x_values, numpy.ndarray)
+    if is_array:
+        x_values = x_values.tolist()
+        y_values = y_values.tolist()
+
+    if len(x_values) == 0:
+        list_x, list_y = [], []
+    else:
+        xform = get_coordinate_transform(cur_crs, target_crs, transform_context)
+
+        # All of the coordinates are transformed as a single geometry
+        geom = QgsGeometry.fromMultiPointXY([QgsPointXY(x, y) for x, y in zip(x_values, y_values)])
+        geom.transform(xform)
+
+        list_points = geom.asMultiPoint()
+        list_x = [point.x() for point in list_points]
+        list_y = [point.y() for point in list_points]
+
+    if is_array:
+        return numpy.array(list_x, dtype=float), numpy.array(list_y, dtype=float)
+
+    return list_x, list_y
+
+
 def is_float(value):
     """Checks whether a string value can be converted to a float
 
@@ -239,10 +364,8 @@ def point_request_dialog(x, y, registry, key, api_url):
     """
 
     # Performs the request from the server based on the above information
-    client = Client()
-
-    url_request = api_url + "query?" + 'registry=' + registry.lower() + '&key=' + key + '&x=' + str(x) + '&y=' + str(y) + '&outformat=json'
-    data = client.get(url_request)
+    client = ApiClient(endpoint_url=api_url)
+    data = client.query(registry, key, x, y)
 
     return data
 
@@ -264,61 +387,120 @@ def get_registry_from_index(index):
         return COLLECTION
 
 
-def process_point(input_point, registry, key_name, field_name):
-    """
-    This method processes a point layer provided by the user.
-    The methods takes the point layer provided by the user, and then
-    requests the selected registry/key in the processing dialog.
-    A new file is created which stores the original attributes with the
-    newly requested data. The method will only process the selected features
-    if enabled by the user, and the layer can also be loaded into QGIS once
-    processing is done.
-
-    :param input_point: The point layer which will be processed.
-    :type input_point: QgsPoint
-
-    :param registry: The registry option selected by the user
+def registry_service_keys(registry, dict_key):
+    """Returns the ordered list of service keys which a request for the provided
+    registry key will return. This is used to create the result fields prior to processing.
+
+    :param registry: Registry: Service, group or collection
     :type registry: String
 
-    :param key_name: Key of the requested data
-    :type key_name: String
+    :param dict_key: The registry entry of the key, as retrieved from the registries list
+    :type dict_key: Dict
+
+    :returns: List of service keys; None if the registry entry does not describe its services
+    :rtype: list
+    """
+
+    if registry == SERVICE['key']:
+        return [dict_key[KEY_JSON]]
+    elif registry == GROUP['key']:
+        if SERVICE_JSON in dict_key:
+            return [service[KEY_JSON] for service in dict_key[SERVICE_JSON]]
+    elif registry == COLLECTION['key']:
+        if GROUP_JSON in dict_key:
+            list_keys = []
+            for group in dict_key[GROUP_JSON]:
+                if SERVICE_JSON not in group:
+                    return None
+                list_keys.extend([service[KEY_JSON] for service in group[SERVICE_JSON]])
+            return list_keys
+
+    return None
 
-    :param field_name: The fieldname or prefix which will be used for the new attribute fields
-    :type field_name: String
 
-    :param layer_crs: Coordinate system used by the input point
-    :type layer_crs: QgsCoordinate
+def explode_points(feature):
+    """Returns the points of a feature. Each part of a multipoint feature is returned
+    as a separate point, so that each point can have its own attribute data.
 
-    :param target_crs: Coordinate system required by the API
-    :type target_crs: QgsCoordinate
+    :param feature: Point or multipoint feature
+    :type feature: QgsFeature
+
+    :returns: The points of the feature. A single None if the feature has no geometry
+    :rtype: list
     """
 
-    point_geom = input_point.geometry()
+    point_geom = feature.geometry()
     if point_geom.isNull() or point_geom.isEmpty():
-        # Point is skipped if its None or has no geometry
-        return
-    else:
-        settings = QgsSettings()
-        rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_tool', 3, type=int)
-        api_url = settings.value('geocontext-qgis-plugin/url')  # Base URL. Set in the options dialog
+        # Feature is kept, but no request will be made for it
+        return [None]
 
-        if point_geom.isMultipart():
-            # Converts a point to singlepart if it is multipart
-            point_geom.convertToSingleType()
+    if point_geom.isMultipart():
+        return point_geom.asMultiPoint()
 
-        # Gets the point coordinates
-        point = point_geom.asPoint()
-        x = point.x()
-        y = point.y()
+    return [point_geom.asPoint()]
 
-        # Retrieves the data in JSON format
-        data = request_data(registry, key_name, x, y)
 
-        return data
+def get_query_cache():
+    """Returns the persistent query cache, which is stored in the QGIS profile directory.
+    The cache is created on first use using the options set in the settings.
 
+    :returns: The query cache; None if caching has been disabled
+    :rtype: QueryCache
+    """
 
-def request_data(registry, key, x, y):
-    """Returns the dictionary of the service, group or collection based on the dropbox index of the element
+    global _query_cache
+
+    settings = get_settings()
+    if not settings.cache_enabled:
+        return None
+
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                cache_path = os.path.join(QgsApplication.qgisSettingsDirPath(), CACHE_DIRECTORY, CACHE_FILE_NAME)
+                _query_cache = QueryCache(
+                    cache_path,
+                    ttl=settings.cache_ttl,
+                    max_entries=settings.cache_max_entries,
+                    snap_decimals=settings.cache_snap_decimals
+                )
+
+    return _query_cache
+
+
+def reset_query_cache():
+    """Replaces the query cache. It will be reopened using the current settings on its next use.
+    The replaced cache is not closed, as requests of a running processing tool may still use it.
+    """
+
+    global _query_cache
+
+    with _query_cache_lock:
+        if _query_cache is not None:
+            _query_cache.flush()
+            _replaced_query_caches.append(_query_cache)
+            _query_cache = None
+
+
+def close_query_caches():
+    """Closes the query cache, and each of the caches it replaced. Used when the plugin is unloaded.
+    """
+
+    global _query_cache
+
+    with _query_cache_lock:
+        if _query_cache is not None:
+            _replaced_query_caches.append(_query_cache)
+            _query_cache = None
+        while len(_replaced_query_caches) > 0:
+            _replaced_query_caches.pop().close()
+
+
+def request_data(registry, key, x, y, api_url=None):
+    """Returns the dictionary of the service, group or collection based on the dropbox index of the element.
+    Responses are first looked up in the query cache, and successful responses are added to it.
+    Requests and cache hits are recorded in the request metrics (ApiClient.metrics).
+    Raises ApiError if the server responded with an error, also after retrying.
 
     :param registry: Registry: Service, group or collection
     :type registry: String
@@ -332,151 +514,151 @@ def request_data(registry, key, x, y):
     :param y: Latitude coordinates
     :type y: Numeric
 
+    :param api_url: Base request URL. Uses the URL set in the settings if not provided
+    :type api_url: String
+
     :returns: Returns the received data in JSON format
     :rtype: JSON
     """
-    settings = QgsSettings()
 
-    api_url = settings.value('geocontext-qgis-plugin/url')  # Base request URL
-
-    # Performs the request
-    client = ApiClient()
+    if api_url is None:
+        api_url = get_settings().api_url  # Base request URL
 
-    url_request = api_url + "query?" + 'registry=' + registry.lower() + '&key=' + key + '&x=' + str(x) + '&y=' + str(y) + '&outformat=json'
-    data = client.get(url_request)
+    query_cache = get_query_cache()
+    if query_cache is not None:
+        data = query_cache.get(api_url, registry, key, x, y)
+        if data is not None:
+            ApiClient.metrics.record(registry, key, cache=CACHE_HIT)
+            return data
 
-    return data.json()
+    # Performs the request
+    client = ApiClient(endpoint_url=api_url)
+    data, status_code = client.query_data(registry, key, x, y)
+    if status_code != 200:
+        raise ApiError(status_code, client.full_url(QUERY_ENDPOINT))
 
+    # Only successful responses are cached
+    if query_cache is not None:
+        query_cache.put(api_url, registry, key, x, y, data)
 
-def service_data_value(data_json):
-    """Get the values from the provided JSON data
+    return data
 
-    :param data_json: Data
-    :type data_json: JSON
 
-    :returns: Extracted data
-    :rtype: JSON
-    """
+def request_values(registry, key, x, y, keys=None, api_url=None):
+    """Returns the key and value of each service of the service, group or collection at a location.
+    Only the values of the requested keys are kept. Responses are first looked up in the
+    query cache, and successful responses are added to it as received.
+    Raises ApiError if the server responded with an error, also after retrying.
 
-    settings = QgsSettings()
-    rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_tool', 3, type=int)
+    :param registry: Registry: Service, group or collection
+    :type registry: String
 
-    point_key = data_json[KEY_JSON]
-    point_name = data_json[NAME_JSON]
-    point_value = apply_decimal_places_to_float_tool(data_json[VALUE_JSON], rounding_factor)
+    :param key: Key for the data to request
+    :type key: String
 
-    return [{
-        'key': point_key,
-        'name': point_name,
-        'value': point_value
-    }]
+    :param x: Longitude coordinates
+    :type x: Numeric
 
+    :param y: Latitude coordinates
+    :type y: Numeric
 
-def group_data_values(data_json):
-    """Group data value extraction
+    :param keys: Service keys of which the values are decoded. All values are decoded if not provided
+    :type keys: set
 
-    :param data_json: Data
-    :type data_json: JSON
+    :param api_url: Base request URL. Uses the URL set in the settings if not provided
+    :type api_url: String
 
-    :returns: Group data
-    :rtype: JSON
+    :returns: (Service key, value) pairs in the order of the response
+    :rtype: list
     """
 
-    settings = QgsSettings()
-    rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_tool', 3, type=int)
+    if api_url is None:
+        api_url = get_settings().api_url  # Base request URL
+
+    query_cache = get_query_cache()
+    if query_cache is not None:
+        response = query_cache.get_response(api_url, registry, key, x, y)
+        if response is not None:
+            ApiClient.metrics.record(registry, key, cache=CACHE_HIT)
+            return extract_values(response, keys)
 
-    data_services = data_json[SERVICE_JSON]
-    list_services = []
-    for service in data_services:
-        service_key = service[KEY_JSON]
-        service_name = service[NAME_JSON]
-        service_value = apply_decimal_places_to_float_tool(service[VALUE_JSON], rounding_factor)
+    def decode(content):
+        return extract_values(content, keys), content
 
-        list_services.append({
-            'key': service_key,
-            'name': service_name,
-            'value': service_value
-        })
+    # Performs the request
+    client = ApiClient(endpoint_url=api_url)
+    result, status_code = client.query_data(registry, key, x, y, decoder=decode)
+    if status_code != 200:
+        raise ApiError(status_code, client.full_url(QUERY_ENDPOINT))
+    list_values, content = result
 
-    return list_services
+    # Only successful responses are cached
+    if query_cache is not None:
+        query_cache.put_response(api_url, registry, key, x, y, content.decode('utf-8'))
 
+    return list_values
 
-def collection_data_values(data_json):
-    """Collection data value extraction
 
-    :param data_json: Data
-    :type data_json: JSON
+def get_panel_memory_cache():
+    """Returns the in-memory cache of recent panel responses.
 
-    :returns: Collection data
-    :rtype: JSON
+    :returns: In-memory cache shared by the canvas clicks and the Fetch button
+    :rtype: MemoryQueryCache
     """
 
-    settings = QgsSettings()
-    rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_tool', 3, type=int)
+    return _panel_memory_cache
 
-    data_groups = data_json[GROUP_JSON]
-    list_services = []
-    for group in data_groups:
-        data_services = group[SERVICE_JSON]
-        for service in data_services:
-            service_key = service[KEY_JSON]
-            service_name = service[NAME_JSON]
-            service_value = apply_decimal_places_to_float_tool(service[VALUE_JSON], rounding_factor)
 
-            list_services.append({
-                'key': service_key,
-                'name': service_name,
-                'value': service_value
-            })
+def request_panel_data(registry, key, x, y, api_url):
+    """Returns the data for a panel request. Recently requested locations are returned from memory;
+    otherwise the request is performed using request_data.
 
-    return list_services
+    :param registry: Registry: Service, group or collection
+    :type registry: String
 
+    :param key: Key for the data to request
+    :type key: String
 
-def clone_tablewidget(table):
-    """Makes a clone of a table and its contents
+    :param x: Longitude coordinates
+    :type x: Numeric
+
+    :param y: Latitude coordinates
+    :type y: Numeric
 
-    :param table: Table which needs to be cloned
-    :type table: QTableWidget
+    :param api_url: Base request URL
+    :type api_url: String
 
-    :returns: Cloned table
-    :rtype: QTableWidget
+    :returns: Returns the received data in JSON format
+    :rtype: JSON
     """
 
-    column_count = table.columnCount()
-    row_count = table.rowCount()
+    # Responses requested from another endpoint are no longer valid
+    _panel_memory_cache.invalidate_if_changed(endpoint=api_url)
 
-    # Gets the table column labels
-    list_labels = []
-    i = 0
-    while i < column_count:
-        column = table.horizontalHeaderItem(i)
-        column_label = column.text()
-        list_labels.append(column_label)
+    data = _panel_memory_cache.get(api_url, registry, key, x, y)
+    if data is None:
+        data = request_data(registry, key, x, y, api_url)
+        _panel_memory_cache.put(api_url, registry, key, x, y, data)
+    else:
+        ApiClient.metrics.record(registry, key, cache=CACHE_MEMORY)
 
-        i = i + 1
+    return data
 
-    # Creates the clone table
-    clone_table = QTableWidget()
-    clone_table.setColumnCount(column_count)
-    clone_table.setHorizontalHeaderLabels(list_labels)
 
-    # Clones the table contents
-    i = 0
-    while i < row_count:
-        clone_table.insertRow(i)
+def cache_statistics_text():
+    """Returns the query cache hit and miss counts as shown in the panel.
 
-        j = 0
-        while j < column_count:
-            cell_item = table.item(i, j)
-            value = cell_item.text()
+    :returns: Cache statistics text
+    :rtype: String
+    """
 
-            print(value)
-            clone_table.setItem(i, j, QTableWidgetItem(str(value)))
+    memory_text = "Memory hits: {}".format(_panel_memory_cache.hits)
 
-            j = j + 1
-        i = i + 1
+    query_cache = get_query_cache()
+    if query_cache is None:
+        return "{}, cache: disabled".format(memory_text)
 
-    return clone_table
+    return "{}, cache hits: {}, misses: {}".format(memory_text, query_cache.hits, query_cache.misses)
 
 
 def create_vector_file(input_layer, output_layer, layer_crs):
@@ -512,48 +694,77 @@ def create_vector_file(input_layer, output_layer, layer_crs):
     return True, new_layer, 'Successfully created {}'.format(output_layer)
 
 
-def convert_multipart_to_singlepart(mp_layer):
+def singlepart_features(features, fid_index=-1):
+    """Splits multipart features into a feature per part, in a single pass over the features.
+    Singlepart features are returned as is.
+
+    :param features: Features which will be split
+    :type features: iterable
+
+    :param fid_index: Index of the feature ID field. The field is cleared for the new features,
+        so that a new feature ID is assigned when the features are written. -1 if there is no such field
+    :type fid_index: Integer
+
+    :returns: Singlepart features
+    :rtype: generator
+    """
+
+    for feature in features:
+        geom = feature.geometry()
+        if geom.isNull() or not geom.isMultipart():
+            yield feature
+            continue
+
+        for part in geom.asGeometryCollection():  # Adds each part as a separate feature
+            new_feature = QgsFeature(feature)  # Clone of the feature
+            new_feature.setGeometry(part)
+            if fid_index != -1:
+                new_feature.setAttribute(fid_index, None)
+            yield new_feature
+
+
+def convert_multipart_to_singlepart(mp_layer, chunk_size=1000):
     """If a vector file has multiple parts for a feature, each part is split into a feature.
     This is done so that each point can have its own attribute data, as the parts might be at different
     coordinates. The provided layer will directly be edited and no longer required multipart features
     will be removed.
 
+    The layer is read once, and the new features are added in chunks using the data provider, without an
+    edit session. The new features are given feature IDs by the provider when they are added.
+
     This method is aimed at point layers for this plugin, but will work for other multipart vector types.
 
     :param mp_layer: A vector layer.
     :type mp_layer: QgsVectorLayer
-    """
-
-    feature_count = mp_layer.featureCount()  # Total number of feature of the layer
-    features_to_remove = []  # Multipart features which will be removed when split into multiple features
 
-    # Skips this step if the layer is empty
-    if feature_count > 0:
-        mp_layer.startEditing()  # Editing is performed on the mp_layer
-        for mp_feat in mp_layer.getFeatures():  # All features
-            geom = mp_feat.geometry()  # Feature geometry
-            if geom.isMultipart():  # Checked if the geometry is multipart
-                new_features = []
-                temp_feature = QgsFeature(mp_feat)  # Clone of the feature
-                features_to_remove.append(mp_feat.id())  # Feature will be removed
+    :param chunk_size: Number of features added per provider call
+    :type chunk_size: Integer
+    """
 
-                for mp_part in geom.asGeometryCollection():  # Adds each part as a separate feature
-                    temp_feature.setGeometry(mp_part)
-                    new_features.append(QgsFeature(temp_feature))
-                mp_layer.addFeatures(new_features)  # Adds the new features to the layer
+    provider = mp_layer.dataProvider()
+    fid_index = mp_layer.fields().lookupField('fid')
 
-        # Removes all of the multipart features which has been split into separate features
-        for feat_to_remove_id in features_to_remove:
-            mp_layer.deleteFeature(feat_to_remove_id)
+    features_to_remove = []  # Multipart features which will be removed when split into multiple features
+    new_features = []
+    for mp_feat in mp_layer.getFeatures():  # All features
+        geom = mp_feat.geometry()
+        if geom.isNull() or not geom.isMultipart():
+            continue
 
-        # Gives each singlepart feature a unique ID (fid/oid)
-        new_index = 0
-        for new_feat in mp_layer.getFeatures():
-            mp_layer.changeAttributeValue(new_feat.id(), 0, new_index)
+        features_to_remove.append(mp_feat.id())  # Feature will be removed
+        new_features.extend(singlepart_features([mp_feat], fid_index))
+        if len(new_features) >= chunk_size:
+            provider.addFeatures(new_features)
+            new_features = []
 
-            new_index = new_index + 1
+    if len(new_features) > 0:
+        provider.addFeatures(new_features)
 
-        mp_layer.commitChanges()  # Applies the changes to the layer
+    # Removes all of the multipart features which has been split into separate features
+    if len(features_to_remove) > 0:
+        provider.deleteFeatures(features_to_remove)
+        mp_layer.updateExtents()
+        mp_layer.triggerRepaint()
 
 
 def create_new_field(input_layer, input_feat, field_name):
@@ -583,14 +794,94 @@ def create_new_field(input_layer, input_feat, field_name):
     return field_index
 
 
-def export_table(output_file, table):
-    """Exports the table contents of the docking widget.
+def write_points_geopackage(output_file, list_rows, chunk_size=TABLE_EXPORT_CHUNK_SIZE, progress=None,
+                            is_canceled=None):
+    """Writes table rows as points to a new GeoPackage. The file is created once, and the
+    features are added in chunks. Can be called from a background task.
 
     :param output_file: Directory and output file name (gpkg)
     :type output_file: str
 
-    :param table: Pointer to the table from which data will be retrieved
-    :type table: QTableWidget
+    :param list_rows: (Data type, value, longitude, latitude) of each point
+    :type list_rows: list or ResultSnapshot
+
+    :param chunk_size: Number of features added to the file at a time
+    :type chunk_size: int
+
+    :param progress: Called with the percentage of rows written after each chunk
+    :type progress: function
+
+    :param is_canceled: Returns True once the export should stop
+    :type is_canceled: function
+
+    :returns: success
+    :rtype: boolean
+
+    :returns: msg
+    :rtype: str
+    """
+
+    fields = QgsFields()
+    fields.append(QgsField(TABLE_DATA_TYPE['file'], QVariant.String))
+    fields.append(QgsField(TABLE_VALUE['file'], QVariant.String))
+    fields.append(QgsField(TABLE_LONG['file'], QVariant.Double))
+    fields.append(QgsField(TABLE_LAT['file'], QVariant.Double))
+
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = 'GPKG'
+    options.fileEncoding = 'UTF-8'
+    writer = QgsVectorFileWriter.create(
+        output_file,
+        fields,
+        QgsWkbTypes.Point,
+        QgsCoordinateReferenceSystem(COORDINATE_SYSTEM),
+        QgsCoordinateTransformContext(),
+        options
+    )
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        return False, "Could not create {}: {}".format(output_file, writer.errorMessage())
+
+    total = len(list_rows)
+    for start in range(0, total, max(1, chunk_size)):
+        if is_canceled is not None and is_canceled():
+            del writer  # Closes the file
+            return False, 'Export of {} canceled'.format(output_file)
+
+        list_features = []
+        for key, value, x, y in list_rows[start:start + chunk_size]:
+            feature = QgsFeature(fields)
+            feature.setAttributes([key, value, x, y])
+            feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+            list_features.append(feature)
+
+        if not writer.addFeatures(list_features, QgsFeatureSink.FastInsert):
+            msg = "Could not write to {}: {}".format(output_file, writer.lastError())
+            del writer
+            return False, msg
+
+        if progress is not None:
+            progress(min(total, start + chunk_size) * 100.0 / total)
+
+    del writer  # The file is closed once the writer is deleted
+
+    return True, 'Successfully created {}'.format(output_file)
+
+
+def export_rows(output_file, list_rows, progress=None, is_canceled=None):
+    """Writes table rows to a file, of which the format follows from the extension: GeoPackage (gpkg),
+    CSV (csv) or Parquet (parquet, requires pyarrow). Can be called from a background task.
+
+    :param output_file: Directory and output file name
+    :type output_file: str
+
+    :param list_rows: (Data type, value, longitude, latitude) of each row
+    :type list_rows: list or ResultSnapshot
+
+    :param progress: Called with the percentage of rows written after each chunk
+    :type progress: function
+
+    :param is_canceled: Returns True once the export should stop
+    :type is_canceled: function
 
     :returns: success
     :rtype: boolean
@@ -599,94 +890,33 @@ def export_table(output_file, table):
     :rtype: str
     """
 
-    success = False
-    msg = ''
     if output_file.endswith('.gpkg'):
-        # Geopackage file format
-        new_layer = QgsVectorLayer("Point", "temporary_points", "memory")
-        layer_provider = new_layer.dataProvider()
-
-        # Adds the new attributes fields to the layer
-        new_layer.startEditing()
-        list_attributes = [
-            QgsField(TABLE_DATA_TYPE['file'], QVariant.String),
-            QgsField(TABLE_VALUE['file'], QVariant.String),
-            QgsField(TABLE_LONG['file'], QVariant.Double),
-            QgsField(TABLE_LAT['file'], QVariant.Double)]
-        layer_provider.addAttributes(list_attributes)
-        new_layer.updateFields()
-        new_layer.commitChanges()
-
-        row_cnt = table.rowCount()
-        # Loops through each of the table entries
-        i = table.rowCount() - 1  # Current ID
-        while i >= 0:
-            key = table.item(i, 0).text()  # Data source
-            value = table.item(i, 1).text()  # Value at the point
-            x = float(table.item(i, 2).text())  # Longitude
-            y = float(table.item(i, 3).text())  # Latitude
-
-            # Creates the new feature and updates its attributes
-            new_layer.startEditing()
-            new_point = QgsPointXY(x, y)
-            new_feat = QgsFeature()
-            new_feat.setAttributes([key, value, x, y])
-            new_feat.setGeometry(QgsGeometry.fromPointXY(new_point))
-            layer_provider.addFeatures([new_feat])
-            new_layer.commitChanges()
-
-            target_crs = QgsCoordinateReferenceSystem(COORDINATE_SYSTEM)
-            success, created_layer, msg = create_vector_file(new_layer, output_file, target_crs)
-
-            i = i - 1
+        return write_points_geopackage(output_file, list_rows, progress=progress, is_canceled=is_canceled)
     elif output_file.endswith('.csv'):
-        # CSV format
-        column_count = table.columnCount()
-        row_count = table.rowCount()
-        if row_count and column_count > 0:
-            # Gets the table column labels
-            row_labels = ''
-            i = 0
-            while i < column_count:
-                column = table.horizontalHeaderItem(i)
-                column_label = column.text()
-                if row_labels == '':
-                    row_labels = column_label
-                else:
-                    row_labels = '{},{}'.format(
-                        row_labels,
-                        column_label
-                    )
-
-                i = i + 1
-
-            with open(output_file, 'w') as csv_file:
-                csv_file.write(row_labels)
-                csv_file.write('\n')
-
-                i = 0
-                while i < row_count:
-                    row = ''
-                    j = 0
-                    while j < column_count:
-                        cell_item = table.item(i, j)
-                        value = cell_item.text().replace(',', '')
-                        if row == '':
-                            row = str(value)
-                        else:
-                            row = '{},{}'.format(
-                                row,
-                                str(value)
-                            )
-
-                        j = j + 1
-                    csv_file.write(row)
-                    csv_file.write('\n')
-                    i = i + 1
-                csv_file.close()
-                success = True
-        else:
-            success = False
-            msg = 'Table is empty, could not create: ' + output_file
+        return write_points_csv(output_file, list_rows, progress=progress, is_canceled=is_canceled)
+    elif output_file.endswith('.parquet'):
+        return write_points_parquet(output_file, list_rows, progress=progress, is_canceled=is_canceled)
+
+    return False, 'Unsupported file format, could not create: ' + output_file
+
+
+def export_table(output_file, store):
+    """Exports the results of a docking widget tab, from the oldest to the most recent row.
+
+    :param output_file: Directory and output file name (gpkg, csv or parquet)
+    :type output_file: str
+
+    :param store: Results of the tab
+    :type store: ResultStore
+
+    :returns: success
+    :rtype: boolean
+
+    :returns: msg
+    :rtype: str
+    """
+
+    if len(store) <= 0:
+        return False, 'Table is empty, could not create: ' + output_file
 
-    return success, msg
+    return export_rows(output_file, store.snapshot())
@@ -24,15 +24,13 @@
 
 import sys
 import os
-import time
 import inspect
 
 from qgis.PyQt import QtGui, QtWidgets, uic
 from qgis.PyQt.QtCore import pyqtSignal, QUrl, QVariant
-from qgis.PyQt.QtWidgets import QTableWidget, QTableWidgetItem
 from qgis.core import (
+    QgsApplication,
     QgsProject,
-    QgsSettings,
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
     QgsPointXY,
@@ -44,11 +42,11 @@ from qgis.core import (
 
 import httplib2
 import requests
-from requests import exceptions
 
 from .geocontext_help_dialog import HelpDialog
 from .GeoContextQGISPlugin_plot import PlotDialog
 from .GeoContextQGISPlugin_table import TableDialog
+from .GeoContextQGISPlugin_statistics import StatisticsDialog
 
 # Adds the plugin core path to the system path
 cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
@@ -58,26 +56,22 @@ sys.path.insert(0, parentdir)
 from utilities.utilities import (
     get_request_crs,
     create_vector_file,
-    check_connection,
-    clone_tablewidget,
-    export_table
+    get_panel_memory_cache,
+    cache_statistics_text
 )
-from bridge_api.api_abstract import ApiClient
+from utilities.registry_catalogue import get_registry_catalogue
+from utilities.export_task import ExportTableTask
+from utilities.result_schema import response_services, round_value
+from utilities.result_table_model import ResultTableModel, OldestFirstProxyModel, VALUE_COLUMN
+from utilities.table_export import export_file_filter
 from bridge_api.default import (
-    API_DEFAULT_URL,
     SERVICE,
     GROUP,
     COLLECTION,
+    NAME_JSON,
     VALUE_JSON,
-    SERVICE_JSON,
-    GROUP_JSON,
     COLLECTION_JSON,
-    TABLE_DATA_TYPE,
-    TABLE_VALUE,
-    TABLE_LONG,
-    TABLE_LAT,
-    COORDINATE_SYSTEM,
-    SITE_URL
+    COORDINATE_SYSTEM
 )
 
 FORM_CLASS, _ = uic.loadUiType(os.path.join(
@@ -87,6 +81,8 @@ FORM_CLASS, _ = uic.loadUiType(os.path.join(
 class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
 
     closingPlugin = pyqtSignal()
+    # Emitted with the request details when the Fetch button is pressed
+    pointRequested = pyqtSignal(object)
 
     def __init__(self, canvas, point_tool, iface, parent=None):
         """Constructor."""
@@ -102,54 +98,27 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         self.canvas = canvas  # QGIS project canvas
         self.point_tool = point_tool  # Canvas point tool - cursor used to selected locations
         self.cursor_active = True  # Sets to True because the point tool is now active
-        self.table_output_file.setFilter("*.gpkg;;*.csv")  # Output format for table exporting set to geopackage
+        self.table_output_file.setFilter(export_file_filter())  # Output formats for table exporting
 
-        # This variable will store all the tables
-        self.tables = []
+        # Results of each tab. The tabs and the table dialog are views on these
+        self.result_models = []
         self.new_table()
 
-        available, error_msg = check_connection(SITE_URL)
-        if available:
-            # Gets the lists of available service, group and collection layers
-            self.list_context = self.retrieve_registry_list(API_DEFAULT_URL, SERVICE['key'])  # Service
-            self.list_group = self.retrieve_registry_list(API_DEFAULT_URL, GROUP['key'])  # Group
-            self.list_collection = self.retrieve_registry_list(API_DEFAULT_URL, COLLECTION['key'])  # Collection
-        else:
-            # Site is unavailable
-            self.iface.messageBar().pushCritical("Connection error: ", error_msg)
-            self.list_context = []
-            self.list_group = []
-            self.list_collection = []
+        self.export_task = None  # GeoPackage export in progress
 
-        # If the context list is empty, these steps should be skipped
-        if len(self.list_context) > 0:
-            # Creates a list of the key names and sorts it alphabetically
-            list_key_names = []
-            for context in self.list_context:
-                name = context['name']
-                list_key_names.append(name)
-            list_key_names = sorted(list_key_names)
+        # The registry lists are loaded from the cache on disk, and refreshed in the background
+        self.list_context = []
+        self.list_group = []
+        self.list_collection = []
+        self.key_tab_added = False  # The first tab is replaced once keys are available
 
-            # Adds the keys to the panel
-            self.cbKey.addItems(list_key_names)
+        self.catalogue = get_registry_catalogue()
+        self.catalogue.updated.connect(self.registry_lists_updated)
+        self.catalogue.refreshFailed.connect(self.registry_refresh_failed)
+        self.registry_lists_updated()
+        self.catalogue.refresh()
 
-            # Retrieves panel parameters
-            registry = self.cbRegistry.currentText()
-            current_name = self.cbKey.currentText()
-
-            # Retrieves the set information and updates the description table with it
-            dict_current = self.find_name_info(current_name, registry)
-            self.tblDetails.setItem(0, 0, QtWidgets.QTableWidgetItem(dict_current['key']))
-            self.tblDetails.setItem(0, 1, QtWidgets.QTableWidgetItem(dict_current['name']))
-            self.tblDetails.setItem(0, 2, QtWidgets.QTableWidgetItem(dict_current['description']))
-
-            self.tabResults.removeTab(0)  # Removes the already existing tab from the UI
-            list_widget = QtWidgets.QListWidget()  # The data is stored here
-            self.tabResults.addTab(list_widget, dict_current['key'])  # Adds the new tab using the list widget
-            self.cbTab.addItem(dict_current['key'])
-        else:  # Empty geocontext list. This can be a result of the incorrect URL, or the site is down
-            error_msg = "The retrieved services list is empty."
-            self.iface.messageBar().pushCritical("Empty geocontext list error: ", error_msg)
+        self.lblCacheStats.setText(cache_statistics_text())
 
         self.set_connectors()
 
@@ -176,36 +145,88 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         self.btnRemove.clicked.connect(self.remove_btn_click)
         self.btnTable.clicked.connect(self.table_btn_click)
         self.btnDelete.clicked.connect(self.delete_btn_click)
+        self.btnStatistics.clicked.connect(self.statistics_btn_click)
 
-    def retrieve_registry_list(self, api_url, registry):
-        """Return a list of available layers for the provided registry.
+    def registry_lists_updated(self):
+        """This method is called when the registry lists has been loaded or refreshed.
+        The key list will be updated, the current key selection is kept if still available.
+        """
 
-        :param api_url: API URL for doing requests
-        :type api_url: str
+        self.list_context = self.catalogue.registry_list(SERVICE['key'])  # Service
+        self.list_group = self.catalogue.registry_list(GROUP['key'])  # Group
+        self.list_collection = self.catalogue.registry_list(COLLECTION['key'])  # Collection
 
-        :param registry: Registry type: Service, group or collection
-        :type registry: str
+        # Responses in memory are only valid for the registries they were requested with
+        get_panel_memory_cache().invalidate_if_changed(
+            registry_lists=[self.list_context, self.list_group, self.list_collection])
+
+        # If the context list is empty, these steps should be skipped
+        if len(self.list_context) == 0:
+            return
 
-        :returns: A list of available data in json format
-        :rtype: list
+        registry = self.cbRegistry.currentText()
+        if not self.key_tab_added:
+            # Creates a list of the key names and sorts it alphabetically
+            list_key_names = []
+            for context in self.list_context:
+                name = context['name']
+                list_key_names.append(name)
+            list_key_names = sorted(list_key_names)
+
+            # Adds the keys to the panel
+            self.cbKey.blockSignals(True)
+            self.cbKey.clear()
+            self.cbKey.addItems(list_key_names)
+            self.cbKey.blockSignals(False)
+
+            # Retrieves panel parameters
+            current_name = self.cbKey.currentText()
+
+            # Retrieves the set information and updates the description table with it
+            dict_current = self.find_name_info(current_name, registry)
+            self.update_key_details(dict_current)
+
+            self.tabResults.removeTab(0)  # Removes the already existing tab from the UI
+            list_view = self.new_results_view(self.result_models[0])  # Shows the values of the first results
+            self.tabResults.addTab(list_view, dict_current['key'])  # Adds the new tab using the list view
+            self.cbTab.addItem(dict_current['key'])
+
+            self.key_tab_added = True
+        else:
+            # Updates the key list, and keeps the current selection if it is still available
+            current_name = self.cbKey.currentText()
+
+            self.cbKey.blockSignals(True)
+            self.update_key_list(registry)
+            index = self.cbKey.findText(current_name)
+            if index >= 0:
+                self.cbKey.setCurrentIndex(index)
+            self.cbKey.blockSignals(False)
+
+            if self.cbKey.currentText() != current_name:
+                self.key_changed()
+            else:
+                self.update_key_details(self.find_name_info(current_name, registry))
+
+    def registry_refresh_failed(self, error_msg):
+        """This method is called when the registry lists could not be refreshed from the server.
+        The cached lists, if any, will still be used.
         """
-        request_url = "{}/registries?registry={}".format(api_url, registry)
-        try:
-            client = ApiClient()
-            response = client.get(request_url)
-            list_json = response.json()
-        except exceptions.ConnectionError:  # Could not connect to the provided URL
-            error_msg = "Could not connect to " + request_url + ". Check if the provided URL is correct. The site may also be down."
-            self.iface.messageBar().pushCritical("Connection error: ", error_msg)
 
-            list_json = []
-        except Exception as e:  # Other possible connection issues
-            error_msg = "Could not connect to " + request_url + ". Unknown error: " + str(e)
-            self.iface.messageBar().pushCritical("Connection error: ", error_msg)
+        self.iface.messageBar().pushCritical("Connection error: ", error_msg)
+
+        if len(self.list_context) == 0:
+            # Empty geocontext list. This can be a result of the incorrect URL, or the site is down
+            error_msg = "The retrieved services list is empty."
+            self.iface.messageBar().pushCritical("Empty geocontext list error: ", error_msg)
 
-            list_json = []
+    def update_key_details(self, dict_current):
+        """Updates the table which provides a description on the selected key.
+        """
 
-        return list_json
+        self.tblDetails.setItem(0, 0, QtWidgets.QTableWidgetItem(dict_current['key']))
+        self.tblDetails.setItem(0, 1, QtWidgets.QTableWidgetItem(dict_current['name']))
+        self.tblDetails.setItem(0, 2, QtWidgets.QTableWidgetItem(dict_current['description']))
 
     def registry_changed(self):
         """This method is called when the registry option is changed.
@@ -231,12 +252,10 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
             dict_current = self.find_name_info(key_name, registry)
 
             # Updates the table
-            self.tblDetails.setItem(0, 0, QtWidgets.QTableWidgetItem(dict_current['key']))
-            self.tblDetails.setItem(0, 1, QtWidgets.QTableWidgetItem(dict_current['name']))
-            self.tblDetails.setItem(0, 2, QtWidgets.QTableWidgetItem(dict_current['description']))
+            self.update_key_details(dict_current)
 
             # Set the current tab's text to the currently selected
-            row_count = self.tabResults.currentWidget().count()
+            row_count = self.current_row_count()
 
             if row_count == 0:  # If the tab is empty, rename the tab
                 self.update_current_tab_text(dict_current['key'])
@@ -276,30 +295,30 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
             dict_current = self.find_name_info(key_name, registry)  # Key dict
             key = dict_current['key']
 
+            # Adds the results of the new tab
+            model = self.new_table()
+
             # Creates a new tab
-            list_widget = QtWidgets.QListWidget()
-            i = self.tabResults.addTab(list_widget, key)
+            list_view = self.new_results_view(model)
+            i = self.tabResults.addTab(list_view, key)
             self.tabResults.setCurrentIndex(i)  # Selects the newly added tab
 
             # Adds a new item to the combobox
             self.cbTab.addItem(key)
             self.cbTab.setCurrentIndex(i)
 
-            # Adds a table
-            self.new_table()
-
     def remove_btn_click(self):
         """Remove the selected entry from the table
         """
-        qlist_widget = self.tabResults.currentWidget()
-        selected_index = qlist_widget.currentRow()
-        total = qlist_widget.count()
-        selected_index_reverse = total - selected_index - 1  # List is reversed in the table
-        tab_index = self.tabResults.currentIndex()
+        list_view = self.tabResults.currentWidget()
+        if list_view is None:
+            return
+        selected_index = list_view.currentIndex()
+        if not selected_index.isValid():
+            return
 
-        qlist_widget.takeItem(selected_index)
-        selected_table = self.tables[tab_index]
-        selected_table.removeRow(selected_index_reverse)
+        # The list and the table are views on the same results
+        list_view.model().remove_row(selected_index.row())
 
     def delete_btn_click(self):
         """Remove the current tab from the tabs panel
@@ -318,16 +337,16 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
     def table_btn_click(self):
         """Opens the table dialog to display data
         """
-        # Makes a clone of the tables which will be displayed
-        list_clone_tables = []
-        for table in self.tables:
-            clone_table = clone_tablewidget(table)
-            list_clone_tables.append(clone_table)
-
-        # Opens the table dialog
-        table_dialog = TableDialog(list_clone_tables, self.get_tab_names())
+        # Opens the table dialog, which shows the results of each tab
+        table_dialog = TableDialog(self.result_models, self.get_tab_names())
         table_dialog.exec_()
 
+    def statistics_btn_click(self):
+        """Opens the dialog which shows the request timings per registry and key
+        """
+        statistics_dialog = StatisticsDialog()
+        statistics_dialog.exec_()
+
     def clear_btn_click(self):
         """This method is called when the clear button is clicked
         """
@@ -339,96 +358,54 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
     def fetch_btn_click(self):
         """This method is called when the Fetch button on the panel window is pressed.
         The location (x and y) currently shown in the panel will be retrieved with no need to click
-        in the canvas using the cursor.
+        in the canvas using the cursor. The request is performed in a background task, as for canvas clicks.
         """
 
-        settings = QgsSettings()
-
         # Gets the longitude and latitude
         x = float(self.lineLong.value())
         y = float(self.lineLat.value())
 
-        # Request starts
-        start = time.time()
+        request = self.create_point_request(x, y)
+        if request is not None:
+            self.pointRequested.emit(request)
 
-        # Requests the data
-        current_key_name = self.cbKey.currentText()
-        data = self.point_request_panel(x, y)
+    def create_point_request(self, x, y):
+        """Returns the details of a request for the selected registry and key at a location. An error is
+        shown in the message bar if no key can be requested.
 
-        # Request ends
-        end = time.time()
-        rounding_factor = settings.value('geocontext-qgis-plugin/dec_places_panel', 3, type=int)
-        request_time_ms = round((end - start) * 1000, rounding_factor)
-        self.lblRequestTime.setText("Request time (ms): " + str(request_time_ms))
+        :param x: Longitude
+        :type x: float
 
-        index = self.tabResults.currentIndex()
-        table = self.tables[index]  # QTableWidget
-
-        # If set, the table will automatically be cleared. This can be set in the options dialog
-        auto_clear_table = settings.value('geocontext-qgis-plugin/auto_clear_table', False, type=bool)
-        if auto_clear_table:
-            self.clear_results_table(index)
-
-        registry = self.cbRegistry.currentText()  # Registry: Service, group or collection
-        # The user has Service selected
-        if registry == SERVICE['name']:
-            settings = QgsSettings()
+        :param y: Latitude
+        :type y: float
 
-            point_value = data[VALUE_JSON]
-
-            # Updates/adds the value to the docking panel table
-            qlist_widget = self.tabResults.currentWidget()
-            row_index = qlist_widget.count()
-            qlist_widget.insertItem(row_index, str(point_value))
+        :returns: The request details: x, y, registry, key, key_name and model; None if no key is selected
+        :rtype: dict
+        """
 
-            # Updates the table
-            table.insertRow(0)  # Always add at the top of the table
-            table.setItem(0, 0, QTableWidgetItem(current_key_name))
-            table.setItem(0, 1, QTableWidgetItem(str(point_value)))  # Value
-            table.setItem(0, 2, QTableWidgetItem(str(x)))  # Latitude
-            table.setItem(0, 3, QTableWidgetItem(str(y)))  # Longitude
-
-        # The user has Group selected
-        elif registry == GROUP['name']:
-            # group_name = data['name']
-            list_dict_services = data[SERVICE_JSON]  # Service files for a group
-            for dict_service in list_dict_services:
-                # key = dict_service['key']
-                point_value = dict_service[VALUE_JSON]
-                service_key_name = dict_service['name']
-
-                # Updates/adds the value to the docking panel table
-                qlist_widget = self.tabResults.currentWidget()
-                row_index = qlist_widget.count()
-                qlist_widget.insertItem(row_index, str(point_value))
-
-                table.insertRow(0)  # Always add at the top of the table
-                table.setItem(0, 0, QTableWidgetItem(service_key_name))  # Sets the key in the table
-                table.setItem(0, 1, QTableWidgetItem(str(point_value)))  # Sets the value
-                table.setItem(0, 2, QTableWidgetItem(str(x)))  # Latitude
-                table.setItem(0, 3, QTableWidgetItem(str(y)))  # Longitude
-        # The user has Collection selected
-        elif registry == COLLECTION['name']:
-            # Each group contains a list of the 'Service' data associated with the group
-            list_dict_groups = data[GROUP_JSON]
-            for dict_group in list_dict_groups:
-                # group_name = dict_group['name']
-                list_dict_services = dict_group[SERVICE_JSON]  # Service files for a group
-                for dict_service in list_dict_services:
-                    # key = dict_service['key']
-                    point_value = dict_service[VALUE_JSON]
-                    service_key_name = dict_service['name']
-
-                    # Updates/adds the value to the docking panel table
-                    qlist_widget = self.tabResults.currentWidget()
-                    row_index = qlist_widget.count()
-                    qlist_widget.insertItem(row_index, str(point_value))
-
-                    table.insertRow(0)  # Always add at the top of the table
-                    table.setItem(0, 0, QTableWidgetItem(service_key_name))  # Sets the key in the table
-                    table.setItem(0, 1, QTableWidgetItem(str(point_value)))  # Sets the value
-                    table.setItem(0, 2, QTableWidgetItem(str(x)))  # Latitude
-                    table.setItem(0, 3, QTableWidgetItem(str(y)))  # Longitude
+        registry = self.cbRegistry.currentText()  # Service, group or collection
+        key_name = self.cbKey.currentText()  # Key name, e.g. Elevation
+
+        # The key will be empty when there were no option to select from (e.g. could not connect the server)
+        if key_name == "":
+            error_msg = "Could not perform data request. Check if the URL is available."
+            self.iface.messageBar().pushCritical("Request error: ", error_msg)
+            return None
+
+        dict_key = self.find_name_info(key_name, registry)  # Key
+        if dict_key is None:
+            error_msg = "Could not find " + key_name + " in the " + registry + " registry."
+            self.iface.messageBar().pushCritical("Request error: ", error_msg)
+            return None
+
+        return {
+            'x': x,
+            'y': y,
+            'registry': registry,
+            'key': dict_key['key'],
+            'key_name': key_name,
+            'model': self.result_models[self.tabResults.currentIndex()]  # Results to which the values will be added
+        }
 
     def cursor_btn_click(self):
         """This method is called when the Cursor button on the panel is clicked.
@@ -453,16 +430,16 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
 
     def export_btn_click(self):
         """Export the contents of the docking widget's table to a
-        geopackage (gpkg).
+        geopackage (gpkg), CSV (csv) or Parquet (parquet) file.
         """
         output_file = self.table_output_file.filePath()  # Output file provided by the user
         output_dir = os.path.dirname(output_file)  # Folder directory of the output
 
         index = self.tabResults.currentIndex()
-        table = self.tables[index]  # QTableWidget
+        store = self.result_models[index].store  # ResultStore
 
         # Checks whether the table has any contents
-        num_rows = table.rowCount()
+        num_rows = len(store)
         if num_rows <= 0:
             # File will not be created
             self.iface.messageBar().pushCritical("Export not performed: ", "Table has no contents!")
@@ -470,11 +447,13 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
 
         # Checks if the folder path exists
         if os.path.exists(output_dir):
-            # Exports the table data
-            success, msg = export_table(output_file, table)
-            if not success:
-                # Prints an error message if the output file could not be created
-                self.iface.messageBar().pushCritical("Cannot create file: ", msg)
+            # Exports the table data in the background
+            if self.export_task is not None:
+                self.iface.messageBar().pushWarning("Export not performed: ", "An export is in progress.")
+                return
+            self.export_task = ExportTableTask(output_file, store)
+            self.export_task.exportFinished.connect(self.export_finished)
+            QgsApplication.taskManager().addTask(self.export_task)
         else:
             # Shows an error message if the folder path does not exist
             if output_dir == "":
@@ -483,15 +462,28 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
             else:
                 self.iface.messageBar().pushCritical("Output directory does not exist: ", output_dir)
 
+    def export_finished(self, task):
+        """Called once the background export of a table is done.
+
+        :param task: The finished export task
+        :type task: ExportTableTask
+        """
+
+        self.export_task = None
+        if task.success:
+            self.iface.messageBar().pushSuccess("Export: ", task.msg)
+        else:
+            self.iface.messageBar().pushCritical("Cannot create file: ", task.msg)
+
     def show_plot(self):
-        total = len(self.tables)
+        total = len(self.result_models)
         # Will only plot if there are a table present
         if total > 0:
             # Gets the current tab index
             index = self.tabResults.currentIndex()
 
             # Opens the plot dialog
-            plot_dialog = PlotDialog(self.tables, index)
+            plot_dialog = PlotDialog([model.store for model in self.result_models], self.get_tab_names(), index)
             plot_dialog.exec_()
 
     def show_help(self):
@@ -514,92 +506,112 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
             self.iface.messageBar().pushCritical("Missing file: ", error_msg)
 
     def new_table(self):
-        """Creates a new table
+        """Creates the results of a new tab
+
+        :returns: Table model of the results
+        :rtype: ResultTableModel
         """
 
-        column_names = [
-            TABLE_DATA_TYPE['table'],
-            TABLE_VALUE['table'],
-            TABLE_LONG['table'],
-            TABLE_LAT['table']
-        ]
-        new_table = QTableWidget()
-        new_table.setColumnCount(len(column_names))
-        new_table.setHorizontalHeaderLabels(column_names)
+        model = ResultTableModel(parent=self)
+        self.result_models.append(model)
 
-        self.tables.append(new_table)
+        return model
 
-    def delete_table(self, index):
-        removed_table = self.tables.pop(index)
+    def new_results_view(self, model):
+        """Creates the list shown in a tab, which shows the values of the tab results from
+        the oldest to the most recent
 
-        return removed_table
+        :param model: Table model of the results
+        :type model: ResultTableModel
 
-    def update_current_tab_text(self, new_text):
-        """Set the current tab's text to the currently selected.
+        :returns: The list view
+        :rtype: QListView
         """
-        tab_index = self.tabResults.currentIndex()
-        self.tabResults.setTabText(tab_index, new_text)
-        self.cbTab.setItemText(tab_index, new_text)
 
-    def point_request_panel(self, x, y):
-        """Return the value retrieved from the ordered dictionary containing the requested data
-        from the server. This method is used by the docket widget panel of the plugin.
+        list_view = QtWidgets.QListView()
+        list_view.setModel(OldestFirstProxyModel(model, list_view))
+        list_view.setModelColumn(VALUE_COLUMN)
+        list_view.setUniformItemSizes(True)  # Only the visible rows are measured
+
+        return list_view
+
+    def delete_table(self, index):
+        removed_model = self.result_models.pop(index)
+
+        return removed_model
+
+    def add_results(self, index, registry, key_name, data, x, y, rounding_factor):
+        """Adds the values of a response to the results of a tab, which are shown at the
+        bottom of the list and the top of the table.
+
+        :param index: Index of the tab
+        :type index: int
+
+        :param registry: Registry name: Service, Group or Collection
+        :type registry: str
+
+        :param key_name: Name of the requested key, shown as the data type of service values
+        :type key_name: str
 
-        This method requests the data from the server for the given point coordinates.
+        :param data: The data received for the request
+        :type data: dict
 
-        :param x: Longitude coordinate
-        :type x: Float
+        :param x: Longitude
+        :type x: float
 
-        :param y: Latitude coordinate
-        :type y: Float
+        :param y: Latitude
+        :type y: float
 
-        :returns: The data retrieved for the request for the provided location
-        :rtype: OrderedDict
+        :param rounding_factor: Decimal places of the values
+        :type rounding_factor: int
         """
 
-        settings = QgsSettings()
+        registry_key = {
+            SERVICE['name']: SERVICE['key'],
+            GROUP['name']: GROUP['key'],
+            COLLECTION['name']: COLLECTION['key']
+        }.get(registry)
+
+        list_rows = []
+        for dict_service in response_services(registry_key, data):
+            # Services of groups and collections are shown using their own names
+            name = key_name if registry_key == SERVICE['key'] else dict_service[NAME_JSON]
+            list_rows.append((name, round_value(dict_service[VALUE_JSON], rounding_factor), x, y))
 
-        api_url = settings.value('geocontext-qgis-plugin/url')  # Base request URL
-        registry = (self.cbRegistry.currentText())  # Registry type
-        key_name = self.cbKey.currentText()  # Key name
+        self.result_models[index].append_rows(list_rows)
 
-        # Retrieves the key ID
-        dict_key = self.find_name_info(key_name, registry)
-        key = dict_key['key']
+    def current_row_count(self):
+        """Returns the number of results in the current tab.
 
-        # Performs the request
-        client = ApiClient()
+        :returns: Number of rows; 0 if there are no tabs
+        :rtype: int
+        """
 
-        url_request = (
-                API_DEFAULT_URL +
-                "query?" +
-                'registry=' + registry.lower() +
-                '&key=' + key +
-                '&x=' + str(x) +
-                '&y=' + str(y) +
-                '&outformat=json'
-        )
-        data = client.get(url_request)
+        index = self.tabResults.currentIndex()
+        if index < 0 or index >= len(self.result_models):
+            return 0
 
-        return data.json()
+        return self.result_models[index].rowCount()
+
+    def update_current_tab_text(self, new_text):
+        """Set the current tab's text to the currently selected.
+        """
+        tab_index = self.tabResults.currentIndex()
+        self.tabResults.setTabText(tab_index, new_text)
+        self.cbTab.setItemText(tab_index, new_text)
 
     def clear_results_list(self):
         """Clears the table in the panel (qlistwidget). This can be called when the user clicks the
         Clear button, or if the user has automatic clearing enabled.
         """
-        qlist_widget = self.tabResults.currentWidget()
-
-        try:
-            row_cnt = qlist_widget.count()
-        except Exception as e:
-            # There are no tabs to delete
+        if self.tabResults.currentWidget() is None:
+            # There are no tabs to clear
             # This will likely happen when the key list is empty
             return
 
-        i = row_cnt - 1
-        while i >= 0:
-            item_widget = qlist_widget.takeItem(i)
-            i = i - 1
+        index = self.tabResults.currentIndex()
+        if index < len(self.result_models):
+            self.result_models[index].clear()
 
         # Retrieved registry and newly selected key ID
         registry = self.cbRegistry.currentText()
@@ -615,11 +627,7 @@ class GeoContextQGISPluginDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         """Clears the table widget. This can be called when the user clicks the
         Clear button, or if the user has automatic clearing enabled.
         """
-        table_to_clear = self.tables[index]
-        row_count = table_to_clear.rowCount()
-        while row_count >= 0:
-            table_to_clear.removeRow(row_count)
-            row_count = row_count - 1
+        self.result_models[index].clear()
 
     def find_name_info(self, search_name, registry):
         """The method finds the key ID of a provided key name. It checks each case until
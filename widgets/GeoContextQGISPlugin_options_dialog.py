@@ -9,6 +9,8 @@
 
 
 import os
+import sys
+import inspect
 
 from PyQt5.QtWidgets import QDialog
 from qgis.PyQt import uic
@@ -17,6 +19,23 @@ from qgis.core import QgsSettings
 
 from .geocontext_help_dialog import HelpDialog
 
+# Adds the plugin core path to the system path
+cur_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(cur_dir)
+sys.path.insert(0, parentdir)
+
+from utilities.utilities import (
+    get_query_cache,
+    reset_query_cache
+)
+from utilities.plugin_settings import invalidate_settings
+from bridge_api.default import (
+    CACHE_TTL,
+    CACHE_MAX_ENTRIES,
+    CACHE_SNAP_DECIMALS,
+    RATE_LIMIT
+)
+
 # Import the PyQt and QGIS libraries
 # this import required to enable PyQt API v2
 # do it before Qt imports
@@ -26,6 +45,9 @@ FORM_CLASS, _ = uic.loadUiType(os.path.join(
 
 
 class OptionsDialog(QDialog, FORM_CLASS):
+    # Emitted once the settings have been saved. The settings snapshot has been discarded by then
+    settingsChanged = pyqtSignal()
+
     def __init__(self, iface, parent=None):
         """Constructor."""
         super(OptionsDialog, self).__init__(parent)
@@ -44,6 +66,7 @@ class OptionsDialog(QDialog, FORM_CLASS):
 
         # Global settings
         self.cbCrs.setCurrentIndex(self.cbCrs.findText(settings.value('geocontext-qgis-plugin/request_crs', "WGS84 (EPSG:4326)", type=str)))
+        self.sbRateLimit.setValue(settings.value('geocontext-qgis-plugin/rate_limit', RATE_LIMIT, type=float))
 
         # Panel settings
         self.checkAutoClear.setChecked(settings.value('geocontext-qgis-plugin/auto_clear_table', False, type=bool))
@@ -54,16 +77,36 @@ class OptionsDialog(QDialog, FORM_CLASS):
         self.sldDecPlacesTool.setValue(settings.value('geocontext-qgis-plugin/dec_places_tool', 3, type=int))
         self.lblDecPlaceTool.setText(str(self.sldDecPlacesTool.value()))
 
+        # Query cache settings
+        self.checkCacheEnabled.setChecked(settings.value('geocontext-qgis-plugin/cache_enabled', True, type=bool))
+        self.sbCacheTtl.setValue(int(settings.value('geocontext-qgis-plugin/cache_ttl', CACHE_TTL, type=int) / 3600))
+        self.sbCacheMaxEntries.setValue(settings.value('geocontext-qgis-plugin/cache_max_entries', CACHE_MAX_ENTRIES, type=int))
+        self.sbCacheSnap.setValue(settings.value('geocontext-qgis-plugin/cache_snap_decimals', CACHE_SNAP_DECIMALS, type=int))
+
         # Updates the value when the user changes the decimal places
         self.sldDecPlacesPanel.valueChanged.connect(self.dec_places_value_changed_panel)
         self.sldDecPlacesTool.valueChanged.connect(self.dec_places_value_changed_tool)
 
         # Button clicks
         self.btnHelp.clicked.connect(self.help_btn_click)  # Triggers when the Help button is pressed
+        self.btnClearCache.clicked.connect(self.clear_cache_btn_click)  # Removes all cached responses
+
+        # Operations started from here on read the saved settings. The cache is
+        # recreated using the new settings on its next use
+        self.settingsChanged.connect(invalidate_settings)
+        self.settingsChanged.connect(reset_query_cache)
 
     def help_btn_click(self):
         self.show_help()
 
+    def clear_cache_btn_click(self):
+        """Removes all of the responses stored in the query cache.
+        """
+
+        query_cache = get_query_cache()
+        if query_cache is not None:
+            query_cache.clear()
+
     def show_help(self):
         """Opens the help dialog. The dialog displays the html documentation.
         The documentation contains information on the options dialog.
@@ -95,6 +138,19 @@ class OptionsDialog(QDialog, FORM_CLASS):
 
         self.lblDecPlaceTool.setText(str(self.sldDecPlacesTool.value()))
 
+    def save_settings(self):
+        """Saves all of the settings set in this dialog, and emits settingsChanged.
+        """
+
+        self.set_auto_clear()
+        self.set_dec_places_panel()
+        self.set_dec_places_tool()
+        self.set_request_coordinate_system()
+        self.set_rate_limit()
+        self.set_cache_settings()
+
+        self.settingsChanged.emit()
+
     def set_auto_clear(self):
         """Sets whether the panel table should be cleared when the user clicks in the canvas. This can be set using
         this dialog
@@ -134,3 +190,22 @@ class OptionsDialog(QDialog, FORM_CLASS):
         request_crs = self.cbCrs.currentText()
 
         settings.setValue('geocontext-qgis-plugin/request_crs', request_crs)
+
+    def set_rate_limit(self):
+        """Sets the maximum number of requests per second sent to the server. This can be set using
+        this dialog
+        """
+
+        settings = QgsSettings()
+        settings.setValue('geocontext-qgis-plugin/rate_limit', self.sbRateLimit.value())
+
+    def set_cache_settings(self):
+        """Sets whether responses are cached, and the expiry, size and coordinate snapping
+        of the query cache. This can be set using this dialog
+        """
+
+        settings = QgsSettings()
+        settings.setValue('geocontext-qgis-plugin/cache_enabled', self.checkCacheEnabled.isChecked())
+        settings.setValue('geocontext-qgis-plugin/cache_ttl', self.sbCacheTtl.value() * 3600)
+        settings.setValue('geocontext-qgis-plugin/cache_max_entries', self.sbCacheMaxEntries.value())
+        settings.setValue('geocontext-qgis-plugin/cache_snap_decimals', self.sbCacheSnap.value())
@@ -17,6 +17,7 @@ import os
 from PyQt5.QtWidgets import QDialog
 from PyQt5.QtGui import QColor
 from qgis.PyQt import uic
+import numpy
 import pyqtgraph as pg
 from pyqtgraph import PlotWidget, exporters
 import sys  # We need sys so that we can pass argv to QApplication
@@ -34,13 +35,14 @@ FORM_CLASS, _ = uic.loadUiType(os.path.join(os.path.dirname(__file__), 'GeoConte
 
 class PlotDialog(QDialog, FORM_CLASS):
     """Dialog for showing the results of the plugin creation process."""
-    def __init__(self, list_of_tables, current_tab, parent=None):
+    def __init__(self, list_stores, list_names, current_tab, parent=None):
         super(PlotDialog, self).__init__(parent)
         # Set up the user interface from Designer.
         self.setupUi(self)
 
-        self.list_of_tables = list_of_tables
-        self.list_names = self.create_plot_names(self.list_of_tables)
+        self.list_stores = list_stores  # ResultStore of each tab
+        self.list_names = list_names  # Tab names, used as the plot names
+        self.plot_items = {}  # PlotDataItem of each plotted name
 
         # Used to avoid calling triggers when not needed
         self.updating_plots = False
@@ -88,12 +90,11 @@ class PlotDialog(QDialog, FORM_CLASS):
 
         # Plots the currently selected tab data
         # Other tabs are still disabled at this point
-        current_table = self.list_of_tables[current_tab]
+        current_store = self.list_stores[current_tab]
         pen = pg.mkPen((red, green, blue), width=PLOT_LINE_WIDTH, symbol='o', symbolPen='b', symbolSize=10)
-        name = self.create_plot(current_table, pen)
+        name = self.create_plot(current_store, self.list_names[current_tab], pen)
         self.cbLines.addItem(name)
         self.widgetPlot.setTitle('')  # Title can be changed by the user
-        self.widgetPlot.addLegend()
 
         self.set_connectors()
 
@@ -195,7 +196,7 @@ class PlotDialog(QDialog, FORM_CLASS):
         # This check is done to avoid performing a plot change when its
         # already happening, or if it's another line being selected
         if not self.updating_plots and not self.cb_selection_changing:
-            self.update_plots()
+            self.update_pen(key)
 
         self.colour_changing = False
 
@@ -207,7 +208,7 @@ class PlotDialog(QDialog, FORM_CLASS):
             key = self.cbLines.currentText()
             self.set_dict_width(key, new_width)
 
-            self.update_plots()
+            self.update_pen(key)
 
         self.width_changing = False
 
@@ -215,14 +216,49 @@ class PlotDialog(QDialog, FORM_CLASS):
         exporter = pg.exporters.ImageExporter(self.widgetPlot.plotItem)
         exporter.export(self.plot_file_output.filePath())
 
+    def line_pen(self, name):
+        """Returns the pen of a line, using its colour and width settings.
+
+        :param name: Name of the plot
+        :type name: str
+
+        :returns: The pen
+        :rtype: QPen
+        """
+
+        settings = self.dict_settings.get(name)
+        r = settings.get('red')
+        g = settings.get('green')
+        b = settings.get('blue')
+        width = settings.get('width')
+
+        return pg.mkPen((r, g, b), width=width, symbol='o', symbolPen='b', symbolSize=10)
+
+    def update_pen(self, name):
+        """Applies the colour and width settings to a plotted line, without plotting it again.
+
+        :param name: Name of the plot
+        :type name: str
+        """
+
+        plot_item = self.plot_items.get(name)
+        if plot_item is not None:
+            plot_item.setPen(self.line_pen(name))
+
     def update_plots(self):
+        """Shows the checked plots. Lines which are no longer checked are removed, and lines which
+        are already shown are kept as they are.
+        """
+
         # This is set so that the colour change will not call the update plots method
         self.updating_plots = True
 
-        self.widgetPlot.clear()
+        self.cbLines.clear()
 
-        if not self.colour_changing and not self.width_changing:
-            self.cbLines.clear()
+        checked_list = self.cbPlots.checkedItems()
+        for name in list(self.plot_items):
+            if name not in checked_list:
+                self.widgetPlot.removeItem(self.plot_items.pop(name))
 
         # Resets the limitations used for the graph view
         self.x_min = None
@@ -231,26 +267,19 @@ class PlotDialog(QDialog, FORM_CLASS):
         self.y_max = None
 
         # Plots each of the checked items
-        checked_list = self.cbPlots.checkedItems()
         for item in checked_list:
-            index = self.list_names.index(item)
-            table = self.list_of_tables[index]
-
-            settings = self.dict_settings.get(item)
-            r = settings.get('red')
-            g = settings.get('green')
-            b = settings.get('blue')
-            width = settings.get('width')
-
-            # line = plt.plot(x, y, pen=pg.mkPen('r', width=6), symbol='o', symbolPen='b', symbolSize=20)
-
-            pen = pg.mkPen((r, g, b), width=width, symbol='o', symbolPen='b', symbolSize=10)
-            name = self.create_plot(table, pen)
+            plot_item = self.plot_items.get(item)
+            if plot_item is None:
+                index = self.list_names.index(item)
+                self.create_plot(self.list_stores[index], item, self.line_pen(item))
+            else:
+                # The full data of the line, as getData() is downsampled and clipped to the view
+                self.update_view_limits(plot_item.xData, plot_item.yData)
 
-            if not self.colour_changing and not self.width_changing:
-                self.cbLines.addItem(name)
+            self.cbLines.addItem(item)
 
-        self.widgetPlot.addLegend()
+        # View set to new limits
+        self.set_view_limits()
 
         self.updating_plots = False
 
@@ -264,28 +293,50 @@ class PlotDialog(QDialog, FORM_CLASS):
         viewbox.setBackgroundColor((255, 255, 255))
         viewbox.setBorder(pen=pg.mkPen((82, 235, 52), width=5))
 
-    def update_view_limits(self, x_value, y_value):
+        # Long series are downsampled to the plot width, and only the visible part is drawn
+        self.widgetPlot.setDownsampling(auto=True, mode='peak')
+        self.widgetPlot.setClipToView(True)
+
+        # Lines are added to the legend when plotted, and removed when removed from the plot
+        self.widgetPlot.addLegend()
+
+    def update_view_limits(self, x_values, y_values):
+        """Extends the view limits to the finite values of a line.
+
+        :param x_values: Values of the x-axis
+        :type x_values: numpy.ndarray
+
+        :param y_values: Values of the y-axis, NaN if not numeric
+        :type y_values: numpy.ndarray
+        """
+
+        if x_values is None or y_values is None:
+            return
+
+        finite = numpy.isfinite(y_values)
+        if not finite.any():
+            return
+
+        x_finite = x_values[finite]
+        y_finite = y_values[finite]
+        x_min, x_max = float(x_finite.min()), float(x_finite.max())
+        y_min, y_max = float(y_finite.min()), float(y_finite.max())
+
         # Checks if the values has been initialized yet
         if self.x_min is None:
-            # Sets the values the first time
-            self.x_min = x_value
-            self.x_max = x_value
-
-            self.y_min = y_value
-            self.y_max = y_value
+            self.x_min, self.x_max, self.y_min, self.y_max = x_min, x_max, y_min, y_max
         else:
             # Updates the value where required
-            if x_value < self.x_min:
-                self.x_min = x_value
-            if x_value > self.x_max:
-                self.x_max = x_value
-
-            if y_value < self.y_min:
-                self.y_min = y_value
-            if y_value > self.y_max:
-                self.y_max = y_value
+            self.x_min = min(self.x_min, x_min)
+            self.x_max = max(self.x_max, x_max)
+            self.y_min = min(self.y_min, y_min)
+            self.y_max = max(self.y_max, y_max)
 
     def set_view_limits(self):
+        if self.x_min is None:
+            # There are no numeric values to show
+            return
+
         viewbox = self.widgetPlot.getViewBox()
 
         # Applies limitation buffers to the x-axis and y-axis
@@ -309,14 +360,6 @@ class PlotDialog(QDialog, FORM_CLASS):
 
         return r, g, b
 
-    def create_plot_names(self, list_tables):
-        list_names = []
-        for table in list_tables:
-            name = table.item(0, 0).text()
-            list_names.append(name)
-
-        return list_names
-
     def default_line_settings(self, list_keys):
         dict_settings = {}
         for key in list_keys:
@@ -355,35 +398,44 @@ class PlotDialog(QDialog, FORM_CLASS):
                 'width': width
             }
 
-    def create_plot(self, table, pen):
-        row_cnt = table.rowCount()
-        # Loops through each of the table entries/values
-        i = 0  # Current ID
-        plot_range = []
-        plot_values = []
-        key = ''
-        while i < row_cnt:
-            key = table.item(i, 0).text()  # Data source or name
-            value = table.item(i, 1).text()  # Value at the point
-            x = float(table.item(i, 2).text())  # Longitude
-            y = float(table.item(i, 3).text())  # Latitude
+    def create_plot(self, store, name, pen):
+        """Plots the numeric values of the results of a tab, from the oldest to the most recent.
+        Values which are not numeric are NaN in the store, and are left out of the line.
+
+        :param store: Results of the tab
+        :type store: ResultStore
+
+        :param name: Name of the plot
+        :type name: str
 
-            plot_range.append(i)
-            plot_values.append(float(value))
+        :param pen: Pen of the line
+        :type pen: QPen
 
-            self.update_view_limits(i, float(value))
+        :returns: Name of the plot
+        :rtype: str
+        """
+
+        # The values are copied from the store array at once. The line does not refer to the
+        # store array itself, as an array cannot be extended while its buffer is in use
+        if len(store) > 0:
+            plot_values = numpy.frombuffer(store.numbers, dtype=numpy.float64).copy()
+        else:
+            plot_values = numpy.empty(0, dtype=numpy.float64)
+        plot_range = numpy.arange(len(plot_values), dtype=numpy.float64)
 
-            i = i + 1
+        self.update_view_limits(plot_range, plot_values)
 
         # Plots the line
         plot_item = self.widgetPlot.plot(
             plot_range,
             plot_values,
             pen=pen,
-            name=key
+            name=name,
+            connect='finite'
         )
+        self.plot_items[name] = plot_item
 
         # View set to new limits
         self.set_view_limits()
 
-        return key
+        return name
@@ -0,0 +1,87 @@
+# coding=utf-8
+"""
+Request statistics dialog implementation.
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+
+from qgis.PyQt import uic
+from qgis.PyQt.QtWidgets import QDialog, QMessageBox, QTableWidgetItem
+
+from bridge_api.api_abstract import ApiClient
+
+FORM_CLASS, _ = uic.loadUiType(os.path.join(os.path.dirname(__file__), 'GeoContextQGISPlugin_statistics.ui'))
+
+
+class StatisticsDialog(QDialog, FORM_CLASS):
+    """Dialog which shows the request timings per registry and key, and exports them to CSV or JSON."""
+    def __init__(self, parent=None):
+        super(StatisticsDialog, self).__init__(parent)
+        # Set up the user interface from Designer.
+        self.setupUi(self)
+
+        self.metrics = ApiClient.metrics  # RequestMetrics
+
+        self.statistics_output_file.setFilter("*.csv;;*.json")
+        self.update_table()
+
+        self.set_connectors()
+
+    def set_connectors(self):
+        self.btnExport.clicked.connect(self.export_btn_click)
+        self.btnRefresh.clicked.connect(self.update_table)
+        self.btnClear.clicked.connect(self.clear_btn_click)
+
+    def update_table(self):
+        """Fills the table with the summary of the request timings, a row per registry and key."""
+
+        list_summary = self.metrics.summary()
+
+        self.tableStatistics.clear()
+        self.tableStatistics.setRowCount(len(list_summary))
+        if len(list_summary) == 0:
+            self.tableStatistics.setColumnCount(0)
+            return
+
+        list_columns = list(list_summary[0].keys())
+        self.tableStatistics.setColumnCount(len(list_columns))
+        self.tableStatistics.setHorizontalHeaderLabels(list_columns)
+        for row, dict_summary in enumerate(list_summary):
+            for column, name in enumerate(list_columns):
+                value = dict_summary[name]
+                self.tableStatistics.setItem(row, column, QTableWidgetItem('' if value is None else str(value)))
+        self.tableStatistics.resizeColumnsToContents()
+
+    def clear_btn_click(self):
+        """Removes the recorded request timings."""
+
+        self.metrics.clear()
+        self.update_table()
+
+    def export_btn_click(self):
+        """Exports the request timings. A CSV file contains the summary, a JSON file
+        contains the summary and each of the recorded requests.
+        """
+
+        output_file = self.statistics_output_file.filePath()  # Output file provided by the user
+        output_dir = os.path.dirname(output_file)  # Folder directory of the output
+        if not output_file or not os.path.exists(output_dir):
+            QMessageBox.warning(self, "Export not performed", "Output directory does not exist.")
+            return
+
+        try:
+            if output_file.lower().endswith('.json'):
+                self.metrics.export_json(output_file)
+            else:
+                self.metrics.export_csv(output_file)
+        except OSError as e:
+            QMessageBox.critical(self, "Cannot create file", str(e))
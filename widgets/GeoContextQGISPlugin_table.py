@@ -14,7 +14,7 @@ Help dialog implementation.
 
 import os
 
-from PyQt5.QtWidgets import QDialog, QTableWidget
+from PyQt5.QtWidgets import QDialog, QTableView, QAbstractItemView, QWidget, QVBoxLayout
 from qgis.PyQt import uic, QtWidgets
 from qgis.PyQt.QtCore import pyqtSignal, QUrl, QVariant
 import sys  # We need sys so that we can pass argv to QApplication
@@ -22,10 +22,13 @@ import os
 
 from utilities.utilities import (
     get_request_crs,
-    create_vector_file,
-    export_table
+    create_vector_file
 )
+from utilities.export_task import ExportTableTask
+from utilities.table_export import export_file_filter
+from qgis.utils import iface
 from qgis.core import (
+    QgsApplication,
     QgsProject,
     QgsSettings,
     QgsCoordinateReferenceSystem,
@@ -57,17 +60,20 @@ FORM_CLASS, _ = uic.loadUiType(os.path.join(os.path.dirname(__file__), 'GeoConte
 
 class TableDialog(QDialog, FORM_CLASS):
     """Dialog for showing the results of the plugin creation process."""
-    def __init__(self, list_tables, list_names, parent=None):
+    def __init__(self, list_models, list_names, parent=None):
         super(TableDialog, self).__init__(parent)
         # Set up the user interface from Designer.
         self.setupUi(self)
 
-        self.list_tables = list_tables
+        self.list_models = list_models  # ResultTableModel of each tab, shared with the docking panel
         self.list_names = list_names
+        self.list_views = []  # Table view of each tab, created once the tab is shown
 
-        self.table_output_file.setFilter("*.gpkg;;*.csv")
+        self.table_output_file.setFilter(export_file_filter())
         self.create_table()
 
+        self.export_task = None  # GeoPackage export in progress
+
         self.set_connectors()
 
     def set_connectors(self):
@@ -78,34 +84,55 @@ class TableDialog(QDialog, FORM_CLASS):
 
     def export_btn_click(self):
         """Export the contents of the docking widget's table to a
-        geopackage (gpkg).
+        geopackage (gpkg), CSV (csv) or Parquet (parquet) file.
         """
         output_file = self.table_output_file.filePath()  # Output file provided by the user
         output_dir = os.path.dirname(output_file)  # Folder directory of the output
 
         index = self.tabTables.currentIndex()
-        table = self.list_tables[index]  # QTableWidget
+        store = self.list_models[index].store  # ResultStore
 
         # Checks whether the table has any contents
-        num_rows = table.rowCount()
+        num_rows = len(store)
         if num_rows <= 0:
             # File will not be created
-            print("Export not performed: ", "Table has no contents!")
+            iface.messageBar().pushCritical("Export not performed: ", "Table has no contents!")
             return
 
         # Checks if the folder path exists
         if os.path.exists(output_dir):
-            # Exports the table data
-            success, msg = export_table(output_file, table)
-            if not success:
-                # Prints an error message if the output file could not be created
-                self.iface.messageBar().pushCritical("Cannot create file: ", msg)
+            # Exports the table data in the background
+            if self.export_task is not None:
+                iface.messageBar().pushWarning("Export not performed: ", "An export is in progress.")
+                return
+            self.export_task = ExportTableTask(output_file, store)
+            self.export_task.exportFinished.connect(self.export_finished)
+            QgsApplication.taskManager().addTask(self.export_task)
         else:
             # Shows an error message if the folder path does not exist
-            print("Output directory does not exist: ")
+            if output_dir == "":
+                iface.messageBar().pushCritical("Output directory does not exist: ",
+                                                "The user has not provided an output file!")
+            else:
+                iface.messageBar().pushCritical("Output directory does not exist: ", output_dir)
+
+    def export_finished(self, task):
+        """Called once the background export of a table is done.
+
+        :param task: The finished export task
+        :type task: ExportTableTask
+        """
+
+        self.export_task = None
+        if task.success:
+            iface.messageBar().pushSuccess("Export: ", task.msg)
+        else:
+            iface.messageBar().pushCritical("Cannot create file: ", task.msg)
 
     def tab_changed(self):
         tab_index = self.tabTables.currentIndex()
+        self.show_table(tab_index)
+
         cb_index = self.cbTableTabs.currentIndex()
 
         if tab_index != cb_index:
@@ -125,11 +152,40 @@ class TableDialog(QDialog, FORM_CLASS):
             return
 
     def create_table(self):
+        """Adds a tab per result set. The table views are only created once a tab is shown,
+        so the dialog opens at once with many or large result sets.
+        """
+
         index = 0
-        for table in self.list_tables:
+        for model in self.list_models:
             name = self.list_names[index]
 
-            tab_index = self.tabTables.addTab(table, name)
+            page = QWidget()
+            layout = QVBoxLayout(page)
+            layout.setContentsMargins(0, 0, 0, 0)
+            self.list_views.append(None)
+
+            tab_index = self.tabTables.addTab(page, name)
             self.cbTableTabs.addItem(name)
 
             index = index + 1
+
+        self.show_table(self.tabTables.currentIndex())
+
+    def show_table(self, index):
+        """Creates the table view of a tab, if not yet created. The view shows the results of the
+        docking panel tab, which are not copied and cannot be edited in the table.
+
+        :param index: Index of the tab
+        :type index: int
+        """
+
+        if index < 0 or index >= len(self.list_views) or self.list_views[index] is not None:
+            return
+
+        table = QTableView()
+        table.setModel(self.list_models[index])
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabTables.widget(index).layout().addWidget(table)
+
+        self.list_views[index] = table